@@ -0,0 +1,733 @@
+import functools
+import glob
+import inspect
+import json
+import os
+import time
+
+import pytest
+
+# The conftest itself imports only the settings and the latency recorder, and
+# configuring pytest reads no .env file. requests, the client layers (sqlite3
+# through the ETag cache), asyncio, multiprocessing, the stand-ins, the
+# payload factory and the benchmarks are imported by the fixtures and hooks
+# that use them; the test modules still import what they use when collected.
+from support.latency import GITHUB_TEMPLATES, LatencyRecorder
+from support.settings import FIELDS, PARALLEL_ADDRESS_ENV, Settings, SettingsError, parse_host_limit
+
+settings_key = pytest.StashKey[Settings]()
+clients_key = pytest.StashKey[object]()
+coordinator_key = pytest.StashKey[object]()
+budget_key = pytest.StashKey[object]()
+http_caches_key = pytest.StashKey[list]()
+memos_key = pytest.StashKey[dict]()
+latency_key = pytest.StashKey[LatencyRecorder]()
+baseline_key = pytest.StashKey[object]()
+resilience_key = pytest.StashKey[dict]()
+snapshots_key = pytest.StashKey[object]()
+impact_key = pytest.StashKey[object]()
+startup_key = pytest.StashKey[dict]()
+lookups_key = pytest.StashKey[tuple]()
+batch_key = pytest.StashKey[object]()
+stand_ins_key = pytest.StashKey[dict]()
+worker_sections_key = pytest.StashKey[list]()
+
+# hosts the tests talk to; each has a client fixture of the same name
+HOSTS = ("github", "jsonplaceholder", "httpbin")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("api", "API test clients")
+    for field in FIELDS:
+        if field.help:
+            default = "" if field.default is None else f", default {field.default}"
+            group.addoption(field.option, default=None, help=f"{field.help} (${field.env}{default})")
+    group.addoption("--host-limit", action="append", type=parse_host_limit, default=[],
+                    metavar="HOST=CONCURRENCY[/RATE]",
+                    help="per-host cap on concurrent requests and requests/second in parallel runs")
+    group.addoption("--max-per-host", type=int, default=8,
+                    help="concurrent requests allowed to hosts without a --host-limit")
+    group.addoption("--github-max-wait", type=float, default=65.0,
+                    help="seconds a test may wait for an empty GitHub rate-limit bucket to reset")
+    group.addoption("--github-graphql", action="store_true",
+                    help="fetch the GitHub users and repositories the selected tests declare with "
+                         "@pytest.mark.github_lookups in one GraphQL query (needs $TOKEN)")
+    group.addoption("--http-cache-size", type=int, default=64,
+                    help="size limit of the ETag cache in MiB")
+    group.addoption("--no-http-cache", action="store_true",
+                    help="send GitHub requests unconditionally")
+    group.addoption("--no-memo", action="store_true",
+                    help="send every GET even if an identical one was already made in this run")
+    group.addoption("--slowest-calls", type=int, default=10,
+                    help="rows in the slowest-calls table of the latency report")
+    group.addoption("--retries", type=int, default=3,
+                    help="retries of a failed idempotent request (connection error, timeout, 429/502/503/504)")
+    group.addoption("--backoff", type=float, default=0.5,
+                    help="base of the exponential backoff between retries, in seconds")
+    group.addoption("--max-backoff", type=float, default=20.0,
+                    help="longest wait between retries; a longer Retry-After is not waited for")
+    group.addoption("--breaker-threshold", type=int, default=5,
+                    help="consecutive failed requests after which a host's tests are skipped")
+    group.addoption("--breaker-cooldown", type=float, default=60.0,
+                    help="seconds before a tripped host is tried again")
+    group.addoption("--snapshot-update", action="store_true",
+                    help="record missing golden files and rewrite ones that no longer match instead of failing")
+    group.addoption("--changed-only", action="store_true",
+                    help="skip tests that passed before and whose code and responses have not changed")
+
+    group = parser.getgroup("benchmark", "API benchmarks against the local stand-ins")
+    group.addoption("--benchmark", action="store_true",
+                    help="run only the benchmarks (tests marked 'benchmark'), which are skipped otherwise")
+    group.addoption("--benchmark-baseline",
+                    default=os.path.join(os.path.dirname(__file__), "benchmarks", "baseline.json"),
+                    help="JSON file of stored benchmark results")
+    group.addoption("--benchmark-save", action="store_true",
+                    help="write this run's results into the baseline file")
+    group.addoption("--benchmark-threshold", type=float, default=0.5,
+                    help="fail a benchmark whose median latency exceeds the baseline by more than this fraction")
+    group.addoption("--benchmark-floor", type=float, default=5.0,
+                    help="milliseconds the median latency must also exceed the baseline by to fail")
+    group.addoption("--benchmark-duration", type=float, default=2.0,
+                    help="seconds of load per benchmark, spread over its repeats")
+    group.addoption("--benchmark-repeats", type=int, default=3,
+                    help="runs of each benchmark; the median of each figure across them is reported")
+    group.addoption("--benchmark-concurrency", type=int, default=16,
+                    help="callers in the closed-loop benchmarks")
+    group.addoption("--benchmark-rate", type=float, default=200.0,
+                    help="requests per second started in the open-loop benchmarks")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "github(core=1, search=0): GitHub API calls the test makes, per bucket")
+    config.addinivalue_line("markers", "github_lookups(users=(), repos=()): GitHub logins and owner/name "
+                                       "repositories the test GETs, batched into one query by --github-graphql")
+    config.addinivalue_line("markers", "fresh: send every request, never reuse a memoized GET response")
+    config.addinivalue_line("markers", "benchmark: load test, run only with --benchmark")
+    config.stash[startup_key] = {"configured": time.perf_counter()}
+    config.stash[http_caches_key] = []
+    config.stash[memos_key] = {}
+    config.stash[latency_key] = LatencyRecorder()
+    config.stash[resilience_key] = {}
+    config.stash[coordinator_key] = None
+    config.stash[batch_key] = None
+    config.stash[stand_ins_key] = {}
+    config.stash[worker_sections_key] = []
+    if os.environ.get(PARALLEL_ADDRESS_ENV):
+        from support.parallel import WorkerPlugin, connect_worker, shared_stand_ins
+
+        coordinator = config.stash[coordinator_key] = connect_worker()
+        config.stash[stand_ins_key] = shared_stand_ins()
+        config.pluginmanager.register(WorkerPlugin(config, coordinator), "api-parallel-worker")
+    elif setting(config, "workers") > 1:
+        from support.parallel import ControllerPlugin
+
+        limits = dict(config.getoption("host_limit"))
+        controller = ControllerPlugin(config, setting(config, "workers"), limits, config.getoption("max_per_host"),
+                                      functools.partial(start_shared_stand_ins, config),
+                                      functools.partial(collect_worker_outputs, config))
+        config.pluginmanager.register(controller, "api-parallel-controller")
+
+
+def pytest_unconfigure(config):
+    registry = config.stash.get(clients_key, None)
+    if registry is not None:
+        registry.close()
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    recorder = config.stash.get(impact_key, None)
+    if config.stash[coordinator_key] is not None:
+        # a worker leaves its results to the controller, see collect_worker_outputs
+        from support.parallel import worker_output
+
+        if recorder is not None and recorder.finished:
+            recorder.save(worker_output("impact.json"))
+        if config.stash[latency_key].calls:
+            config.stash[latency_key].export(worker_output("latency.json"))
+        with open(worker_output("sections.json"), "w", encoding="utf-8") as f:
+            json.dump(report_sections(config), f)
+    elif recorder is not None and recorder.results:
+        recorder.save()
+
+
+def collect_worker_outputs(config, directory):
+    """Merge what the workers of a parallel run left in ``directory`` into the shared files and reports."""
+    from support.parallel import worker_outputs
+
+    mode = settings(config).record_mode
+    if mode in ("record", "new_episodes"):
+        from support.cassette import merge
+
+        episodes = {}
+        for path in worker_outputs(directory, os.path.join("cassettes", "*")):
+            episodes.setdefault(os.path.basename(path), []).append(path)
+        for name, paths in episodes.items():
+            merge(os.path.join(settings(config).cassette_dir, name), paths, keep=mode == "new_episodes")
+    paths = worker_outputs(directory, "impact.json")
+    if paths:
+        from support.impact import ImpactRecorder
+
+        ImpactRecorder(settings(config).impact_file, harness(config)).load().merge(paths).save()
+    config.stash[latency_key].merge(worker_outputs(directory, "latency.json"))
+    for worker, path in enumerate(worker_outputs(directory, "sections.json"), 1):
+        with open(path, encoding="utf-8") as f:
+            config.stash[worker_sections_key].append((worker, json.load(f)))
+
+
+def _settings(config):
+    if settings_key not in config.stash:
+        options = {field.name: config.getoption(field.name, None) for field in FIELDS}
+        config.stash[settings_key] = Settings(options)
+    return config.stash[settings_key]
+
+
+def setting(config, name):
+    """One harness setting, resolved without the others, for the hooks that run before collection."""
+    try:
+        return getattr(_settings(config), name)
+    except SettingsError as exc:
+        raise pytest.UsageError(str(exc)) from None
+
+
+def settings(config):
+    """The validated harness settings, read from the options, environment and .env on first use."""
+    resolved = _settings(config)
+    if len(resolved.sources) < len(resolved.fields):
+        try:
+            resolved.validate()
+        except SettingsError as exc:
+            raise pytest.UsageError(str(exc)) from None
+    return resolved
+
+
+def clients(config):
+    """The client registry, created when the first client is."""
+    if clients_key not in config.stash:
+        from support.client import ClientRegistry
+
+        config.stash[clients_key] = ClientRegistry(pool_size=settings(config).pool_size)
+    return config.stash[clients_key]
+
+
+def budget(config):
+    """The GitHub rate-limit budget, created when the first GitHub client is; a worker uses the coordinator's."""
+    if budget_key not in config.stash:
+        coordinator = config.stash[coordinator_key]
+        if coordinator is not None:
+            from support.parallel import SharedBudget
+
+            config.stash[budget_key] = SharedBudget(coordinator)
+        else:
+            from support.ratelimit import RateBudget
+
+            config.stash[budget_key] = RateBudget()
+    return config.stash[budget_key]
+
+
+def impact(config):
+    """The --changed-only recorder, loaded when the first test starts."""
+    if impact_key not in config.stash:
+        from support.impact import ImpactRecorder
+
+        config.stash[impact_key] = ImpactRecorder(settings(config).impact_file, harness(config)).load()
+    return config.stash[impact_key]
+
+
+def harness(config):
+    """Digest of what every test depends on besides its own code, for --changed-only."""
+    here = os.path.dirname(__file__)
+    paths = [__file__, *glob.glob(os.path.join(here, "support", "*.py"))]
+    options = {name: getattr(settings(config), name)
+               for name in ("github_url", "jsonplaceholder_url", "httpbin_url", "record_mode", "cassette_dir",
+                            "seed", "snapshot_dir")}
+    from support.impact import harness_digest
+
+    return harness_digest(paths, options)
+
+
+def pytest_collection_finish(session):
+    startup = session.config.stash[startup_key]
+    startup["collected"] = time.perf_counter()
+    startup["items"] = len(session.items)
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """Run ``async def`` tests to completion, on the session event loop if their fixtures use it."""
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    kwargs = {name: pyfuncitem.funcargs[name] for name in inspect.signature(pyfuncitem.obj).parameters}
+    loop = pyfuncitem.funcargs.get("event_loop")
+    if loop is not None:
+        loop.run_until_complete(pyfuncitem.obj(**kwargs))
+    else:
+        import asyncio
+
+        asyncio.run(pyfuncitem.obj(**kwargs))
+    return True
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    recorder = item.config.stash[latency_key]
+    recorder.test = item.nodeid
+    yield
+    recorder.test = None
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_call(item):
+    # fixture setup is over: from here on a request is the test's own
+    impact(item.config).start(item.nodeid)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    """A request refused by an open circuit breaker skips the test instead of failing it."""
+    outcome = yield
+    report = outcome.get_result()
+    # only a client's resilience layer raises CircuitOpen
+    if call.excinfo is not None and item.config.stash[resilience_key] and _circuit_open(call.excinfo):
+        report.outcome = "skipped"
+        report.longrepr = (str(item.path), item.location[1], f"Skipped: {call.excinfo.value}")
+    if report.when == "call":
+        impact(item.config).finish(item.nodeid, item.function, report.passed)
+
+
+def _circuit_open(excinfo):
+    from support.resilience import CircuitOpen
+
+    return excinfo.errisinstance(CircuitOpen)
+
+
+def github_costs(item):
+    """Calls per rate-limit bucket a test declares with @pytest.mark.github."""
+    marker = item.get_closest_marker("github")
+    # with --github-graphql the lookups of a test come out of the shared query
+    batched = item.config.getoption("github_graphql") and item.get_closest_marker("github_lookups")
+    costs = {"core": 0 if batched else 1, "search": 0}
+    if marker is not None:
+        costs.update(marker.kwargs)
+    return {resource: cost for resource, cost in costs.items() if cost}
+
+
+def pytest_collection_modifyitems(config, items):
+    # benchmarks and the functional tests never run in the same session
+    benchmark = config.getoption("benchmark")
+    deselected = [item for item in items if (item.get_closest_marker("benchmark") is None) == benchmark]
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = [item for item in items if item not in deselected]
+    # GitHub tests keep their slots in the run order, but the cheapest go
+    # first and search-bucket tests last, so a short budget runs the most tests
+    slots = [n for n, item in enumerate(items) if "github" in item.fixturenames]
+    ordered = sorted((items[n] for n in slots),
+                     key=lambda item: ("search" in github_costs(item), sum(github_costs(item).values())))
+    for n, item in zip(slots, ordered):
+        items[n] = item
+    users, repos = set(), set()
+    for item in items:
+        for marker in item.iter_markers("github_lookups"):
+            users.update(marker.kwargs.get("users", ()))
+            repos.update(marker.kwargs.get("repos", ()))
+    config.stash[lookups_key] = (users, repos)
+
+
+def startup_report(config):
+    startup = config.stash[startup_key]
+    if "collected" not in startup:
+        return []
+    elapsed = startup["collected"] - startup["configured"]
+    budget = settings(config).startup_budget
+    verdict = "within" if elapsed <= budget else "OVER"
+    return [f"configured and collected {startup['items']} tests in {elapsed:.2f}s, {verdict} the {budget:.1f}s budget"]
+
+
+def report_sections(config):
+    """``[title, lines]`` of the clients' and layers' end-of-run reports that have something to say."""
+    sections = [
+        ("connection reuse", clients(config).report() if clients_key in config.stash else []),
+        ("github rate limit", config.stash[budget_key].report() if budget_key in config.stash else []),
+        ("graphql batch", config.stash[batch_key].report() if config.stash[batch_key] is not None else []),
+        ("http cache", [line for cache in config.stash[http_caches_key] for line in cache.report()]),
+        ("memoized GETs", [line for name, memo in config.stash[memos_key].items()
+                           for line in memo.stats.report(name)]),
+        ("retries and circuit breakers", [line for layer in config.stash[resilience_key].values()
+                                          for line in layer.report()]),
+        ("changed-only", config.stash[impact_key].report() if impact_key in config.stash else []),
+        ("snapshots", config.stash[snapshots_key].report() if snapshots_key in config.stash else []),
+    ]
+    return [[title, lines] for title, lines in sections if lines]
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if config.stash[coordinator_key] is not None:
+        # a worker's output is discarded; its reports went to the controller
+        return
+    sections = [("startup", startup_report(config))] + report_sections(config)
+    # a parallel run's reports come from its workers, one line per worker and report line
+    merged = {}
+    for worker, worker_sections in config.stash[worker_sections_key]:
+        for title, lines in worker_sections:
+            merged.setdefault(title, []).extend(f"worker {worker}: {line}" for line in lines)
+    sections += merged.items()
+    for title, lines in sections:
+        if lines:
+            terminalreporter.section(title)
+            for line in lines:
+                terminalreporter.write_line(line)
+    recorder = config.stash[latency_key]
+    lines = recorder.report(config.getoption("slowest_calls"))
+    if lines:
+        terminalreporter.section("latency")
+        for line in lines:
+            terminalreporter.write_line(line)
+    path = settings(config).latency_json
+    if path and recorder.calls:
+        recorder.export(path)
+        terminalreporter.write_line(f"latency written to {path}")
+    baseline = config.stash.get(baseline_key, None)
+    if baseline is not None and baseline.results:
+        terminalreporter.section("benchmark")
+        for line in baseline.report():
+            terminalreporter.write_line(line)
+        if config.getoption("benchmark_save"):
+            baseline.save()
+            terminalreporter.write_line(f"baseline written to {baseline.path}")
+
+
+def http_cache_layers(config, name):
+    if config.getoption("no_http_cache"):
+        return []
+    from support.httpcache import ConditionalCacheLayer, HTTPCache
+
+    path = os.path.join(settings(config).http_cache_dir, f"{name}.sqlite")
+    cache = HTTPCache(path, max_bytes=config.getoption("http_cache_size") * 1024 * 1024)
+    config.stash[http_caches_key].append(cache)
+    return [ConditionalCacheLayer(cache)]
+
+
+def latency_listener(config, name):
+    return config.stash[latency_key].listener(name, GITHUB_TEMPLATES if name == "github" else ())
+
+
+def resilience_layer(config, name):
+    from support.resilience import ResilienceLayer
+
+    layer = ResilienceLayer(name, timeout=(settings(config).connect_timeout, settings(config).read_timeout),
+                            retries=config.getoption("retries"), backoff=config.getoption("backoff"),
+                            max_backoff=config.getoption("max_backoff"),
+                            threshold=config.getoption("breaker_threshold"),
+                            cooldown=config.getoption("breaker_cooldown"))
+    config.stash[resilience_key][name] = layer
+    return layer
+
+
+def make_client(config, name, base_url, headers=None, layers=()):
+    """Build the client for one host with the layers selected on the command line.
+
+    ``layers`` sit right above the network, below the cassette, so replayed
+    responses never reach them. Retries happen below them too, so the rate
+    limit and ETag layers only see the final answer.
+    """
+    from support.cassette import Cassette, CassetteLayer
+    from support.impact import ImpactLayer
+    from support.memo import MemoLayer
+
+    client = clients(config).client(name, base_url, headers)
+    client.adapter.listeners.append(latency_listener(config, name))
+    coordinator = config.stash[coordinator_key]
+    if coordinator is not None:
+        from support.parallel import LimiterLayer
+
+        client.add_layer(LimiterLayer(coordinator))
+    client.add_layer(resilience_layer(config, name))
+    for layer in layers:
+        client.add_layer(layer)
+    mode = settings(config).record_mode
+    if mode != "live":
+        path = os.path.join(settings(config).cassette_dir, f"{name}.jsonl.gz")
+        episodes = None
+        if coordinator is not None:
+            from support.parallel import worker_output
+
+            episodes = worker_output(os.path.join("cassettes", f"{name}.jsonl.gz"))
+        client.add_layer(CassetteLayer(Cassette(path, episodes).load(), mode))
+    if not config.getoption("no_memo"):
+        config.stash[memos_key][name] = client.add_layer(MemoLayer())
+    client.add_layer(ImpactLayer(impact(config), name, client.base_url))
+    return client
+
+
+@pytest.fixture(scope="session")
+def api_clients(pytestconfig):
+    return clients(pytestconfig)
+
+
+@pytest.fixture(scope="session")
+def api_settings(pytestconfig):
+    return settings(pytestconfig)
+
+
+@pytest.fixture(scope="session")
+def event_loop():
+    """One loop for the async clients of the session and the async tests that use them."""
+    import asyncio
+
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.run_until_complete(loop.shutdown_asyncgens())
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def benchmark(pytestconfig):
+    from support.bench import Baseline, Benchmark
+
+    baseline = pytestconfig.stash[baseline_key] = Baseline(pytestconfig.getoption("benchmark_baseline"))
+    return Benchmark(baseline, pytestconfig.getoption("benchmark_threshold"),
+                     pytestconfig.getoption("benchmark_duration"),
+                     pytestconfig.getoption("benchmark_concurrency"), pytestconfig.getoption("benchmark_rate"),
+                     pytestconfig.getoption("benchmark_repeats"), pytestconfig.getoption("benchmark_floor"))
+
+
+@pytest.fixture
+def payloads(request, pytestconfig):
+    """Payload factory whose sequence depends only on --seed and the test id."""
+    from support.factory import PayloadFactory
+
+    return PayloadFactory(settings(pytestconfig).seed, stream=request.node.nodeid)
+
+
+@pytest.fixture
+def snapshot(request, pytestconfig):
+    """Golden files of this test, kept apart for runs against the local stand-ins.
+
+    Only the local goldens are committed: against a live service a missing
+    golden file skips the test instead of failing a fresh checkout.
+    """
+    local = [name for name in HOSTS
+             if name in request.fixturenames and getattr(settings(pytestconfig), f"{name}_url") == "local"]
+    directory = os.path.join(settings(pytestconfig).snapshot_dir, *(["local"] if local else []),
+                             request.node.path.stem)
+    from support.snapshot import Snapshot, SnapshotStats
+
+    if snapshots_key not in pytestconfig.stash:
+        pytestconfig.stash[snapshots_key] = SnapshotStats()
+
+    def unrecorded(name, path):
+        pytest.skip(f"no golden file for snapshot {name!r} against this target; record it with --snapshot-update")
+
+    return Snapshot(directory, request.node.name, pytestconfig.stash[snapshots_key],
+                    pytestconfig.getoption("snapshot_update"), on_missing=None if local else unrecorded)
+
+
+@pytest.fixture(autouse=True)
+def fresh_requests(request):
+    """Tests marked ``fresh`` never see a memoized response."""
+    if request.node.get_closest_marker("fresh") is None:
+        yield
+        return
+    from support.memo import bypass
+
+    with bypass():
+        yield
+
+
+@pytest.fixture(autouse=True)
+def open_circuits(request, pytestconfig):
+    """Skip a test at once when a host it talks to has its circuit breaker open."""
+    layers = pytestconfig.stash[resilience_key]
+    for name in HOSTS:
+        layer = layers.get(name)
+        if layer is not None and name in request.fixturenames and layer.breaker.state == "open":
+            pytest.skip(f"{name} is unreachable: circuit breaker open after "
+                        f"{layer.breaker.failures} consecutive failures")
+
+
+@pytest.fixture(autouse=True)
+def changed_only(request, pytestconfig):
+    """With --changed-only, skip a test whose code and recorded responses are unchanged since it passed."""
+    if not pytestconfig.getoption("changed_only"):
+        return
+    recorder = impact(pytestconfig)
+    result = recorder.candidate(request.node.nodeid, request.function)
+    if result is None:
+        return
+    import requests
+
+    try:
+        unchanged = recorder.unchanged_test(result, request.getfixturevalue)
+    except requests.exceptions.RequestException:
+        return
+    if unchanged:
+        pytest.skip(f"unchanged since it last passed ({len(result['calls'])} responses checked)")
+
+
+@pytest.fixture(scope="session")
+def github_server(pytestconfig):
+    yield from behind_fault_proxy(pytestconfig, "github", lambda: start_stand_in("github"))
+
+
+@pytest.fixture(scope="session")
+def github(pytestconfig, request):
+    token = settings(pytestconfig).token
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    from support.ratelimit import RateLimitLayer
+
+    rate_budget = budget(pytestconfig)
+    url = settings(pytestconfig).github_url
+    if url == "local":
+        url = request.getfixturevalue("github_server").url
+        layers = [RateLimitLayer(rate_budget, url)]
+    else:
+        # the stand-in gets a new port every run, so only real GitHub ETags are worth keeping
+        layers = [RateLimitLayer(rate_budget, url), *http_cache_layers(pytestconfig, "github")]
+    users, repos = pytestconfig.stash.get(lookups_key, ((), ()))
+    if pytestconfig.getoption("github_graphql") and (users or repos):
+        from support.graphql import BatchLayer
+
+        layers.append(BatchLayer(users, repos))
+        pytestconfig.stash[batch_key] = layers[-1]
+    client = make_client(pytestconfig, "github", url, headers, layers=layers)
+    rate_budget.refresh(client)
+    return client
+
+
+@pytest.fixture(autouse=True)
+def github_budget(request, pytestconfig):
+    """Hold back a GitHub test until its rate-limit buckets can pay for it, and keep its calls aside while it runs."""
+    if "github" not in request.fixturenames:
+        yield
+        return
+    request.getfixturevalue("github")
+    from support.ratelimit import RateLimitExhausted
+
+    costs = github_costs(request.node)
+    try:
+        budget(pytestconfig).reserve(costs, pytestconfig.getoption("github_max_wait"), request.node.nodeid)
+    except RateLimitExhausted as exc:
+        pytest.fail(str(exc), pytrace=False)
+    yield
+    budget(pytestconfig).release(costs)
+
+
+def start_stand_in(name, store=None):
+    """Start the in-process stand-in for host ``name``; it serves until ``stop()``."""
+    from support.server import AsyncioServer, ThreadedServer
+
+    if name == "github":
+        from support.fake_github import FakeGitHub
+
+        return ThreadedServer(FakeGitHub()).start()
+    if name == "jsonplaceholder":
+        from support.fake_jsonplaceholder import FakeJSONPlaceholder
+
+        return ThreadedServer(FakeJSONPlaceholder(store=store)).start()
+    from support.fake_httpbin import FakeHttpbin
+
+    return AsyncioServer(FakeHttpbin()).start()
+
+
+def start_shared_stand_ins(config, items):
+    """Start once, for all the workers of a parallel run, the stand-ins ``items`` reach."""
+    stand_ins = {}
+    for name in HOSTS:
+        if name == "jsonplaceholder" and settings(config).state_dir:
+            # the durable store and its per-test cleanup belong to one process
+            continue
+        wanted = {f"{name}_server"} | ({name} if getattr(settings(config), f"{name}_url") == "local" else set())
+        if any(wanted & set(item.fixturenames) for item in items):
+            stand_ins[name] = start_stand_in(name)
+    return stand_ins
+
+
+def behind_fault_proxy(config, name, start):
+    """Serve the stand-in for ``name`` through a fault proxy; it forwards untouched until a test adds faults.
+
+    A parallel worker proxies the stand-in the controller started rather than
+    calling ``start``; the proxy, and so the faults a test adds, stay its own.
+    """
+    from support.faults import FaultProxy
+
+    shared = config.stash[stand_ins_key].get(name)
+    server = None if shared else start()
+    proxy = FaultProxy(shared or server.url, seed=settings(config).seed).start()
+    yield proxy
+    proxy.stop()
+    if server is not None:
+        server.stop()
+
+
+@pytest.fixture
+def faults(request, pytestconfig):
+    """Fault proxies of the stand-ins by host name: ``faults["jsonplaceholder"].add(status=503, times=1)``."""
+    from support.faults import FaultScripts
+
+    for name in HOSTS:
+        if name in request.fixturenames and getattr(settings(pytestconfig), f"{name}_url") != "local":
+            pytest.skip(f"faults are injected by the local stand-ins: run with --{name}-url local")
+    scripts = FaultScripts(lambda name: request.getfixturevalue(f"{name}_server"))
+    yield scripts
+    scripts.clear()
+
+
+@pytest.fixture(scope="session")
+def jsonplaceholder_store(pytestconfig):
+    """The durable store of the JSONPlaceholder stand-in with --state-dir, else None."""
+    state_dir = settings(pytestconfig).state_dir
+    if not state_dir:
+        yield None
+        return
+    from support.durable import DurableStore
+    from support.fake_jsonplaceholder import build_tables
+
+    store = DurableStore(state_dir, build_tables)
+    yield store
+    store.close()
+
+
+@pytest.fixture(scope="session")
+def jsonplaceholder_server(pytestconfig, jsonplaceholder_store):
+    yield from behind_fault_proxy(pytestconfig, "jsonplaceholder",
+                                  lambda: start_stand_in("jsonplaceholder", store=jsonplaceholder_store))
+
+
+@pytest.fixture(autouse=True)
+def clean_state(request, pytestconfig):
+    """With --state-dir, undo what a JSONPlaceholder test wrote once it is done."""
+    local = settings(pytestconfig).jsonplaceholder_url == "local"
+    fixtures = set(request.fixturenames)
+    uses_stand_in = "jsonplaceholder_server" in fixtures or local and "jsonplaceholder" in fixtures
+    if not uses_stand_in or not settings(pytestconfig).state_dir:
+        yield
+        return
+    store = request.getfixturevalue("jsonplaceholder_store")
+    yield
+    if store.log.records:
+        store.reset()
+        memo = pytestconfig.stash[memos_key].get("jsonplaceholder")
+        for name in store.tables if memo is not None else ():
+            memo.invalidate(name)
+
+
+@pytest.fixture(scope="session")
+def jsonplaceholder(pytestconfig, request):
+    url = settings(pytestconfig).jsonplaceholder_url
+    if url == "local":
+        url = request.getfixturevalue("jsonplaceholder_server").url
+    return make_client(pytestconfig, "jsonplaceholder", url)
+
+
+@pytest.fixture(scope="session")
+def httpbin_server(pytestconfig):
+    yield from behind_fault_proxy(pytestconfig, "httpbin", lambda: start_stand_in("httpbin"))
+
+
+@pytest.fixture(scope="session")
+def httpbin(pytestconfig, request):
+    url = settings(pytestconfig).httpbin_url
+    if url == "local":
+        url = request.getfixturevalue("httpbin_server").url
+    return make_client(pytestconfig, "httpbin", url)
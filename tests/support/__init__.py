@@ -0,0 +1 @@
+"""Shared helpers for the API test suite."""
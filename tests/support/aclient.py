@@ -0,0 +1,265 @@
+"""asyncio HTTP/1.1 client for tests that overlap independent requests.
+
+:class:`AsyncHostClient` mirrors :class:`support.client.HostClient` (base
+URL, default headers, ``get``/``post``/... by path) but sends requests on
+the running event loop over a pool of keep-alive connections, so one loop
+can keep thousands of requests in flight. Responses are ordinary
+``requests.Response`` objects, so tests read them the same way.
+
+Requests are prepared by ``requests`` itself (query string, JSON body,
+auth), so arguments mean the same thing as with the blocking client. The
+adapter layers of the blocking client (cassette, ETag cache, memoization)
+are not applied; ``response_hooks`` see every response instead, which is how
+the GitHub rate-limit budget stays up to date. Tests that must replay from
+a cassette wrap the blocking client in :class:`ThreadedClient` instead. ``listeners`` are called like
+those of :class:`support.client.PooledAdapter`; the TLS handshake is counted
+in ``connect``. ``timeout`` bounds each whole request, connection included,
+and raises ``TimeoutError`` when it runs out.
+"""
+import asyncio
+import http.client
+import io
+import socket
+import ssl
+import time
+import zlib
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+
+from support.client import DECODED_BODY_HEADERS, CallTimings, make_response
+
+
+class _Pool:
+    """Idle keep-alive connections to one origin, at most ``size`` open."""
+
+    def __init__(self, host, port, use_ssl, size):
+        self.host = host
+        self.port = port
+        self.ssl = ssl.create_default_context() if use_ssl else None
+        self.slots = asyncio.Semaphore(size)
+        self.idle = deque()
+        self.opened = 0
+
+    async def acquire(self, timings):
+        await self.slots.acquire()
+        while self.idle:
+            reader, writer = self.idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer, True
+            writer.close()
+        try:
+            return await self.connect(timings)
+        except BaseException:
+            # a refused, timed out or cancelled connect must not keep the slot
+            self.slots.release()
+            raise
+
+    async def connect(self, timings):
+        start = time.perf_counter()
+        infos = await asyncio.get_running_loop().getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)
+        resolved = time.perf_counter()
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        # every address in turn, as open_connection(host) would (IPv6 falling back to IPv4)
+        for n, address in enumerate(addresses, 1):
+            try:
+                reader, writer = await asyncio.open_connection(
+                    address, self.port, ssl=self.ssl, server_hostname=self.host if self.ssl else None,
+                    limit=2 ** 20)
+                break
+            except OSError as error:
+                # a TLS failure is the host's answer, not an unreachable address
+                if isinstance(error, ssl.SSLError) or n == len(addresses):
+                    raise
+        timings.dns = resolved - start
+        timings.connect = time.perf_counter() - resolved
+        self.opened += 1
+        return reader, writer, False
+
+    def release(self, reader, writer, reusable):
+        if reusable:
+            self.idle.append((reader, writer))
+        else:
+            writer.close()
+        self.slots.release()
+
+    def close(self):
+        while self.idle:
+            self.idle.pop()[1].close()
+
+
+async def _read_body(reader, headers, method, status):
+    if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+        return b""
+    if "chunked" in (headers.get("Transfer-Encoding") or "").lower():
+        chunks = []
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            if size == 0:
+                while (await reader.readuntil(b"\r\n")) != b"\r\n":
+                    pass
+                return b"".join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+    length = headers.get("Content-Length")
+    if length is not None:
+        return await reader.readexactly(int(length))
+    return await reader.read()
+
+
+def _decode(body, headers):
+    encoding = (headers.get("Content-Encoding") or "").lower()
+    if encoding == "gzip":
+        return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return zlib.decompress(body)
+    return body
+
+
+class AsyncHostClient:
+    def __init__(self, name, base_url, headers=None, max_connections=100, response_hooks=(), listeners=(),
+                 timeout=None):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.headers = dict(headers or {})
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.response_hooks = list(response_hooks)
+        self.listeners = list(listeners)
+        self.pools = {}
+
+    def url(self, path):
+        if path.startswith(("http://", "https://")):
+            return path
+        return self.base_url + path
+
+    def _pool(self, url):
+        parts = urlsplit(url)
+        use_ssl = parts.scheme == "https"
+        key = (parts.hostname, parts.port or (443 if use_ssl else 80), use_ssl)
+        if key not in self.pools:
+            self.pools[key] = _Pool(*key, self.max_connections)
+        return self.pools[key]
+
+    def _encode(self, prepared):
+        parts = urlsplit(prepared.url)
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        headers = {"Host": parts.netloc, "User-Agent": requests.utils.default_user_agent(),
+                   "Accept": "*/*", "Accept-Encoding": "gzip, deflate", "Connection": "keep-alive",
+                   **prepared.headers}
+        body = prepared.body or b""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        if body or prepared.method in ("POST", "PUT", "PATCH"):
+            headers["Content-Length"] = str(len(body))
+        lines = [f"{prepared.method} {target} HTTP/1.1", *(f"{k}: {v}" for k, v in headers.items())]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+    async def request(self, method, path, headers=None, **kwargs):
+        prepared = requests.Request(method, self.url(path), headers={**self.headers, **(headers or {})},
+                                    **kwargs).prepare()
+        exchange = self._exchange(prepared)
+        if self.timeout is None:
+            return await exchange
+        return await asyncio.wait_for(exchange, self.timeout)
+
+    async def _exchange(self, prepared):
+        method = prepared.method
+        pool = self._pool(prepared.url)
+        payload = self._encode(prepared)
+        timings = CallTimings()
+        reader = writer = None
+        reusable = False
+        try:
+            reader, writer, reused = await pool.acquire(timings)
+            try:
+                start = time.perf_counter()
+                writer.write(payload)
+                await writer.drain()
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, ConnectionError):
+                if not reused:
+                    raise
+                # the server closed an idle keep-alive connection; retry once on a new one
+                writer.close()
+                reader, writer, _ = await pool.connect(timings)
+                start = time.perf_counter()
+                writer.write(payload)
+                await writer.drain()
+                head = await reader.readuntil(b"\r\n\r\n")
+            headers_at = time.perf_counter()
+            timings.ttfb = headers_at - start
+            status_line, _, header_block = head.partition(b"\r\n")
+            version, status, reason = (status_line.decode("latin-1").split(" ", 2) + [""])[:3]
+            response_headers = http.client.parse_headers(io.BytesIO(header_block))
+            body = await _read_body(reader, response_headers, method, int(status))
+            timings.download = time.perf_counter() - headers_at
+            reusable = (version == "HTTP/1.1"
+                        and (response_headers.get("Connection") or "").lower() != "close"
+                        and ("Content-Length" in response_headers
+                             or "chunked" in (response_headers.get("Transfer-Encoding") or "").lower()
+                             or not body))
+        finally:
+            # a failed acquire has already given its slot back
+            if writer is not None:
+                pool.release(reader, writer, reusable)
+        headers = {k: v for k, v in response_headers.items() if k.lower() not in DECODED_BODY_HEADERS}
+        response = make_response(prepared, int(status), headers, _decode(body, response_headers), reason)
+        timings.size = len(response.content)
+        for listener in self.listeners:
+            listener(prepared, response, timings)
+        for hook in self.response_hooks:
+            hook(response)
+        return response
+
+    async def get(self, path, **kwargs):
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request("POST", path, **kwargs)
+
+    async def put(self, path, **kwargs):
+        return await self.request("PUT", path, **kwargs)
+
+    async def patch(self, path, **kwargs):
+        return await self.request("PATCH", path, **kwargs)
+
+    async def delete(self, path, **kwargs):
+        return await self.request("DELETE", path, **kwargs)
+
+    async def aclose(self):
+        for pool in self.pools.values():
+            pool.close()
+
+
+class ThreadedClient:
+    """Async face of a blocking :class:`support.client.HostClient`.
+
+    Each request runs in a worker thread through every layer of the blocking
+    client (cassette, memoization, ETag cache, rate limit, retries, impact),
+    so a test can overlap a few calls with ``asyncio.gather`` and still
+    replay offline. Thousands of requests in flight want
+    :class:`AsyncHostClient` instead.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    async def request(self, method, path, **kwargs):
+        return await asyncio.to_thread(self.client.request, method, path, **kwargs)
+
+    async def get(self, path, **kwargs):
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request("POST", path, **kwargs)
+
+    async def put(self, path, **kwargs):
+        return await self.request("PUT", path, **kwargs)
+
+    async def patch(self, path, **kwargs):
+        return await self.request("PATCH", path, **kwargs)
+
+    async def delete(self, path, **kwargs):
+        return await self.request("DELETE", path, **kwargs)
@@ -0,0 +1,210 @@
+"""Load generation and baseline comparison for ``pytest --benchmark``.
+
+Two load models, both driven by one :class:`support.aclient.AsyncHostClient`
+on the session event loop:
+
+* closed loop: ``concurrency`` callers each send their next request as soon
+  as the previous one is answered, so throughput is what the server sustains;
+* open loop: requests start on a fixed schedule (``rate`` per second) no
+  matter how many are still in flight. Latency is measured from the
+  scheduled start, so a stalled server shows up as queueing instead of
+  quietly lowering the load.
+
+A benchmark runs its load model several times and keeps the median of each
+figure across the repeats, so one stalled repeat (a GC pause, a busy CI
+neighbour) does not move the result. It is compared with the stored
+baseline, one entry per ``<host> <method> <endpoint> <model>``, on the
+median latency rather than the p95: on a shared machine the tail of a
+millisecond-scale open loop moves several-fold between identical runs, the
+median does not. A regression must be both ``threshold`` slower and at
+least ``floor_ms`` slower, since a latency of a few milliseconds gains a
+quarter from scheduling noise alone; the p95 and p99 are still reported.
+"""
+import asyncio
+import itertools
+import json
+import os
+import statistics
+import time
+
+from support.latency import percentile
+
+
+class Endpoint:
+    """One endpoint under load; ``{id}`` in ``path`` or a ``params`` value cycles through ``ids``."""
+
+    def __init__(self, method, path, ids=range(1, 101), json=None, params=None):
+        self.method = method
+        self.path = path
+        self.ids = ids
+        self.json = json
+        self.params = params or {}
+
+    @property
+    def name(self):
+        return f"{self.method} {self.path}"
+
+    def request(self, client, n):
+        item = self.ids[n % len(self.ids)]
+        params = {key: value.format(id=item) if isinstance(value, str) else value
+                  for key, value in self.params.items()}
+        return client.request(self.method, self.path.format(id=item), json=self.json, params=params or None)
+
+
+# the JSONPlaceholder endpoints the day 1 and day 2 tests call
+JSONPLACEHOLDER_ENDPOINTS = [
+    Endpoint("GET", "/posts/{id}"),
+    Endpoint("GET", "/posts/{id}/comments"),
+    Endpoint("GET", "/users/{id}/todos", ids=range(1, 11)),
+    Endpoint("GET", "/todos/{id}", ids=range(1, 201)),
+    Endpoint("GET", "/comments/{id}", ids=range(1, 501)),
+    Endpoint("POST", "/posts", json={"userId": 1, "title": "titulo do post", "body": "body do post"}),
+    Endpoint("PUT", "/posts/{id}", json={"userId": 1, "title": "novo titulo", "body": "novo body"}),
+    Endpoint("PATCH", "/todos/{id}", ids=range(1, 201), json={"completed": True}),
+    Endpoint("DELETE", "/comments/{id}", ids=range(1, 501)),
+]
+
+# the GitHub lookups the day 1 tests make, against the local stand-in
+GITHUB_ENDPOINTS = [
+    Endpoint("GET", "/users/{id}", ids=["octocat", "torvalds", "google", "facebook", "microsoft", "apple"]),
+    Endpoint("GET", "/repos/{id}", ids=["facebook/react", "torvalds/linux", "microsoft/vscode", "apple/swift"]),
+    Endpoint("GET", "/search/repositories", params={"q": "{id}", "per_page": 5},
+             ids=["language:python", "react", "license:mit", "language:go stars:>1000", "framework"]),
+]
+
+
+class LoadResult:
+    def __init__(self, model, latencies, errors, elapsed):
+        self.model = model
+        self.latencies = sorted(latencies)
+        self.errors = errors
+        self.elapsed = elapsed
+
+    def summary(self):
+        ok = self.latencies or [0.0]
+        return {
+            "model": self.model,
+            "requests": len(self.latencies) + self.errors,
+            "errors": self.errors,
+            "throughput": len(self.latencies) / self.elapsed if self.elapsed else 0.0,
+            "p50_ms": percentile(ok, 50) * 1000,
+            "p95_ms": percentile(ok, 95) * 1000,
+            "p99_ms": percentile(ok, 99) * 1000,
+        }
+
+
+def combine(summaries):
+    """One summary for several repeats of a load model: medians, and the total requests and errors."""
+    combined = {"model": summaries[0]["model"],
+                "requests": sum(summary["requests"] for summary in summaries),
+                "errors": sum(summary["errors"] for summary in summaries)}
+    for key in ("throughput", "p50_ms", "p95_ms", "p99_ms"):
+        combined[key] = statistics.median(summary[key] for summary in summaries)
+    return combined
+
+
+async def _timed(endpoint, client, n, started, latencies):
+    try:
+        response = await endpoint.request(client, n)
+    except (OSError, asyncio.IncompleteReadError):
+        return False
+    if response.status_code >= 400:
+        return False
+    latencies.append(time.perf_counter() - started)
+    return True
+
+
+async def closed_loop(client, endpoint, concurrency, duration):
+    latencies = []
+    errors = 0
+    counter = itertools.count()
+    deadline = time.perf_counter() + duration
+
+    async def caller():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            if not await _timed(endpoint, client, next(counter), time.perf_counter(), latencies):
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    return LoadResult(f"closed/{concurrency}", latencies, errors, time.perf_counter() - start)
+
+
+async def open_loop(client, endpoint, rate, duration):
+    latencies = []
+    tasks = []
+    start = time.perf_counter()
+    for n in range(int(rate * duration)):
+        scheduled = start + n / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(_timed(endpoint, client, n, scheduled, latencies)))
+    outcomes = await asyncio.gather(*tasks)
+    return LoadResult(f"open/{rate:g}rps", latencies, outcomes.count(False), time.perf_counter() - start)
+
+
+class Benchmark:
+    """Runs one load model against an endpoint and checks it with the baseline."""
+
+    def __init__(self, baseline, threshold, duration, concurrency, rate, repeats=3, floor_ms=5.0):
+        self.baseline = baseline
+        self.threshold = threshold
+        self.duration = duration
+        self.concurrency = concurrency
+        self.rate = rate
+        self.repeats = repeats
+        self.floor_ms = floor_ms
+
+    async def run(self, client, endpoint, model):
+        """Spread ``duration`` over the repeats and compare their combined summary."""
+        duration = self.duration / self.repeats
+        summaries = []
+        for _ in range(self.repeats):
+            if model == "closed":
+                result = await closed_loop(client, endpoint, self.concurrency, duration)
+            else:
+                result = await open_loop(client, endpoint, self.rate, duration)
+            summaries.append(result.summary())
+        summary = combine(summaries)
+        name = f"{client.name} {endpoint.name} {summary['model']}"
+        return summary, self.baseline.compare(name, summary, self.threshold, self.floor_ms)
+
+
+class Baseline:
+    """Benchmark summaries stored as JSON, keyed by benchmark name."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.results = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                self.entries = json.load(fh)
+
+    def compare(self, name, summary, threshold, floor_ms=0.0):
+        """Record ``summary``; return a message if its p50 regressed beyond ``threshold`` and ``floor_ms``."""
+        self.results[name] = summary
+        stored = self.entries.get(name)
+        if stored is None:
+            return None
+        limit = max(stored["p50_ms"] * (1 + threshold), stored["p50_ms"] + floor_ms)
+        if summary["p50_ms"] > limit:
+            return (f"{name}: p50 {summary['p50_ms']:.1f} ms exceeds baseline {stored['p50_ms']:.1f} ms "
+                    f"by more than {threshold:.0%} and {floor_ms:g} ms")
+        return None
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as fh:
+            json.dump({**self.entries, **self.results}, fh, indent=2, sort_keys=True)
+
+    def report(self):
+        lines = []
+        for name, row in self.results.items():
+            stored = self.entries.get(name)
+            change = f"{row['p50_ms'] / stored['p50_ms'] - 1:+7.0%}" if stored and stored["p50_ms"] else "    new"
+            lines.append(f"{name:<52} {row['throughput']:>8.0f}/s {row['p50_ms']:>7.1f} {row['p95_ms']:>7.1f} "
+                         f"{row['p99_ms']:>7.1f} ms {row['errors']:>4} err  p50 {change}")
+        return lines
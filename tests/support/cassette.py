@@ -0,0 +1,221 @@
+"""Record/replay of HTTP interactions ("cassettes").
+
+One cassette is kept per host as gzip-compressed JSON lines. On load every
+interaction is indexed by a hash of its request, so replay is a dict lookup
+no matter how many interactions the cassette holds.
+
+Modes:
+
+* ``live``: the cassette is not used at all.
+* ``record``: every request goes to the network and the cassette is rewritten.
+* ``replay``: requests are served only from the cassette; a miss is an error.
+* ``new_episodes``: known requests are replayed, unknown ones are recorded.
+
+A cassette is written to a temporary file and moved into place, so a reader
+never sees half a file. In a parallel run each worker saves only what it
+recorded to a file of its own (``episodes``) and the controller combines
+them with :func:`merge` once the workers are done, so no worker's
+recordings overwrite another's.
+"""
+import base64
+import gzip
+import hashlib
+import json
+import os
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+from support.client import DECODED_BODY_HEADERS, AdapterLayer, make_response
+from support.settings import MODES
+
+# never written to disk
+SCRUBBED_HEADERS = {"authorization", "cookie", "set-cookie"}
+
+
+class CassetteMiss(requests.exceptions.RequestException):
+    """Raised in replay mode when a request was never recorded."""
+
+
+def _body_bytes(body):
+    if body is None:
+        return b""
+    if isinstance(body, str):
+        return body.encode("utf-8")
+    return bytes(body)
+
+
+def normalize_url(url):
+    """URL with its query parameters sorted, so equivalent requests match."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path or "/", query, ""))
+
+
+def request_key(method, url, body=None):
+    digest = hashlib.sha1()
+    digest.update(method.upper().encode())
+    digest.update(b"\n")
+    digest.update(normalize_url(url).encode())
+    digest.update(b"\n")
+    digest.update(_body_bytes(body))
+    return digest.hexdigest()
+
+
+def _encode_body(data):
+    try:
+        return {"text": data.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"base64": base64.b64encode(data).decode("ascii")}
+
+
+def _decode_body(stored):
+    if "base64" in stored:
+        return base64.b64decode(stored["base64"])
+    return stored["text"].encode("utf-8")
+
+
+def build_response(request, interaction):
+    """Turn a stored interaction back into a ``requests.Response``."""
+    stored = interaction["response"]
+    return make_response(request, stored["status"], stored["headers"],
+                         _decode_body(stored["body"]), stored["reason"])
+
+
+def _read(path):
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh]
+
+
+def _write(path, interactions):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary = f"{path}.{os.getpid()}"
+    with gzip.open(temporary, "wt", encoding="utf-8") as fh:
+        for interaction in interactions:
+            fh.write(json.dumps(interaction, ensure_ascii=False, separators=(",", ":")))
+            fh.write("\n")
+    os.replace(temporary, path)
+
+
+def merge(path, episodes, keep=True):
+    """Append the interactions saved to each of ``episodes`` to the cassette at ``path``.
+
+    With ``keep=False`` (record mode) the cassette is rewritten from the
+    episodes alone.
+    """
+    interactions = _read(path) if keep and os.path.exists(path) else []
+    for episode in episodes:
+        interactions.extend(_read(episode))
+    _write(path, interactions)
+    return len(interactions)
+
+
+class Cassette:
+    """In-memory index of recorded interactions backed by one file.
+
+    With ``episodes``, :meth:`save` writes only the interactions recorded in
+    this session, to that file, and leaves ``path`` alone.
+    """
+
+    def __init__(self, path, episodes=None):
+        self.path = path
+        self.episodes = episodes
+        self.interactions = []
+        self.index = {}
+        self.played = {}
+        self.recorded = []
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return self
+        for interaction in _read(self.path):
+            self._add(interaction)
+        return self
+
+    def _add(self, interaction):
+        self.interactions.append(interaction)
+        self.index.setdefault(interaction["key"], []).append(interaction)
+
+    def find(self, key):
+        """Next recorded interaction for ``key``; the last one repeats."""
+        with self._lock:
+            recorded = self.index.get(key)
+            if not recorded:
+                return None
+            position = self.played.get(key, 0)
+            self.played[key] = position + 1
+            return recorded[min(position, len(recorded) - 1)]
+
+    def clear(self):
+        with self._lock:
+            self.interactions = []
+            self.index = {}
+            self.played = {}
+            self.dirty = True
+
+    def record(self, request, response):
+        interaction = {
+            "key": request_key(request.method, request.url, request.body),
+            "request": {
+                "method": request.method,
+                "url": request.url,
+                "headers": {k: v for k, v in request.headers.items()
+                            if k.lower() not in SCRUBBED_HEADERS},
+                "body": _encode_body(_body_bytes(request.body)),
+            },
+            "response": {
+                "status": response.status_code,
+                "reason": response.reason,
+                "headers": {k: v for k, v in response.headers.items()
+                            if k.lower() not in SCRUBBED_HEADERS | DECODED_BODY_HEADERS},
+                "body": _encode_body(response.content),
+            },
+        }
+        with self._lock:
+            self._add(interaction)
+            self.recorded.append(interaction)
+            self.dirty = True
+        return interaction
+
+    def save(self):
+        with self._lock:
+            if not self.dirty:
+                return
+            if self.episodes is not None:
+                _write(self.episodes, self.recorded)
+            else:
+                _write(self.path, self.interactions)
+            self.dirty = False
+
+
+class CassetteLayer(AdapterLayer):
+    """Adapter layer that records to / replays from a :class:`Cassette`."""
+
+    def __init__(self, cassette, mode):
+        super().__init__()
+        if mode not in MODES:
+            raise ValueError(f"unknown record mode {mode!r}, expected one of {MODES}")
+        self.cassette = cassette
+        self.mode = mode
+        if mode == "record":
+            cassette.clear()
+
+    def send(self, request, **kwargs):
+        if self.mode == "live":
+            return self.inner.send(request, **kwargs)
+        if self.mode in ("replay", "new_episodes"):
+            interaction = self.cassette.find(request_key(request.method, request.url, request.body))
+            if interaction is not None:
+                return build_response(request, interaction)
+            if self.mode == "replay":
+                raise CassetteMiss(f"{request.method} {request.url} is not in {self.cassette.path}")
+        response = self.inner.send(request, **kwargs)
+        self.cassette.record(request, response)
+        return response
+
+    def close(self):
+        self.cassette.save()
+        super().close()
@@ -0,0 +1,284 @@
+"""Pooled, keep-alive HTTP clients shared by the API tests.
+
+Each upstream host gets one ``requests.Session`` with its own connection
+pool, so a test run pays the TCP + TLS handshake once per pooled connection
+instead of once per request.
+"""
+import socket
+import threading
+import time
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.poolmanager import PoolManager
+from urllib3.util.connection import allowed_gai_family
+
+# headers that no longer describe a body once requests has decoded it
+DECODED_BODY_HEADERS = {"content-encoding", "transfer-encoding", "content-length"}
+
+
+def make_response(request, status, headers, body, reason=None, response_class=requests.Response):
+    """Build a ``requests.Response`` for ``request`` without touching the network."""
+    response = response_class()
+    response.status_code = status
+    response.reason = reason
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = body
+    response._content_consumed = True
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    return response
+
+
+class ConnectionStats:
+    """Counts requests and newly opened connections for one host."""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.connect_time = 0.0
+        self._lock = threading.Lock()
+
+    def add_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def add_connection(self, elapsed):
+        with self._lock:
+            self.connections += 1
+            self.connect_time += elapsed
+
+    @property
+    def reused(self):
+        return max(self.requests - self.connections, 0)
+
+    @property
+    def avg_connect(self):
+        return self.connect_time / self.connections if self.connections else 0.0
+
+    @property
+    def saved(self):
+        """Estimated seconds saved by reusing connections instead of reconnecting."""
+        return self.reused * self.avg_connect
+
+
+class CallTimings:
+    """Where the time of one network call went, in seconds.
+
+    ``dns``, ``connect`` (TCP) and ``tls`` stay 0 when a pooled connection
+    was reused. ``ttfb`` runs from sending the request to its response
+    headers; ``download`` is the time spent reading the body.
+    """
+
+    __slots__ = ("dns", "connect", "tls", "ttfb", "download", "size")
+
+    def __init__(self):
+        self.dns = self.connect = self.tls = self.ttfb = self.download = 0.0
+        self.size = 0
+
+    @property
+    def total(self):
+        return self.dns + self.connect + self.tls + self.ttfb + self.download
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+# timings of the call being sent on this thread, filled in by the connection
+_current = threading.local()
+
+
+def _timed_connection(connection_cls, stats):
+    class TimedConnection(connection_cls):
+        def _new_conn(self):
+            timings = getattr(_current, "timings", None) or CallTimings()
+            start = time.perf_counter()
+            try:
+                infos = socket.getaddrinfo(self._dns_host, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+                addresses = list(dict.fromkeys(info[4][0] for info in infos))
+            except socket.gaierror:
+                # let urllib3 resolve again and raise its own error
+                addresses = [self._dns_host]
+            resolved = time.perf_counter()
+            timings.dns = resolved - start
+            host = self._dns_host
+            try:
+                # every address in turn, as socket.create_connection would (IPv6 falling back to IPv4)
+                for n, address in enumerate(addresses, 1):
+                    self._dns_host = address
+                    try:
+                        sock = super()._new_conn()
+                        break
+                    except (ConnectTimeoutError, NewConnectionError):
+                        if n == len(addresses):
+                            raise
+            finally:
+                self._dns_host = host
+            timings.connect = time.perf_counter() - resolved
+            return sock
+
+        def connect(self):
+            timings = getattr(_current, "timings", None) or CallTimings()
+            start = time.perf_counter()
+            super().connect()
+            elapsed = time.perf_counter() - start
+            timings.tls = max(elapsed - timings.dns - timings.connect, 0.0)
+            stats.add_connection(elapsed)
+
+    return TimedConnection
+
+
+class _TimedPoolManager(PoolManager):
+    def __init__(self, *args, stats, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = stats
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        pool = super()._new_pool(scheme, host, port, request_context)
+        pool.ConnectionCls = _timed_connection(pool.ConnectionCls, self.stats)
+        return pool
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter that records how many connections (handshakes) it opens.
+
+    Each listener is called as ``listener(request, response, timings)`` after
+    every call that reached the network.
+    """
+
+    def __init__(self, stats, pool_size=10):
+        self.stats = stats
+        self.listeners = []
+        super().__init__(pool_connections=1, pool_maxsize=pool_size)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        self.poolmanager = _TimedPoolManager(
+            num_pools=connections,
+            maxsize=maxsize,
+            block=block,
+            stats=self.stats,
+            **pool_kwargs,
+        )
+
+    def send(self, request, **kwargs):
+        self.stats.add_request()
+        timings = _current.timings = CallTimings()
+        try:
+            start = time.perf_counter()
+            response = super().send(request, **kwargs)
+            headers_at = time.perf_counter()
+            if not kwargs.get("stream"):
+                # read the body here, where its download time can be measured
+                timings.size = len(response.content)
+        finally:
+            _current.timings = None
+        timings.ttfb = max(headers_at - start - timings.dns - timings.connect - timings.tls, 0.0)
+        timings.download = time.perf_counter() - headers_at
+        for listener in self.listeners:
+            listener(request, response, timings)
+        return response
+
+
+class AdapterLayer(BaseAdapter):
+    """Transport adapter stacked on top of another one.
+
+    Subclasses override ``send`` and call ``self.inner.send`` to reach the
+    network. ``inner`` is set by :meth:`HostClient.add_layer`.
+    """
+
+    inner = None
+
+    def send(self, request, **kwargs):
+        return self.inner.send(request, **kwargs)
+
+    def close(self):
+        self.inner.close()
+
+
+class HostClient:
+    """Session bound to a single API host.
+
+    Paths are resolved against ``base_url``; absolute URLs (for example the
+    ``Link`` header of a paginated response) are used as they are.
+    """
+
+    def __init__(self, name, base_url, headers=None, pool_size=10):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.stats = ConnectionStats()
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        self.adapter = PooledAdapter(self.stats, pool_size)
+        self.transport = self.adapter
+        self.session.mount(self.base_url + "/", self.transport)
+
+    def add_layer(self, layer):
+        """Put ``layer`` in front of the current transport and return it."""
+        layer.inner = self.transport
+        self.transport = layer
+        self.session.mount(self.base_url + "/", layer)
+        return layer
+
+    def url(self, path):
+        if path.startswith(("http://", "https://")):
+            return path
+        return self.base_url + path
+
+    def request(self, method, path, **kwargs):
+        return self.session.request(method, self.url(path), **kwargs)
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request("PUT", path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request("PATCH", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+class ClientRegistry:
+    """Creates one HostClient per host and keeps them for the session report."""
+
+    def __init__(self, pool_size=10):
+        self.pool_size = pool_size
+        self.clients = {}
+
+    def client(self, name, base_url, headers=None):
+        if name not in self.clients:
+            self.clients[name] = HostClient(name, base_url, headers, self.pool_size)
+        return self.clients[name]
+
+    def close(self):
+        for client in self.clients.values():
+            client.close()
+
+    def report(self):
+        lines = []
+        for client in self.clients.values():
+            stats = client.stats
+            if not stats.requests:
+                continue
+            lines.append(
+                f"{client.name:<16} {stats.requests:>5} requests "
+                f"{stats.connections:>3} connections "
+                f"{stats.avg_connect * 1000:>8.1f} ms/handshake "
+                f"{stats.reused:>5} reused  ~{stats.saved:.2f}s saved"
+            )
+        return lines
@@ -0,0 +1,362 @@
+"""Durable state for the JSONPlaceholder stand-in.
+
+:class:`DurableStore` keeps the stand-in's tables in a directory:
+
+* ``snapshot.bin``: a compact image of every table, opened with ``mmap``.
+  Each table is its rows' JSON bytes back to back, a sorted ``uint64`` id
+  array, an ``(offset, length)`` array and, per secondary index, the id
+  lists of every value; a JSON footer locates them. Opening a snapshot only
+  parses the footer, so a table of millions of rows is ready at once and a
+  row is decoded when it is read.
+* ``wal.log``: one JSON line per write since the snapshot. Writers append
+  their record in order under the store lock and then wait outside it for
+  the record to be on disk; whoever finds no flush running writes and
+  fsyncs everything queued so far, so concurrent writes share one fsync
+  (group commit).
+
+Opening a store replays the log over the snapshot and compacts both into a
+new snapshot; :meth:`DurableStore.checkpoint` does the same every
+``checkpoint_every`` writes. :meth:`DurableStore.reset` drops every write
+since the last snapshot, which only means re-opening the mapped tables.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, MutableMapping
+
+from support.fake_jsonplaceholder import Table
+
+MAGIC = b"JPSNAP01"
+# footer length (uint64) and the magic end every snapshot
+TAIL = struct.Struct("<Q8s")
+
+
+class MappedRows(Mapping):
+    """Encoded rows of one snapshot table, by id, straight from the mapped file."""
+
+    def __init__(self, ids, spans, data):
+        self.ids = ids
+        self.spans = spans
+        self.data = data
+
+    def _position(self, row_id):
+        position = bisect_left(self.ids, row_id)
+        return position if position < len(self.ids) and self.ids[position] == row_id else None
+
+    def __getitem__(self, row_id):
+        position = self._position(row_id) if isinstance(row_id, int) else None
+        if position is None:
+            raise KeyError(row_id)
+        offset, length = self.spans[2 * position], self.spans[2 * position + 1]
+        return bytes(self.data[offset:offset + length])
+
+    def __contains__(self, row_id):
+        return isinstance(row_id, int) and self._position(row_id) is not None
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class Overlay(MutableMapping):
+    """Writes on top of a read-only ``base`` mapping; iterates in id order like the tables."""
+
+    def __init__(self, base):
+        self.base = base
+        self.changed = {}
+        self.deleted = set()
+        self._added = []  # ids not in base, kept sorted (new ids only ever grow)
+
+    def __getitem__(self, row_id):
+        if row_id in self.changed:
+            return self.changed[row_id]
+        if row_id in self.deleted:
+            raise KeyError(row_id)
+        return self.base[row_id]
+
+    def __contains__(self, row_id):
+        return row_id in self.changed or (row_id not in self.deleted and row_id in self.base)
+
+    def __setitem__(self, row_id, value):
+        if row_id not in self.changed and row_id not in self.base:
+            position = bisect_left(self._added, row_id)
+            if position == len(self._added) or self._added[position] != row_id:
+                self._added.insert(position, row_id)
+        self.deleted.discard(row_id)
+        self.changed[row_id] = value
+
+    def __delitem__(self, row_id):
+        if row_id not in self:
+            raise KeyError(row_id)
+        self.changed.pop(row_id, None)
+        if row_id in self.base:
+            self.deleted.add(row_id)
+        else:
+            self._added.remove(row_id)
+
+    def __iter__(self):
+        for row_id in self.base:
+            if row_id not in self.deleted:
+                yield row_id
+        yield from self._added
+
+    def __len__(self):
+        return len(self.base) - len(self.deleted) + len(self._added)
+
+
+class ParsedRows(MutableMapping):
+    """Rows decoded from ``encoded`` on first read."""
+
+    def __init__(self, encoded):
+        self.encoded = encoded
+        self._parsed = {}
+
+    def __getitem__(self, row_id):
+        row = self._parsed.get(row_id)
+        if row is None:
+            row = self._parsed[row_id] = json.loads(self.encoded[row_id])
+        return row
+
+    def __contains__(self, row_id):
+        return row_id in self.encoded
+
+    def __setitem__(self, row_id, row):
+        # the table stores the encoded row itself
+        self._parsed[row_id] = row
+
+    def __delitem__(self, row_id):
+        self._parsed.pop(row_id, None)
+
+    def __iter__(self):
+        return iter(self.encoded)
+
+    def __len__(self):
+        return len(self.encoded)
+
+
+def _write_array(out, values, typecode="Q"):
+    """Write ``values`` 8-byte aligned; returns ``(offset, count)``."""
+    out.write(b"\0" * (-out.tell() % 8))
+    offset = out.tell()
+    data = array(typecode, values)
+    out.write(data.tobytes())
+    return offset, len(data)
+
+
+def write_snapshot(path, tables):
+    """Write ``tables`` (name -> :class:`Table`) to ``path`` atomically."""
+    footer = {}
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as out:
+        out.write(MAGIC)
+        for name, table in tables.items():
+            ids, spans = array("Q"), array("Q")
+            data_offset = out.tell()
+            for row_id in table.encoded:
+                encoded = table.encoded[row_id]
+                ids.append(row_id)
+                spans.extend((out.tell() - data_offset, len(encoded)))
+                out.write(encoded)
+            meta = {"data": [data_offset, out.tell() - data_offset], "ids": _write_array(out, ids),
+                    "spans": _write_array(out, spans), "next_id": table.next_id, "indexes": {}}
+            for key, index in table.indexes.items():
+                values, postings, start = {}, array("Q"), 0
+                for value, posting in index.items():
+                    if len(posting):
+                        postings.extend(posting)
+                        values[value] = [start, len(posting)]
+                        start += len(posting)
+                meta["indexes"][key] = {"postings": _write_array(out, postings), "values": values}
+            footer[name] = meta
+        encoded_footer = json.dumps(footer).encode()
+        out.write(encoded_footer)
+        out.write(TAIL.pack(len(encoded_footer), MAGIC))
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp, path)
+
+
+class Snapshot:
+    """A snapshot file mapped into memory."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        length, magic = TAIL.unpack_from(self.map, len(self.map) - TAIL.size)
+        if magic != MAGIC or self.map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a stand-in snapshot")
+        start = len(self.map) - TAIL.size - length
+        self.footer = json.loads(self.map[start:start + length])
+        self.view = memoryview(self.map)
+
+    def _array(self, offset, count):
+        return self.view[offset:offset + 8 * count].cast("Q")
+
+    def tables(self):
+        """Fresh :class:`Table` objects over the mapped data; writes stay in memory."""
+        tables = {}
+        for name, meta in self.footer.items():
+            data_offset, data_length = meta["data"]
+            encoded = Overlay(MappedRows(self._array(*meta["ids"]), self._array(*meta["spans"]),
+                                         self.view[data_offset:data_offset + data_length]))
+            indexes = {}
+            for key, index in meta["indexes"].items():
+                postings = self._array(*index["postings"])
+                indexes[key] = {value: postings[start:start + count]
+                                for value, (start, count) in index["values"].items()}
+            tables[name] = Table.from_parts(ParsedRows(encoded), encoded, indexes, meta["next_id"])
+        return tables
+
+
+class WriteAheadLog:
+    """Append-only JSON-lines log with group commit."""
+
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self.file = open(path, "ab")
+        self.records = 0
+        self.commits = 0
+        self._cond = threading.Condition()
+        self._pending = []
+        self._written = 0
+        self._durable = 0
+        self._flushing = False
+
+    def write(self, record):
+        """Queue ``record`` after every record queued before it; returns its sequence number."""
+        line = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+        with self._cond:
+            self._pending.append(line)
+            self._written += 1
+            self.records += 1
+            return self._written
+
+    def sync(self, sequence):
+        """Return once record ``sequence`` is on disk, flushing the queue if no one else is."""
+        with self._cond:
+            while self._durable < sequence:
+                if self._flushing:
+                    self._cond.wait()
+                    continue
+                batch, self._pending, last = self._pending, [], self._written
+                self._flushing = True
+                self._cond.release()
+                try:
+                    self.file.write(b"".join(batch))
+                    self.file.flush()
+                    if self.fsync:
+                        os.fsync(self.file.fileno())
+                finally:
+                    self._cond.acquire()
+                    self._flushing = False
+                    self._cond.notify_all()
+                self._durable = last
+                self.commits += 1
+
+    def truncate(self):
+        with self._cond:
+            self.sync(self._written)
+            self.file.truncate(0)
+            self.file.seek(0)
+            self.records = 0
+
+    def close(self):
+        self.sync(self._written)
+        self.file.close()
+
+
+def read_log(path):
+    """Records of the log at ``path``; a torn last line, as left by a crash, is cut off."""
+    if not os.path.exists(path):
+        return []
+    records, good = [], 0
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+            if not line.endswith(b"\n"):
+                records.pop()
+                break
+            good += len(line)
+    if good != os.path.getsize(path):
+        os.truncate(path, good)
+    return records
+
+
+def apply(tables, record):
+    table = tables[record["table"]]
+    if record["op"] == "put":
+        table.put(record["row"])
+    else:
+        table.remove(record["id"])
+
+
+class DurableStore:
+    """The tables of a stand-in kept in ``directory``; ``seed_tables`` builds them the first time."""
+
+    def __init__(self, directory, seed_tables, fsync=True, checkpoint_every=50_000):
+        os.makedirs(directory, exist_ok=True)
+        self.snapshot_path = os.path.join(directory, "snapshot.bin")
+        self.log_path = os.path.join(directory, "wal.log")
+        self.checkpoint_every = checkpoint_every
+        self.lock = threading.RLock()
+        self.checkpoints = 0
+        self._local = threading.local()
+        if not os.path.exists(self.snapshot_path):
+            write_snapshot(self.snapshot_path, seed_tables())
+        self.snapshot = Snapshot(self.snapshot_path)
+        self.tables = self.snapshot.tables()
+        records = read_log(self.log_path)
+        for record in records:
+            apply(self.tables, record)
+        self.log = WriteAheadLog(self.log_path, fsync)
+        if records:
+            self.checkpoint()
+
+    def record(self, record):
+        """Log a write already applied to the tables; call with :attr:`lock` held."""
+        self._local.sequence = self.log.write(record)
+        if self.log.records >= self.checkpoint_every:
+            self.checkpoint()
+
+    def put(self, table, row):
+        self.tables[table].put(row)
+        self.record({"op": "put", "table": table, "row": row})
+
+    def remove(self, table, row_id):
+        self.tables[table].remove(row_id)
+        self.record({"op": "delete", "table": table, "id": row_id})
+
+    def sync(self):
+        """Wait until this thread's last write is durable."""
+        sequence = getattr(self._local, "sequence", None)
+        if sequence is not None:
+            self.log.sync(sequence)
+            self._local.sequence = None
+
+    def checkpoint(self):
+        """Compact the current tables into a new snapshot and start an empty log."""
+        with self.lock:
+            write_snapshot(self.snapshot_path, self.tables)
+            self.snapshot = Snapshot(self.snapshot_path)
+            self.tables = self.snapshot.tables()
+            self.log.truncate()
+            self.checkpoints += 1
+
+    def reset(self):
+        """Drop every write since the last snapshot."""
+        with self.lock:
+            self.log.truncate()
+            self.tables = self.snapshot.tables()
+
+    def close(self):
+        self.log.close()
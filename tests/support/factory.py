@@ -0,0 +1,155 @@
+"""Seeded, deterministic payloads for the write endpoints.
+
+:class:`PayloadFactory` builds post, comment, todo and user payloads that
+pass the :mod:`support.schema` checks (minus the ``id`` the server assigns).
+The same seed always produces the same sequence, so a failing sweep can be
+replayed exactly.
+
+Text comes from pools generated once per factory, and every resource has a
+preallocated template: single payloads are a template copy plus a few
+assignments, and :meth:`PayloadFactory.encoded` fills a pre-escaped JSON
+byte template with ``%``, so bulk bodies are produced without building a
+dict per item.
+"""
+import functools
+import json
+import random
+
+from support.fake_jsonplaceholder import LOREM, USERS
+
+POOL_BITS = 10
+POOL_SIZE = 1 << POOL_BITS
+MASK = POOL_SIZE - 1
+
+
+def _escaped(text):
+    """``text`` as the inside of a JSON string literal."""
+    return json.dumps(text, ensure_ascii=False)[1:-1]
+
+
+@functools.lru_cache(maxsize=None)
+def _text_pools(seed):
+    rng = random.Random(seed)
+
+    def words(low, high):
+        return " ".join(rng.choice(LOREM) for _ in range(rng.randint(low, high)))
+
+    pools = {
+        "titles": [words(3, 9) for _ in range(POOL_SIZE)],
+        "bodies": ["\n".join(words(6, 12) for _ in range(4)) for _ in range(POOL_SIZE)],
+        "names": [f"{rng.choice(USERS)[0].split()[0]} {rng.choice(LOREM).title()}" for _ in range(POOL_SIZE)],
+        "emails": [f"{rng.choice(LOREM)}.{rng.choice(LOREM)}{n}@{rng.choice(LOREM)}.biz"
+                   for n in range(POOL_SIZE)],
+    }
+    escaped = {name: [_escaped(text) for text in pool] for name, pool in pools.items()}
+    return pools, escaped
+
+
+class PayloadFactory:
+    """Payload generator; ``stream`` gives independent sequences over the same seed.
+
+    The text pools depend only on ``seed`` and are shared between factories.
+    """
+
+    def __init__(self, seed=1, stream=None, user_ids=range(1, 11), post_ids=range(1, 101)):
+        self.seed = seed
+        self.user_ids = user_ids
+        self.post_ids = post_ids
+        self.rng = random.Random(seed if stream is None else f"{seed}/{stream}")
+        pools, self._escaped = _text_pools(seed)
+        self.titles = pools["titles"]
+        self.bodies = pools["bodies"]
+        self.names = pools["names"]
+        self.emails = pools["emails"]
+        self.templates = {
+            "post": {"userId": 0, "title": "", "body": ""},
+            "comment": {"postId": 0, "name": "", "email": "", "body": ""},
+            "todo": {"userId": 0, "title": "", "completed": False},
+            "user": {"name": "", "username": "", "email": "", "phone": "", "website": "",
+                     "address": {"street": "", "suite": "", "city": "", "zipcode": "",
+                                 "geo": {}},
+                     "company": {"name": "", "catchPhrase": "", "bs": ""}},
+        }
+        self.byte_templates = {
+            "post": '{"userId":%d,"title":"%s","body":"%s"}',
+            "comment": '{"postId":%d,"name":"%s","email":"%s","body":"%s"}',
+            "todo": '{"userId":%d,"title":"%s","completed":%s}',
+        }
+
+    def _pick(self, pool):
+        """Random entry of one of the ``POOL_SIZE`` text pools."""
+        return pool[self.rng.getrandbits(POOL_BITS)]
+
+    def post(self, **overrides):
+        payload = self.templates["post"].copy()
+        payload["userId"] = self.rng.choice(self.user_ids)
+        payload["title"] = self._pick(self.titles)
+        payload["body"] = self._pick(self.bodies)
+        payload.update(overrides)
+        return payload
+
+    def comment(self, **overrides):
+        payload = self.templates["comment"].copy()
+        payload["postId"] = self.rng.choice(self.post_ids)
+        payload["name"] = self._pick(self.titles)
+        payload["email"] = self._pick(self.emails)
+        payload["body"] = self._pick(self.bodies)
+        payload.update(overrides)
+        return payload
+
+    def todo(self, **overrides):
+        payload = self.templates["todo"].copy()
+        payload["userId"] = self.rng.choice(self.user_ids)
+        payload["title"] = self._pick(self.titles)
+        payload["completed"] = bool(self.rng.getrandbits(1))
+        payload.update(overrides)
+        return payload
+
+    def user(self, **overrides):
+        template = self.templates["user"]
+        name = self._pick(self.names)
+        username = name.replace(" ", "_")
+        payload = {
+            **template,
+            "name": name,
+            "username": username,
+            "email": f"{username}@{self.rng.choice(LOREM)}.com",
+            "phone": f"{self.rng.randrange(100, 1000)}-{self.rng.randrange(100, 1000)}-"
+                     f"{self.rng.randrange(10000):04d}",
+            "website": f"{self.rng.choice(LOREM)}.org",
+            "address": {**template["address"], "street": self._pick(self.titles),
+                        "city": self.rng.choice(LOREM).title(), "zipcode": f"{self.rng.randrange(100000):05d}",
+                        "geo": {"lat": f"{self.rng.uniform(-90, 90):.4f}",
+                                "lng": f"{self.rng.uniform(-180, 180):.4f}"}},
+            "company": {"name": self._pick(self.names), "catchPhrase": self._pick(self.titles),
+                        "bs": self._pick(self.titles)},
+        }
+        payload.update(overrides)
+        return payload
+
+    def many(self, resource, count, **overrides):
+        """``count`` payloads of ``resource`` (``"post"``, ``"comment"``, ``"todo"`` or ``"user"``)."""
+        make = getattr(self, resource)
+        return [make(**overrides) for _ in range(count)]
+
+    def encoded(self, resource, count):
+        """``count`` JSON request bodies (bytes) for ``resource``, built from the byte templates."""
+        template = self.byte_templates[resource]
+        pools = self._escaped
+        rng = self.rng
+        # one draw per item, split into a pool index per text field
+        picks = [rng.getrandbits(3 * POOL_BITS) for _ in range(count)]
+        if resource == "post":
+            owners = rng.choices(self.user_ids, k=count)
+            rows = ((owner, pools["titles"][n & MASK], pools["bodies"][n >> POOL_BITS & MASK])
+                    for owner, n in zip(owners, picks))
+        elif resource == "comment":
+            owners = rng.choices(self.post_ids, k=count)
+            rows = ((owner, pools["titles"][n & MASK], pools["emails"][n >> POOL_BITS & MASK],
+                     pools["bodies"][n >> 2 * POOL_BITS & MASK])
+                    for owner, n in zip(owners, picks))
+        else:
+            owners = rng.choices(self.user_ids, k=count)
+            rows = ((owner, pools["titles"][n & MASK], "true" if n >> 3 * POOL_BITS - 1 else "false")
+                    for owner, n in zip(owners, picks))
+        return [(template % row).encode("utf-8") for row in rows]
@@ -0,0 +1,732 @@
+"""In-process stand-in for the GitHub REST API routes the suite uses.
+
+Serves ``/``, ``/users/{login}`` (plus ``/repos`` and ``/followers``),
+``/repos/{owner}/{repo}`` (plus ``/commits`` and ``/contributors``),
+``/repositories/{id}``, ``/licenses``, ``/emojis``, ``/rate_limit`` and
+``/search/repositories``, and ``POST /graphql`` for the ``repositoryOwner``,
+``user``, ``organization``, ``repository`` and ``rateLimit`` fields the
+batched lookups of :mod:`support.graphql` read. The accounts and repositories the tests name
+(octocat, torvalds, facebook/react, ...) are fixed records; around them a
+seeded corpus of synthetic users and repositories (100k by default) fills
+listings and search results.
+
+Like GitHub, every response carries ``X-RateLimit-*`` headers for its
+bucket (core, search or graphql, anonymous or authenticated; GraphQL
+answers 401 without a token, and a query costs one point), an empty bucket
+answers 403, list routes are paginated with ``per_page``/``page`` and a
+``Link`` header, and responses have a weak ``ETag``: a matching
+``If-None-Match`` gets a 304 that is not charged.
+
+Repositories are numbered by rank, most stars first, and search runs on an
+inverted index from ``license:``, ``language:``, ``user:``/``org:`` and
+text terms to sorted rank lists: a query intersects its shortest list
+against the others, ``stars:`` ranges are a bisection on the rank order,
+and best-match (star) order is the rank order itself, so a search over
+100k repositories takes about a millisecond. Repository bodies are built
+when first served.
+"""
+import base64
+import bisect
+import functools
+import hashlib
+import heapq
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlencode
+
+from support.graphql import GraphQLError, execute, parse
+from support.ratelimit import resource_for
+from support.server import Response, Router
+
+API = "https://api.github.com"
+EPOCH = 1199145600  # 2008-01-01, GitHub's launch year
+# bucket -> (authenticated limit, anonymous limit, window in seconds)
+RATE_LIMITS = {"core": (5000, 60, 3600), "search": (30, 10, 60), "graphql": (5000, 0, 3600)}
+MAX_PER_PAGE = 100
+# GitHub only pages through the first 1000 results of a search
+SEARCH_CAP = 1000
+
+# login, id, type, name, company, location, followers, following
+USERS = [
+    ("octocat", 583231, "User", "The Octocat", "@github", "San Francisco", 18000, 9),
+    ("torvalds", 1024025, "User", "Linus Torvalds", "Linux Foundation", "Portland, OR", 19000, 0),
+    ("google", 1342004, "Organization", "Google", None, "United States of America", 12000, 0),
+    ("microsoft", 6154722, "Organization", "Microsoft", None, "Redmond, WA", 15000, 0),
+    ("facebook", 69631, "Organization", "Meta", None, "Menlo Park, California", 9000, 0),
+    ("apple", 10639145, "Organization", "Apple", None, "Cupertino, CA", 5000, 0),
+    ("moby", 27259197, "Organization", "Moby", None, None, 1200, 0),
+    ("kubernetes", 13629408, "Organization", "Kubernetes", None, None, 4000, 0),
+    ("tensorflow", 15658638, "Organization", "TensorFlow", None, None, 7000, 0),
+    ("atom", 1089146, "Organization", "Atom", None, None, 2500, 0),
+]
+# owner, name, id, language, license, stars, forks, contributors, description
+REPOS = [
+    ("octocat", "Hello-World", 1296269, None, None, 2800, 2600, 3, "My first repository on GitHub!"),
+    ("facebook", "react", 10270250, "JavaScript", "mit", 232000, 47600, 450,
+     "The library for web and native user interfaces."),
+    ("torvalds", "linux", 2325298, "C", "gpl-2.0", 186000, 55000, 480, "Linux kernel source tree"),
+    ("microsoft", "vscode", 41881900, "TypeScript", "mit", 167000, 29800, 450, "Visual Studio Code"),
+    ("atom", "atom", 3228505, "JavaScript", "mit", 60500, 17400, 440,
+     "The hackable text editor"),
+    ("moby", "moby", 7691631, "Go", "apache-2.0", 69000, 18700, 470,
+     "The Moby Project - a collaborative project for the container ecosystem to assemble "
+     "container-based systems"),
+    ("tensorflow", "tensorflow", 45717250, "C++", "apache-2.0", 187000, 74300, 460,
+     "An Open Source Machine Learning Framework for Everyone"),
+    ("kubernetes", "kubernetes", 20580498, "Go", "apache-2.0", 112000, 40000, 480,
+     "Production-Grade Container Scheduling and Management"),
+    ("google", "guava", 20300177, "Java", "apache-2.0", 50400, 10900, 300,
+     "Google core libraries for Java"),
+    ("apple", "swift", 44838949, "C++", "apache-2.0", 67800, 10400, 460,
+     "The Swift Programming Language"),
+]
+# more of the organizations' real repositories, added after the synthetic ones so that adding one
+# leaves the seeded corpus as it was: facebook lists 153 repositories and ``.allstar`` heads google's
+EXTRA_REPOS = [
+    ("facebook", "react-native", 29028775, "C++", "mit", 121000, 24500, 470,
+     "A framework for building native applications using React"),
+    ("facebook", "jest", 15062869, "TypeScript", "mit", 44600, 6500, 450,
+     "Delightful JavaScript Testing."),
+    ("google", ".allstar", 397683930, None, "apache-2.0", 3, 2, 4, None),
+]
+# old names GitHub redirects to the repository's id
+RENAMED = {("moby", "docker"): 7691631}
+# synthetic repositories given to the organizations, so their listings paginate
+ORG_REPOS = {"google": 2500, "microsoft": 6000, "facebook": 150, "apple": 300, "kubernetes": 80,
+             "tensorflow": 40, "moby": 60, "atom": 90}
+
+LICENSES = [
+    ("agpl-3.0", "GNU Affero General Public License v3.0", "AGPL-3.0"),
+    ("apache-2.0", "Apache License 2.0", "Apache-2.0"),
+    ("bsd-2-clause", 'BSD 2-Clause "Simplified" License', "BSD-2-Clause"),
+    ("bsd-3-clause", 'BSD 3-Clause "New" or "Revised" License', "BSD-3-Clause"),
+    ("bsl-1.0", "Boost Software License 1.0", "BSL-1.0"),
+    ("cc0-1.0", "Creative Commons Zero v1.0 Universal", "CC0-1.0"),
+    ("epl-2.0", "Eclipse Public License 2.0", "EPL-2.0"),
+    ("gpl-2.0", "GNU General Public License v2.0", "GPL-2.0"),
+    ("gpl-3.0", "GNU General Public License v3.0", "GPL-3.0"),
+    ("lgpl-2.1", "GNU Lesser General Public License v2.1", "LGPL-2.1"),
+    ("mit", "MIT License", "MIT"),
+    ("mpl-2.0", "Mozilla Public License 2.0", "MPL-2.0"),
+    ("unlicense", "The Unlicense", "Unlicense"),
+]
+LANGUAGES = ["JavaScript", "Python", "TypeScript", "Java", "Go", "C++", "C", "Rust", "Ruby", "PHP",
+             "C#", "Shell", "Kotlin", "Swift", None]
+EMOJI = {
+    "+1": "1f44d", "-1": "1f44e", "100": "1f4af", "1234": "1f522", "bug": "1f41b", "eyes": "1f440",
+    "fire": "1f525", "heart": "2764", "rocket": "1f680", "smile": "1f604", "sparkles": "2728",
+    "tada": "1f389", "thumbsdown": "1f44e", "thumbsup": "1f44d", "warning": "26a0",
+    "white_check_mark": "2705", "x": "274c", "zap": "26a1",
+}
+PREFIXES = ("fast", "tiny", "open", "simple", "awesome", "micro", "smart", "async", "modern", "secure",
+            "cloud", "data", "web", "mobile", "neural", "quantum", "graph", "stream", "vector", "edge",
+            "auto", "hyper", "deep", "rapid", "pixel", "lambda", "atomic", "shadow", "silver", "easy")
+NOUNS = ("api", "cli", "sdk", "parser", "server", "client", "engine", "toolkit", "framework", "router",
+         "cache", "proxy", "compiler", "runtime", "dashboard", "bot", "scanner", "library", "plugin",
+         "theme", "docs", "config", "template", "starter", "demo", "tracker", "monitor", "pipeline",
+         "gateway", "store")
+VERBS = ("Fix", "Add", "Update", "Remove", "Refactor", "Speed up", "Document", "Test", "Rename", "Simplify")
+
+_TOKEN = re.compile(r"[a-z0-9+#]+(?:[.\-][a-z0-9+#]+)*")
+
+
+@functools.lru_cache(maxsize=None)
+def _tokens(text):
+    """Search terms of ``text``: whole hyphenated or dotted words and their parts."""
+    words = set(_TOKEN.findall(text.lower()))
+    return frozenset(words | {part for word in words for part in re.split(r"[.\-]", word) if part})
+
+
+def _timestamp(seconds):
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(seconds))
+
+
+def _node_id(kind, number):
+    return base64.b64encode(f"0{len(kind) + 1}:{kind}{number}".encode()).decode()
+
+
+def _not_found():
+    return Response.json({"message": "Not Found",
+                          "documentation_url": "https://docs.github.com/rest"}, status=404)
+
+
+def _default_branch(repo):
+    return "main" if repo.created > EPOCH + 12 * 365 * 86400 else "master"
+
+
+def _validation_failed(message, field="q", code="invalid"):
+    return Response.json({"message": message, "errors": [{"resource": "Search", "field": field, "code": code}],
+                          "documentation_url": "https://docs.github.com/rest/search"}, status=422)
+
+
+class User:
+    __slots__ = ("login", "id", "type", "name", "company", "location", "followers", "following", "created")
+
+    def __init__(self, login, user_id, kind, name, company, location, followers, following, created):
+        self.login = login
+        self.id = user_id
+        self.type = kind
+        self.name = name
+        self.company = company
+        self.location = location
+        self.followers = followers
+        self.following = following
+        self.created = created
+
+
+class Repo:
+    __slots__ = ("id", "owner", "name", "language", "license", "stars", "forks", "contributors",
+                 "description", "created", "pushed")
+
+    def __init__(self, repo_id, owner, name, language, license, stars, forks, contributors, description,
+                 created, pushed):
+        self.id = repo_id
+        self.owner = owner
+        self.name = name
+        self.language = language
+        self.license = license
+        self.stars = stars
+        self.forks = forks
+        self.contributors = contributors
+        self.description = description
+        self.created = created
+        self.pushed = pushed
+
+    @property
+    def full_name(self):
+        return f"{self.owner.login}/{self.name}"
+
+
+class RateLimits:
+    """Per-bucket quotas, kept apart for authenticated and anonymous callers."""
+
+    def __init__(self, limits=RATE_LIMITS, clock=time.time):
+        self.limits = limits
+        self.clock = clock
+        self.windows = {}
+        self._lock = threading.Lock()
+
+    def _window(self, resource, authenticated):
+        limit, anonymous, seconds = self.limits[resource]
+        now = self.clock()
+        window = self.windows.get((resource, authenticated))
+        if window is None or now >= window["reset"]:
+            window = {"limit": limit if authenticated else anonymous, "used": 0, "reset": int(now) + seconds}
+            self.windows[(resource, authenticated)] = window
+        return window
+
+    def peek(self, resource, authenticated):
+        with self._lock:
+            return dict(self._window(resource, authenticated))
+
+    def charge(self, resource, authenticated):
+        with self._lock:
+            window = self._window(resource, authenticated)
+            window["used"] += 1
+            return dict(window)
+
+    @staticmethod
+    def headers(resource, window):
+        return {"X-RateLimit-Limit": str(window["limit"]),
+                "X-RateLimit-Remaining": str(max(window["limit"] - window["used"], 0)),
+                "X-RateLimit-Reset": str(window["reset"]), "X-RateLimit-Used": str(window["used"]),
+                "X-RateLimit-Resource": resource}
+
+    def resources(self, authenticated):
+        resources = {}
+        for resource in self.limits:
+            window = self.peek(resource, authenticated)
+            resources[resource] = {"limit": window["limit"], "used": window["used"],
+                                   "remaining": max(window["limit"] - window["used"], 0),
+                                   "reset": window["reset"]}
+        return resources
+
+
+class SearchIndex:
+    """Inverted index from search terms to repository ranks, kept sorted."""
+
+    def __init__(self, repos):
+        # rank lists per distinct field value first: synthetic names, descriptions and
+        # owners repeat a lot, so each value is tokenized and keyed once
+        values = {field: defaultdict(list) for field in ("user", "license", "language", "text")}
+        for rank, repo in enumerate(repos):
+            values["user"][repo.owner.login].append(rank)
+            values["license"][repo.license].append(rank)
+            values["language"][repo.language].append(rank)
+            values["text"][repo.name].append(rank)
+            values["text"][repo.description].append(rank)
+        postings = defaultdict(list)
+        for field in ("user", "license", "language"):
+            for value, ranks in values[field].items():
+                postings[field, (value or "none").lower()].extend(ranks)
+        for value, ranks in values["text"].items():
+            for token in _tokens(value) if value else ():
+                postings["text", token].extend(ranks)
+        for field, value in (("language", LANGUAGES), ("license", [key for key, _, _ in LICENSES])):
+            for name in value:
+                for token in _tokens(name) if name else ():
+                    postings["text", token].extend(postings.get((field, name.lower()), ()))
+        # a token can come from several fields of one repository
+        self.postings = {key: sorted(set(ranks)) for key, ranks in postings.items()}
+        # -stars per rank, ascending, for bisecting ``stars:`` ranges
+        self.neg_stars = [-repo.stars for repo in repos]
+        self._sets = {}
+
+    def _set(self, key):
+        if key not in self._sets:
+            self._sets[key] = frozenset(self.postings.get(key, ()))
+        return self._sets[key]
+
+    def star_ranks(self, condition):
+        """Half-open rank interval of the repositories whose stars satisfy ``condition``."""
+        low, high = 0, float("inf")
+        if ".." in condition:
+            start, _, end = condition.partition("..")
+            low = int(start) if start not in ("", "*") else 0
+            high = int(end) if end not in ("", "*") else high
+        elif condition.startswith(">="):
+            low = int(condition[2:])
+        elif condition.startswith(">"):
+            low = int(condition[1:]) + 1
+        elif condition.startswith("<="):
+            high = int(condition[2:])
+        elif condition.startswith("<"):
+            high = int(condition[1:]) - 1
+        else:
+            low = high = int(condition)
+        start = bisect.bisect_left(self.neg_stars, -high) if high != float("inf") else 0
+        return start, bisect.bisect_right(self.neg_stars, -low)
+
+    def search(self, keys, stars=None):
+        """Sorted ranks matching every key in ``keys`` and the ``(start, stop)`` interval ``stars``."""
+        start, stop = stars or (0, len(self.neg_stars))
+        if not keys:
+            return range(start, stop)
+        shortest, *others = sorted(keys, key=lambda key: len(self.postings.get(key, ())))
+        ranks = self.postings.get(shortest, [])
+        if stars is not None:
+            ranks = ranks[bisect.bisect_left(ranks, start):bisect.bisect_left(ranks, stop)]
+        for key in others:
+            members = self._set(key)
+            ranks = [rank for rank in ranks if rank in members]
+        return ranks
+
+
+def build_corpus(seed=1, repos=100_000, users=20_000):
+    """Users by login and repositories ordered by rank (most stars first)."""
+    rng = random.Random(seed)
+    accounts = {}
+    for login, user_id, kind, name, company, location, followers, following in USERS:
+        accounts[login.lower()] = User(login, user_id, kind, name, company, location, followers, following,
+                                       EPOCH + rng.randrange(4 * 365 * 86400))
+    # indexing with random() is several times faster than choice() and randrange() at this size
+    draw = rng.random
+    synthetic_users = []
+    for n in range(users):
+        user = User(f"dev{n}", 200_000_000 + n, "User",
+                    f"{PREFIXES[int(draw() * 30)].title()} {NOUNS[int(draw() * 30)].title()}", None, None,
+                    int(draw() * 50), int(draw() * 50), EPOCH + int(draw() * 15 * 365 * 86400))
+        accounts[user.login] = user
+        synthetic_users.append(user)
+
+    listed = []
+    for owner, name, repo_id, language, license, stars, forks, contributors, description in REPOS:
+        created = EPOCH + rng.randrange(6 * 365 * 86400)
+        listed.append(Repo(repo_id, accounts[owner], name, language, license, stars, forks, contributors,
+                           description, created, created + rng.randrange(10 * 365 * 86400)))
+    owners = [accounts[login] for login, count in ORG_REPOS.items() for _ in range(count)]
+    taken = {(repo.owner.login, repo.name) for repo in listed}
+    licenses = [key for key, _, _ in LICENSES] + [None] * 6
+    descriptions = {}
+    for n in range(max(repos - len(listed), 0)):
+        owner = owners[n] if n < len(owners) else synthetic_users[int(draw() * users)]
+        prefix, noun = PREFIXES[int(draw() * 30)], NOUNS[int(draw() * 30)]
+        name = f"{prefix}-{noun}"
+        if (owner.login, name) in taken:
+            name = f"{name}-{n}"
+        taken.add((owner.login, name))
+        language = LANGUAGES[int(draw() * len(LANGUAGES))]
+        stars = min(int(rng.paretovariate(1.1)) - 1, 150_000)
+        created = EPOCH + int(draw() * 15 * 365 * 86400)
+        description = None
+        if draw() < 0.9:
+            key = (prefix, noun, language)
+            if key not in descriptions:
+                descriptions[key] = f"{prefix.title()} {noun} for {language or 'everyone'}"
+            description = descriptions[key]
+        listed.append(Repo(300_000_000 + n, owner, name, language, licenses[int(draw() * len(licenses))], stars,
+                           stars // (3 + int(draw() * 10)), 1 + stars % 40, description, created,
+                           created + int(draw() * 86400 * 365)))
+    for owner, name, repo_id, language, license, stars, forks, contributors, description in EXTRA_REPOS:
+        created = EPOCH + random.Random(repo_id).randrange(10 * 365 * 86400)
+        listed.append(Repo(repo_id, accounts[owner], name, language, license, stars, forks, contributors,
+                           description, created, created + 86400 * 365))
+    # ties keep generation order, so the ranks only depend on the seed
+    listed.sort(key=lambda repo: -repo.stars)
+    return accounts, synthetic_users, listed
+
+
+class FakeGitHub:
+    """Request handler implementing the GitHub routes, rate limits, pagination and ETags."""
+
+    def __init__(self, seed=1, repos=100_000, users=20_000, rate_limits=RATE_LIMITS):
+        self.accounts, self.synthetic_users, self.repos = build_corpus(seed, repos, users)
+        self.by_name = {(repo.owner.login.lower(), repo.name.lower()): rank for rank, repo in enumerate(self.repos)}
+        self.by_id = {repo.id: rank for rank, repo in enumerate(self.repos)}
+        self.index = SearchIndex(self.repos)
+        self.limits = RateLimits(rate_limits)
+        self.repo_body = functools.lru_cache(maxsize=20_000)(self._repo_body)
+        self.router = Router()
+        self.router.add("GET", "/", self.root)
+        self.router.add("GET", "/rate_limit", self.rate_limit)
+        self.router.add("GET", "/users/{login}", self.user)
+        self.router.add("GET", "/users/{login}/repos", self.user_repos)
+        self.router.add("GET", "/users/{login}/followers", self.followers)
+        self.router.add("GET", "/repos/{owner}/{repo}", self.repo)
+        self.router.add("GET", "/repos/{owner}/{repo}/commits", self.commits)
+        self.router.add("GET", "/repos/{owner}/{repo}/contributors", self.contributors)
+        self.router.add("GET", "/repositories/{repo_id}", self.repository)
+        self.router.add("GET", "/licenses", self.licenses)
+        self.router.add("GET", "/licenses/{key}", self.license)
+        self.router.add("GET", "/emojis", self.emojis)
+        self.router.add("GET", "/search/repositories", self.search_repositories)
+        self.router.add("POST", "/graphql", self.graphql)
+
+    def __call__(self, request):
+        resource = resource_for(request.path)
+        authenticated = bool(request.headers.get("Authorization"))
+        if resource is None:
+            return self.router(request)
+        if resource == "graphql" and not authenticated:
+            return Response.json({"message": "This endpoint requires you to be authenticated.",
+                                  "documentation_url": "https://docs.github.com/graphql"}, status=401)
+        window = self.limits.peek(resource, authenticated)
+        if window["used"] >= window["limit"]:
+            return Response.json({"message": "API rate limit exceeded",
+                                  "documentation_url": "https://docs.github.com/rest/rate-limit"},
+                                 status=403, headers=RateLimits.headers(resource, window))
+        response = self.router(request)
+        if response.status == 200 and request.method == "GET":
+            etag = f'W/"{hashlib.blake2b(response.body, digest_size=16).hexdigest()}"'
+            response.headers["ETag"] = etag
+            if request.headers.get("If-None-Match") == etag:
+                # conditional hits are free on GitHub
+                response = Response(304, headers={"ETag": etag})
+                response.headers.update(RateLimits.headers(resource, window))
+                return response
+        response.headers.update(RateLimits.headers(resource, self.limits.charge(resource, authenticated)))
+        return response
+
+    # -- JSON bodies -------------------------------------------------------
+
+    def _owner(self, user):
+        kind = "User" if user.type == "User" else "Organization"
+        return {"login": user.login, "id": user.id, "node_id": _node_id(kind, user.id),
+                "avatar_url": f"https://avatars.githubusercontent.com/u/{user.id}?v=4", "gravatar_id": "",
+                "url": f"{API}/users/{user.login}", "html_url": f"https://github.com/{user.login}",
+                "followers_url": f"{API}/users/{user.login}/followers",
+                "repos_url": f"{API}/users/{user.login}/repos", "type": user.type, "site_admin": False}
+
+    def _license(self, key):
+        for license_key, name, spdx_id in LICENSES:
+            if license_key == key:
+                return {"key": key, "name": name, "spdx_id": spdx_id, "url": f"{API}/licenses/{key}",
+                        "node_id": _node_id("License", LICENSES.index((license_key, name, spdx_id)))}
+        return None
+
+    def _repo_body(self, rank):
+        repo = self.repos[rank]
+        url = f"{API}/repos/{repo.full_name}"
+        return json.dumps({
+            "id": repo.id, "node_id": _node_id("Repository", repo.id), "name": repo.name,
+            "full_name": repo.full_name, "private": False, "owner": self._owner(repo.owner),
+            "html_url": f"https://github.com/{repo.full_name}", "description": repo.description,
+            "fork": False, "url": url, "commits_url": f"{url}/commits{{/sha}}",
+            "contributors_url": f"{url}/contributors", "created_at": _timestamp(repo.created),
+            "updated_at": _timestamp(repo.pushed), "pushed_at": _timestamp(repo.pushed),
+            "homepage": None, "size": repo.stars % 100_000 + 10, "stargazers_count": repo.stars,
+            "watchers_count": repo.stars, "language": repo.language, "forks_count": repo.forks,
+            "archived": False, "disabled": False, "open_issues_count": repo.stars // 50,
+            "license": self._license(repo.license), "topics": [], "visibility": "public",
+            "forks": repo.forks, "open_issues": repo.stars // 50, "watchers": repo.stars,
+            "default_branch": _default_branch(repo),
+        }, ensure_ascii=False).encode("utf-8")
+
+    def _user_body(self, user):
+        return {**self._owner(user), "name": user.name, "company": user.company, "blog": "",
+                "location": user.location, "email": None, "bio": None,
+                "public_repos": len(self.index.postings.get(("user", user.login.lower()), ())),
+                "public_gists": 0, "followers": user.followers, "following": user.following,
+                "created_at": _timestamp(user.created), "updated_at": _timestamp(user.created + 86400 * 365)}
+
+    # -- pagination --------------------------------------------------------
+
+    def _page(self, request, total, cap=None):
+        """``(start, stop, headers)`` of the requested page of ``total`` items, or None past the cap."""
+        try:
+            per_page = min(max(int(request.arg("per_page", 30)), 1), MAX_PER_PAGE)
+            page = max(int(request.arg("page", 1)), 1)
+        except ValueError:
+            per_page, page = 30, 1
+        reachable = min(total, cap) if cap else total
+        if cap and (page - 1) * per_page >= cap and total > cap:
+            return None
+        last = max((reachable + per_page - 1) // per_page, 1)
+
+        def link(number, rel):
+            query = {name: values for name, values in request.query.items() if name != "page"}
+            query["page"] = [str(number)]
+            return f'<http://{request.headers.get("Host")}{request.path}?{urlencode(query, doseq=True)}>; rel="{rel}"'
+
+        links = []
+        if page > 1:
+            links.append(link(min(page - 1, last), "prev"))
+        if page < last:
+            links.extend([link(page + 1, "next"), link(last, "last")])
+        if page > 1:
+            links.append(link(1, "first"))
+        start = (page - 1) * per_page
+        return start, min(start + per_page, reachable), {"Link": ", ".join(links)} if links else {}
+
+    # -- routes ------------------------------------------------------------
+
+    def root(self, request):
+        return Response.json({"current_user_url": f"{API}/user", "emojis_url": f"{API}/emojis",
+                              "rate_limit_url": f"{API}/rate_limit", "user_url": f"{API}/users/{{user}}",
+                              "repository_url": f"{API}/repos/{{owner}}/{{repo}}",
+                              "repository_search_url": f"{API}/search/repositories?q={{query}}{{&page,per_page,sort,order}}"})
+
+    def rate_limit(self, request):
+        resources = self.limits.resources(bool(request.headers.get("Authorization")))
+        return Response.json({"resources": resources, "rate": resources["core"]})
+
+    def user(self, request, login):
+        user = self.accounts.get(login.lower())
+        return _not_found() if user is None else Response.json(self._user_body(user))
+
+    def user_repos(self, request, login):
+        user = self.accounts.get(login.lower())
+        if user is None:
+            return _not_found()
+        ranks = self.index.postings.get(("user", user.login.lower()), [])
+        sort = request.arg("sort", "full_name")
+        keys = {"created": lambda rank: self.repos[rank].created, "updated": lambda rank: self.repos[rank].pushed,
+                "pushed": lambda rank: self.repos[rank].pushed}
+        key = keys.get(sort, lambda rank: self.repos[rank].name.lower())
+        direction = request.arg("direction", "asc" if sort == "full_name" else "desc")
+        ranks = sorted(ranks, key=key, reverse=direction == "desc")
+        start, stop, headers = self._page(request, len(ranks))
+        body = b"[" + b",".join(self.repo_body(rank) for rank in ranks[start:stop]) + b"]"
+        return Response.raw_json(body, headers=headers)
+
+    def _spread(self, seed, count):
+        """``count`` distinct synthetic users picked from ``seed``, for follower and contributor lists."""
+        pool = self.synthetic_users
+        step = 7919  # prime, so the walk visits every user before repeating
+        return [pool[(seed + k * step) % len(pool)] for k in range(min(count, len(pool)))]
+
+    def followers(self, request, login):
+        user = self.accounts.get(login.lower())
+        if user is None:
+            return _not_found()
+        total = min(user.followers, len(self.synthetic_users))
+        start, stop, headers = self._page(request, total)
+        picked = self._spread(user.id, stop)[start:stop]
+        return Response.json([self._owner(follower) for follower in picked], headers=headers)
+
+    def _find_repo(self, owner, repo):
+        return self.by_name.get((owner.lower(), repo.lower()))
+
+    def repo(self, request, owner, repo):
+        rank = self._find_repo(owner, repo)
+        if rank is None:
+            moved = RENAMED.get((owner.lower(), repo.lower()))
+            if moved is None:
+                return _not_found()
+            location = f"http://{request.headers.get('Host')}/repositories/{moved}"
+            return Response.json({"message": "Moved Permanently", "url": location}, status=301,
+                                 headers={"Location": location})
+        return Response.raw_json(self.repo_body(rank))
+
+    def repository(self, request, repo_id):
+        rank = self.by_id.get(int(repo_id)) if repo_id.isdigit() else None
+        return _not_found() if rank is None else Response.raw_json(self.repo_body(rank))
+
+    def commits(self, request, owner, repo):
+        rank = self._find_repo(owner, repo)
+        if rank is None:
+            return _not_found()
+        repo = self.repos[rank]
+        total = 1000 if repo.id < 300_000_000 else 1 + repo.stars % 97
+        start, stop, headers = self._page(request, total)
+        authors = self._spread(repo.id, max(repo.contributors, 1))
+        commits = []
+        for number in range(start, stop):
+            rng = random.Random(f"{repo.full_name}:{number}")
+            author = authors[rng.randrange(len(authors))]
+            sha = hashlib.blake2b(f"{repo.full_name}:{number}".encode(), digest_size=20).hexdigest()
+            parent = hashlib.blake2b(f"{repo.full_name}:{number + 1}".encode(), digest_size=20).hexdigest()
+            signature = {"name": author.name, "email": f"{author.login}@users.noreply.github.com",
+                         "date": _timestamp(repo.pushed - number * 3600 * 7)}
+            commits.append({
+                "sha": sha, "node_id": _node_id("Commit", sha),
+                "commit": {"author": signature, "committer": signature,
+                           "message": f"{rng.choice(VERBS)} {rng.choice(PREFIXES)} {rng.choice(NOUNS)}",
+                           "tree": {"sha": sha[::-1], "url": f"{API}/repos/{repo.full_name}/git/trees/{sha[::-1]}"},
+                           "url": f"{API}/repos/{repo.full_name}/git/commits/{sha}", "comment_count": 0},
+                "url": f"{API}/repos/{repo.full_name}/commits/{sha}",
+                "html_url": f"https://github.com/{repo.full_name}/commit/{sha}",
+                "author": self._owner(author), "committer": self._owner(author),
+                "parents": [] if number == total - 1 else [{"sha": parent,
+                                                             "url": f"{API}/repos/{repo.full_name}/commits/{parent}"}],
+            })
+        return Response.json(commits, headers=headers)
+
+    def contributors(self, request, owner, repo):
+        rank = self._find_repo(owner, repo)
+        if rank is None:
+            return _not_found()
+        repo = self.repos[rank]
+        start, stop, headers = self._page(request, repo.contributors)
+        people = self._spread(repo.id, stop)
+        return Response.json([{**self._owner(people[k]), "contributions": max(5000 // (k + 1), 1)}
+                              for k in range(start, stop)], headers=headers)
+
+    def licenses(self, request):
+        return Response.json([self._license(key) for key, _, _ in LICENSES])
+
+    def license(self, request, key):
+        summary = self._license(key.lower())
+        if summary is None:
+            return _not_found()
+        return Response.json({**summary, "html_url": f"http://choosealicense.com/licenses/{summary['key']}/",
+                              "description": f"The {summary['name']}.", "featured": True,
+                              "body": f"{summary['name']}\n\nSee https://choosealicense.com/licenses/"
+                                      f"{summary['key']}/ for the full text.\n"})
+
+    def emojis(self, request):
+        return Response.json({name: f"https://github.githubassets.com/images/icons/emoji/unicode/{code}.png?v8"
+                              for name, code in EMOJI.items()})
+
+    def search_repositories(self, request):
+        query = request.arg("q", "").strip()
+        if not query:
+            return _validation_failed("Validation Failed", code="missing")
+        keys, stars = [], None
+        for term in re.findall(r'\S*"[^"]*"|\S+', query):
+            qualifier, _, value = term.partition(":")
+            value = value.strip('"').lower()
+            if value and qualifier in ("license", "language", "user", "org"):
+                keys.append(("user" if qualifier == "org" else qualifier, value))
+            elif value and qualifier == "stars":
+                try:
+                    stars = self.index.star_ranks(value)
+                except ValueError:
+                    return _validation_failed(f"Invalid stars qualifier: {value}")
+            else:
+                # a plain word, or a qualifier the stand-in does not know, is searched as text
+                keys.extend(("text", token) for token in _TOKEN.findall((value or term).lower()))
+        ranks = self.index.search(keys, stars)
+        page = self._page(request, len(ranks), cap=SEARCH_CAP)
+        if page is None:
+            return _validation_failed(f"Only the first {SEARCH_CAP} search results are available")
+        start, stop, headers = page
+        sort, order = request.arg("sort"), request.arg("order", "desc")
+        if sort in ("forks", "updated"):
+            attribute = "forks" if sort == "forks" else "pushed"
+            pick = heapq.nlargest if order == "desc" else heapq.nsmallest
+            selected = pick(stop, ranks, key=lambda rank: getattr(self.repos[rank], attribute))[start:stop]
+        elif sort == "stars" and order == "asc":
+            selected = ranks[len(ranks) - stop:len(ranks) - start][::-1]
+        else:
+            selected = ranks[start:stop]
+        items = b",".join(self.repo_body(rank)[:-1] + b',"score":1.0}' for rank in selected)
+        body = b'{"total_count":%d,"incomplete_results":false,"items":[%s]}' % (len(ranks), items)
+        return Response.raw_json(body, headers=headers)
+
+    # -- GraphQL -----------------------------------------------------------
+
+    def _owner_node(self, user):
+        kind = "User" if user.type == "User" else "Organization"
+        public_repos = len(self.index.postings.get(("user", user.login.lower()), ()))
+        node = {"__typename": kind, "__implements": ("RepositoryOwner", "Node"), "login": user.login,
+                "id": _node_id(kind, user.id), "databaseId": user.id,
+                "avatarUrl": f"https://avatars.githubusercontent.com/u/{user.id}?v=4",
+                "url": f"https://github.com/{user.login}", "name": user.name, "location": user.location,
+                "email": "", "websiteUrl": None, "createdAt": _timestamp(user.created),
+                "updatedAt": _timestamp(user.created + 86400 * 365),
+                "repositories": lambda args: {"__typename": "RepositoryConnection", "totalCount": public_repos}}
+        if kind == "User":
+            node.update(isSiteAdmin=False, company=user.company, bio=None,
+                        followers={"__typename": "FollowerConnection", "totalCount": user.followers},
+                        following={"__typename": "FollowingConnection", "totalCount": user.following},
+                        gists=lambda args: {"__typename": "GistConnection", "totalCount": 0})
+        else:
+            node.update(description=None)
+        return node
+
+    def _repo_node(self, rank):
+        repo = self.repos[rank]
+        license = self._license(repo.license)
+        if license is not None:
+            license = {"__typename": "License", "key": license["key"], "name": license["name"],
+                       "spdxId": license["spdx_id"], "id": license["node_id"]}
+        return {"__typename": "Repository", "__implements": ("Node",), "databaseId": repo.id,
+                "id": _node_id("Repository", repo.id), "name": repo.name, "nameWithOwner": repo.full_name,
+                "isPrivate": False, "isFork": False, "isArchived": False, "isDisabled": False,
+                "description": repo.description, "url": f"https://github.com/{repo.full_name}",
+                "homepageUrl": None, "createdAt": _timestamp(repo.created), "updatedAt": _timestamp(repo.pushed),
+                "pushedAt": _timestamp(repo.pushed), "diskUsage": repo.stars % 100_000 + 10,
+                "stargazerCount": repo.stars, "forkCount": repo.forks, "owner": self._owner_node(repo.owner),
+                "primaryLanguage": repo.language and {"__typename": "Language", "name": repo.language},
+                "licenseInfo": license, "defaultBranchRef": {"__typename": "Ref", "name": _default_branch(repo)},
+                "issues": lambda args: {"__typename": "IssueConnection", "totalCount": repo.stars // 50},
+                "repositoryTopics": lambda args: {"__typename": "RepositoryTopicConnection", "nodes": []}}
+
+    def _query_root(self, request):
+        def owner(args, kind=None):
+            user = self.accounts.get(str(args.get("login", "")).lower())
+            if user is not None and kind in (None, user.type):
+                return self._owner_node(user)
+            if kind is None:
+                return None
+            raise GraphQLError(f"Could not resolve to a {kind} with the login of '{args.get('login')}'.",
+                               kind="NOT_FOUND")
+
+        def repository(args):
+            owner_login, name = str(args.get("owner", "")), str(args.get("name", ""))
+            rank = self._find_repo(owner_login, name)
+            if rank is None and (owner_login.lower(), name.lower()) in RENAMED:
+                # like the REST redirect, a renamed repository answers under its new name
+                rank = self.by_id.get(RENAMED[owner_login.lower(), name.lower()])
+            if rank is None:
+                raise GraphQLError(f"Could not resolve to a Repository with the name '{owner_login}/{name}'.",
+                                   kind="NOT_FOUND")
+            return self._repo_node(rank)
+
+        def rate_limit(args):
+            window = self.limits.peek("graphql", True)
+            return {"__typename": "RateLimit", "cost": 1, "limit": window["limit"],
+                    "remaining": max(window["limit"] - window["used"] - 1, 0), "used": window["used"] + 1,
+                    "resetAt": _timestamp(window["reset"])}
+
+        return {"__typename": "Query", "repositoryOwner": owner,
+                "user": lambda args: owner(args, "User"),
+                "organization": lambda args: owner(args, "Organization"),
+                "repository": repository, "rateLimit": rate_limit}
+
+    def graphql(self, request):
+        try:
+            query = request.json()["query"]
+        except (ValueError, KeyError, TypeError):
+            return Response.json({"message": "Problems parsing JSON",
+                                  "documentation_url": "https://docs.github.com/graphql"}, status=400)
+        try:
+            data, errors = execute(parse(query), self._query_root(request))
+        except GraphQLError as exc:
+            return Response.json({"errors": [exc.as_dict()]})
+        return Response.json({"data": data, "errors": errors} if errors else {"data": data})
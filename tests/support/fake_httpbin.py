@@ -0,0 +1,54 @@
+"""Stand-in for the httpbin.org endpoints used by the header and auth tests.
+
+Implements ``/headers``, ``/response-headers``, ``/basic-auth/{user}/{passwd}``
+and ``/bearer`` with httpbin's status codes and response bodies. It is meant
+to run on :class:`support.server.AsyncioServer`.
+"""
+import base64
+import binascii
+import json
+
+from support.server import JSON_TYPE, Response, Router
+
+
+def _title(name):
+    return "-".join(part.capitalize() for part in name.split("-"))
+
+
+class FakeHttpbin:
+    def __init__(self):
+        self.router = Router()
+        self.router.add("GET", "/headers", self.headers)
+        self.router.add("GET", "/response-headers", self.response_headers)
+        self.router.add("POST", "/response-headers", self.response_headers)
+        self.router.add("GET", "/basic-auth/{user}/{passwd}", self.basic_auth)
+        self.router.add("GET", "/bearer", self.bearer)
+
+    def __call__(self, request):
+        return self.router(request)
+
+    def headers(self, request):
+        return Response.json({"headers": {_title(name): value for name, value in request.headers.items()}})
+
+    def response_headers(self, request):
+        data = {"Content-Type": JSON_TYPE}
+        for name, values in request.query.items():
+            data[name] = values[0] if len(values) == 1 else values
+        headers = {name: ", ".join(values) for name, values in request.query.items()}
+        return Response(200, json.dumps(data).encode("utf-8"), {"Content-Type": JSON_TYPE, **headers})
+
+    def basic_auth(self, request, user, passwd):
+        scheme, _, credentials = (request.headers.get("Authorization") or "").partition(" ")
+        try:
+            decoded = base64.b64decode(credentials, validate=True).decode("utf-8")
+        except (binascii.Error, UnicodeDecodeError):
+            decoded = None
+        if scheme.lower() != "basic" or decoded != f"{user}:{passwd}":
+            return Response(401, headers={"WWW-Authenticate": 'Basic realm="Fake Realm"'})
+        return Response.json({"authenticated": True, "user": user})
+
+    def bearer(self, request):
+        scheme, _, token = (request.headers.get("Authorization") or "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return Response(401, headers={"WWW-Authenticate": "Bearer"})
+        return Response.json({"authenticated": True, "token": token})
@@ -0,0 +1,401 @@
+"""In-process stand-in for jsonplaceholder.typicode.com.
+
+Serves the six JSONPlaceholder resources with the same sizes and relations
+as the public service (10 users, 100 posts, 500 comments, 100 albums,
+5000 photos, 200 todos) and the same fake writes: POST answers 201 with the
+payload and a new id, PUT/PATCH echo the merged object and DELETE answers
+``{}``. Nothing is stored, unless the stand-in is given a durable store.
+
+Rows are generated from a fixed seed. Every table is keyed by id and has an
+index per foreign key and boolean column, and each row is JSON-encoded once
+up front, so nested routes such as ``/users/1/todos`` are a dict lookup plus
+a byte join.
+
+Lists take json-server's query parameters: ``?field=value`` filters
+(repeated values match any of them; values compare as strings, so
+``completed=true`` and ``userId=5`` work), ``_sort``/``_order``, ``_page``
+with ``_limit`` (a ``Link`` header and ``X-Total-Count``) and
+``_start``/``_end``/``_limit`` slices. Filters on indexed columns start from
+the shortest matching id list, so a filtered list costs time in proportion
+to its matches, not to the table.
+"""
+import json
+import random
+from bisect import bisect_left, insort
+from itertools import zip_longest
+from urllib.parse import urlencode
+
+from support.server import Response, Router
+
+LOREM = (
+    "lorem ipsum dolor sit amet consectetur adipisci velit sed quia non numquam eius modi "
+    "tempora incidunt ut labore et dolore magnam aliquam quaerat voluptatem enim ad minima "
+    "veniam quis nostrum exercitationem ullam corporis suscipit laboriosam nisi aliquid ex "
+    "ea commodi consequatur autem vel eum iure reprehenderit qui in voluptate esse quam nihil "
+    "molestiae illum fugiat quo voluptas nulla pariatur at vero eos accusamus iusto odio "
+    "dignissimos ducimus blanditiis praesentium deleniti atque corrupti quos dolores"
+).split()
+
+USERS = [
+    # name, username, email, street, suite, city, zipcode, lat, lng, phone, website,
+    # company, catchPhrase, bs
+    ("Leanne Graham", "Bret", "Sincere@april.biz", "Kulas Light", "Apt. 556", "Gwenborough",
+     "92998-3874", "-37.3159", "81.1496", "1-770-736-8031 x56442", "hildegard.org",
+     "Romaguera-Crona", "Multi-layered client-server neural-net", "harness real-time e-markets"),
+    ("Ervin Howell", "Antonette", "Shanna@melissa.tv", "Victor Plains", "Suite 879", "Wisokyburgh",
+     "90566-7771", "-43.9509", "-34.4618", "010-692-6593 x09125", "anastasia.net",
+     "Deckow-Crist", "Proactive didactic contingency", "synergize scalable supply-chains"),
+    ("Clementine Bauch", "Samantha", "Nathan@yesenia.net", "Douglas Extension", "Suite 847",
+     "McKenziehaven", "59590-4157", "-68.6102", "-47.0653", "1-463-123-4447", "ramiro.info",
+     "Romaguera-Jacobson", "Face to face bifurcated interface", "e-enable strategic applications"),
+    ("Patricia Lebsack", "Karianne", "Julianne.OConner@kory.org", "Hoeger Mall", "Apt. 692",
+     "South Elvis", "53919-4257", "29.4572", "-164.2990", "493-170-9623 x156", "kale.biz",
+     "Robel-Corkery", "Multi-tiered zero tolerance productivity", "transition cutting-edge web services"),
+    ("Chelsey Dietrich", "Kamren", "Lucio_Hettinger@annie.ca", "Skiles Walks", "Suite 351",
+     "Roscoeview", "33263", "-31.8129", "62.5342", "(254)954-1289", "demarco.info",
+     "Keebler LLC", "User-centric fault-tolerant solution", "revolutionize end-to-end systems"),
+    ("Mrs. Dennis Schulist", "Leopoldo_Corkery", "Karley_Dach@jasper.info", "Norberto Crossing",
+     "Apt. 950", "South Christy", "23505-1337", "-71.4197", "71.7478", "1-477-935-8478 x6430",
+     "ola.org", "Considine-Lockman", "Synchronised bottom-line interface", "e-enable innovative applications"),
+    ("Kurtis Weissnat", "Elwyn.Skiles", "Telly.Hoeger@billy.biz", "Rex Trail", "Suite 280",
+     "Howemouth", "58804-1099", "24.8918", "21.8984", "210.067.6132", "elvis.io",
+     "Johns Group", "Configurable multimedia task-force", "generate enterprise e-tailers"),
+    ("Nicholas Runolfsdottir V", "Maxime_Nienow", "Sherwood@rosamond.me", "Ellsworth Summit",
+     "Suite 729", "Aliyaview", "45169", "-14.3990", "-120.7677", "586.493.6943 x140",
+     "jacynthe.com", "Abernathy Group", "Implemented secondary concept", "e-enable extensible e-tailers"),
+    ("Glenna Reichert", "Delphine", "Chaim_McDermott@dana.io", "Dayna Park", "Suite 449",
+     "Bartholomebury", "76495-3109", "24.6463", "-168.8889", "(775)976-6794 x41206", "conrad.com",
+     "Yost and Sons", "Switchable contextually-based project", "aggregate real-time technologies"),
+    ("Clementina DuBuque", "Moriah.Stanton", "Rey.Padberg@karina.biz", "Kattie Turnpike",
+     "Suite 198", "Lebsackbury", "31428-2261", "-38.2386", "57.2232", "024-648-3804", "ambrose.net",
+     "Hoeger LLC", "Centralized empowering task-force", "target end-to-end models"),
+]
+
+# route segment -> foreign key its children carry
+PARENT_KEYS = {"users": "userId", "posts": "postId", "albums": "albumId"}
+
+
+def query_value(value):
+    """``value`` as json-server compares it with a query parameter."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return "null" if value is None else str(value)
+
+
+class Table:
+    """Rows keyed by id, with a secondary index per foreign key and boolean column.
+
+    An index maps the :func:`query_value` of a column to the ids having it,
+    in id order.
+    """
+
+    def __init__(self, rows, indexed=()):
+        self.rows = {row["id"]: row for row in rows}
+        self.encoded = {row_id: json.dumps(row, ensure_ascii=False).encode("utf-8")
+                        for row_id, row in self.rows.items()}
+        self.indexes = {key: {} for key in indexed}
+        for row in rows:
+            for key, index in self.indexes.items():
+                index.setdefault(query_value(row[key]), []).append(row["id"])
+        self._sets = {}
+        self.next_id = max(self.rows, default=0) + 1
+
+    @classmethod
+    def from_parts(cls, rows, encoded, indexes, next_id):
+        """A table over existing row mappings, such as those of a mapped snapshot."""
+        table = cls.__new__(cls)
+        table.rows, table.encoded, table.indexes = rows, encoded, indexes
+        table._sets = {}
+        table.next_id = next_id
+        return table
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _posting(self, key, value):
+        """The id list of ``value`` in index ``key``, made writable."""
+        posting = self.indexes[key].get(value)
+        if not isinstance(posting, list):
+            posting = self.indexes[key][value] = list(posting or ())
+        return posting
+
+    def put(self, row):
+        """Insert or replace ``row``, keeping the indexes in step."""
+        row_id = row["id"]
+        if row_id in self.rows:
+            self.remove(row_id)
+        self.rows[row_id] = row
+        self.encoded[row_id] = json.dumps(row, ensure_ascii=False).encode("utf-8")
+        for key in self.indexes:
+            insort(self._posting(key, query_value(row.get(key))), row_id)
+        self._sets.clear()
+        self.next_id = max(self.next_id, row_id + 1)
+
+    def remove(self, row_id):
+        row = self.rows[row_id]
+        for key in self.indexes:
+            posting = self._posting(key, query_value(row.get(key)))
+            del posting[bisect_left(posting, row_id)]
+        del self.rows[row_id]
+        del self.encoded[row_id]
+        self._sets.clear()
+
+    def _matching(self, key, values):
+        """Sorted ids whose indexed ``key`` is any of ``values``."""
+        if key == "id":
+            return sorted({int(value) for value in values if value.isdigit()} & self.rows.keys())
+        lists = [self.indexes[key].get(value, []) for value in values]
+        return lists[0] if len(lists) == 1 else sorted(row_id for ids in lists for row_id in ids)
+
+    def _members(self, key, values):
+        if (key, values) not in self._sets:
+            self._sets[key, values] = frozenset(self._matching(key, values))
+        return self._sets[key, values]
+
+    def ids(self, filters=None):
+        """Ids of the rows matching every ``{key: [values]}`` filter, in id order.
+
+        The shortest id list of an indexed key is checked against cached sets
+        of the other indexed keys, and only its survivors are compared on the
+        keys without an index.
+        """
+        if not filters:
+            return list(self.rows)
+        indexed = [(key, tuple(sorted(set(values)))) for key, values in filters.items()
+                   if key == "id" or key in self.indexes]
+        if indexed:
+            matches = [self._matching(key, values) for key, values in indexed]
+            shortest = min(range(len(indexed)), key=lambda n: len(matches[n]))
+            ids = matches[shortest]
+            for n, (key, values) in enumerate(indexed):
+                if n != shortest:
+                    members = self._members(key, values)
+                    ids = [row_id for row_id in ids if row_id in members]
+        else:
+            ids = list(self.rows)
+        for key, values in filters.items():
+            if key != "id" and key not in self.indexes:
+                wanted = set(values)
+                ids = [row_id for row_id in ids if query_value(self.rows[row_id].get(key)) in wanted]
+        # an index of a mapped snapshot hands out memoryviews
+        return ids if isinstance(ids, list) else list(ids)
+
+    def dump(self, ids):
+        return b"[" + b",".join(self.encoded[row_id] for row_id in ids) + b"]"
+
+
+def _words(rng, low, high):
+    return " ".join(rng.choice(LOREM) for _ in range(rng.randint(low, high)))
+
+
+def _color(rng):
+    return f"{rng.randrange(0x1000000):06x}"
+
+
+def build_tables(seed=1):
+    rng = random.Random(seed)
+    users = []
+    for user_id, fields in enumerate(USERS, start=1):
+        (name, username, email, street, suite, city, zipcode, lat, lng,
+         phone, website, company, catch_phrase, bs) = fields
+        users.append({
+            "id": user_id, "name": name, "username": username, "email": email,
+            "address": {"street": street, "suite": suite, "city": city, "zipcode": zipcode,
+                        "geo": {"lat": lat, "lng": lng}},
+            "phone": phone, "website": website,
+            "company": {"name": company, "catchPhrase": catch_phrase, "bs": bs},
+        })
+    posts = [{"userId": (n - 1) // 10 + 1, "id": n, "title": _words(rng, 3, 9),
+              "body": "\n".join(_words(rng, 6, 12) for _ in range(4))}
+             for n in range(1, 101)]
+    comments = [{"postId": (n - 1) // 5 + 1, "id": n, "name": _words(rng, 3, 7),
+                 "email": f"{rng.choice(LOREM).title()}.{rng.choice(LOREM)}@{rng.choice(LOREM)}.biz",
+                 "body": "\n".join(_words(rng, 6, 10) for _ in range(4))}
+                for n in range(1, 501)]
+    albums = [{"userId": (n - 1) // 10 + 1, "id": n, "title": _words(rng, 2, 7)}
+              for n in range(1, 101)]
+    photos = []
+    for n in range(1, 5001):
+        color = _color(rng)
+        photos.append({"albumId": (n - 1) // 50 + 1, "id": n, "title": _words(rng, 3, 8),
+                       "url": f"https://via.placeholder.com/600/{color}",
+                       "thumbnailUrl": f"https://via.placeholder.com/150/{color}"})
+    todos = [{"userId": (n - 1) // 20 + 1, "id": n, "title": _words(rng, 2, 8),
+              "completed": rng.random() < 0.5}
+             for n in range(1, 201)]
+    return {
+        "users": Table(users),
+        "posts": Table(posts, ["userId"]),
+        "comments": Table(comments, ["postId"]),
+        "albums": Table(albums, ["userId"]),
+        "photos": Table(photos, ["albumId"]),
+        "todos": Table(todos, ["userId", "completed"]),
+    }
+
+
+def _row_id(value):
+    return int(value) if value.isdigit() else None
+
+
+def _int_arg(request, name):
+    value = request.arg(name)
+    return int(value) if value is not None and value.isdigit() else None
+
+
+def _sort_key(table, field):
+    def key(row_id):
+        value = table.rows[row_id].get(field)
+        return value is None, value
+
+    return key
+
+
+class FakeJSONPlaceholder:
+    """Request handler implementing the JSONPlaceholder routes.
+
+    With a ``store`` (a :class:`support.durable.DurableStore`) writes are
+    real: they change the store's tables and return once they are logged.
+    """
+
+    def __init__(self, seed=1, store=None):
+        self.store = store
+        self._tables = build_tables(seed) if store is None else None
+        self.router = Router()
+        self.router.add("GET", "/{resource}", self.list)
+        self.router.add("POST", "/{resource}", self.create)
+        self.router.add("GET", "/{resource}/{row_id}", self.show)
+        self.router.add("PUT", "/{resource}/{row_id}", self.replace)
+        self.router.add("PATCH", "/{resource}/{row_id}", self.update)
+        self.router.add("DELETE", "/{resource}/{row_id}", self.delete)
+        self.router.add("GET", "/{resource}/{row_id}/{child}", self.list_nested)
+        self.router.add("POST", "/{resource}/{row_id}/{child}", self.create_nested)
+
+    @property
+    def tables(self):
+        return self._tables if self.store is None else self.store.tables
+
+    def __call__(self, request):
+        if self.store is None:
+            return self.router(request)
+        with self.store.lock:
+            response = self.router(request)
+        # wait for the log outside the lock, so concurrent writes share an fsync
+        self.store.sync()
+        return response
+
+    def _save(self, resource, row):
+        if self.store is not None:
+            self.store.put(resource, row)
+        return row
+
+    def _lookup(self, resource, row_id):
+        table = self.tables.get(resource)
+        row_id = _row_id(row_id)
+        if table is None or row_id not in table.rows:
+            return None, None
+        return table, row_id
+
+    def _listing(self, request, table, filters):
+        """The rows of ``table`` matching ``filters``, sorted and paginated as the query asks."""
+        ids = table.ids(filters)
+        sort = request.arg("_sort")
+        if sort:
+            fields, orders = sort.split(","), request.arg("_order", "asc").split(",")
+            # stable sorts from the last key to the first give a multi-key order
+            for field, order in reversed(list(zip_longest(fields, orders[:len(fields)], fillvalue="asc"))):
+                ids = sorted(ids, key=_sort_key(table, field), reverse=order == "desc")
+        total, headers = len(ids), {}
+        page, limit = _int_arg(request, "_page"), _int_arg(request, "_limit")
+        start, end = _int_arg(request, "_start"), _int_arg(request, "_end")
+        if page:
+            limit = limit or 10
+            ids = ids[(page - 1) * limit:page * limit]
+            headers["Link"] = self._links(request, page, max(-(-total // limit), 1))
+        elif limit is not None or start is not None or end is not None:
+            start = start or 0
+            ids = ids[start:end if end is not None else (start + limit if limit is not None else None)]
+        if page or limit is not None or end is not None:
+            headers["X-Total-Count"] = str(total)
+        return Response.raw_json(table.dump(ids), headers=headers)
+
+    @staticmethod
+    def _links(request, page, last):
+        def link(number, rel):
+            query = {**request.query, "_page": [str(number)]}
+            return f'<http://{request.headers.get("Host") or "localhost"}{request.path}?{urlencode(query, doseq=True)}>; rel="{rel}"'
+
+        links = [link(1, "first")]
+        if page > 1:
+            links.append(link(page - 1, "prev"))
+        if page < last:
+            links.append(link(page + 1, "next"))
+        links.append(link(last, "last"))
+        return ", ".join(links)
+
+    @staticmethod
+    def _filters(request):
+        return {name: values for name, values in request.query.items() if not name.startswith("_")}
+
+    def list(self, request, resource):
+        table = self.tables.get(resource)
+        if table is None:
+            return Response.json({}, status=404)
+        return self._listing(request, table, self._filters(request))
+
+    def show(self, request, resource, row_id):
+        table, row_id = self._lookup(resource, row_id)
+        if table is None:
+            return Response.json({}, status=404)
+        return Response.raw_json(table.encoded[row_id])
+
+    def list_nested(self, request, resource, row_id, child):
+        parent, row_id = self._lookup(resource, row_id)
+        table = self.tables.get(child)
+        if parent is None or table is None:
+            return Response.json({}, status=404)
+        key = PARENT_KEYS.get(resource)
+        if key is None:
+            return Response.raw_json(b"[]")
+        filters = self._filters(request)
+        # the parent in the path narrows any filter on the same key
+        filters[key] = [value for value in filters.get(key, [str(row_id)]) if value == str(row_id)]
+        return self._listing(request, table, filters)
+
+    def create(self, request, resource):
+        table = self.tables.get(resource)
+        if table is None:
+            return Response.json({}, status=404)
+        return Response.json(self._save(resource, {**request.json_object(), "id": table.next_id}), status=201)
+
+    def create_nested(self, request, resource, row_id, child):
+        parent, parent_id = self._lookup(resource, row_id)
+        table = self.tables.get(child)
+        if parent is None or table is None or resource not in PARENT_KEYS:
+            return Response.json({}, status=404)
+        # an int like every other foreign key, so the child sorts and filters with its siblings
+        data = {**request.json_object(), PARENT_KEYS[resource]: parent_id, "id": table.next_id}
+        return Response.json(self._save(child, data), status=201)
+
+    def replace(self, request, resource, row_id):
+        table, row_id = self._lookup(resource, row_id)
+        if table is None:
+            return Response.json({}, status=404)
+        return Response.json(self._save(resource, {**request.json_object(), "id": row_id}))
+
+    def update(self, request, resource, row_id):
+        table, row_id = self._lookup(resource, row_id)
+        if table is None:
+            return Response.json({}, status=404)
+        return Response.json(self._save(resource, {**table.rows[row_id], **request.json_object(), "id": row_id}))
+
+    def delete(self, request, resource, row_id):
+        if self.store is not None:
+            table, row_id = self._lookup(resource, row_id)
+            if table is None:
+                return Response.json({}, status=404)
+            self.store.remove(resource, row_id)
+            return Response.json({})
+        # like the public service, any id of a known resource can be "deleted"
+        if resource not in self.tables:
+            return Response.json({}, status=404)
+        return Response.json({})
@@ -0,0 +1,247 @@
+"""Fault-injecting HTTP proxy in front of the local stand-ins.
+
+:class:`FaultProxy` forwards HTTP/1.1 requests from its own port to an
+upstream stand-in, one upstream keep-alive connection per client
+connection, and applies the first matching :class:`Fault` to each request:
+
+* ``latency``: seconds (or a distribution, see :func:`uniform`,
+  :func:`exponential`, :func:`lognormal`) added before the response;
+* ``bandwidth``: bytes per second the response body is sent at;
+* ``status``: answer this status (503, 429, ...) without asking upstream,
+  with ``Retry-After`` when ``retry_after`` is set;
+* ``truncate``: fraction of the body sent before the connection is closed,
+  under the original ``Content-Length``;
+* ``reset``: abort the connection with a TCP reset instead of answering.
+
+A fault applies to requests matching ``method`` and ``path`` (a
+:class:`support.server.Router` template, or ``"*"``), with ``probability``
+and at most ``times`` times; a request whose draw misses a fault is
+checked against the faults added after it. Draws come from a seeded
+generator, so a scripted run is repeatable.
+
+Requests that match no fault are forwarded as they are: the proxy only
+parses the heads to find message boundaries and writes each response with
+one write, so it can stay in front of the stand-ins during benchmarks.
+"""
+import asyncio
+import json
+import math
+import random
+import re
+import socket
+import struct
+from collections import Counter
+from http import HTTPStatus
+from urllib.parse import urlsplit
+
+from support.server import AsyncioServer
+
+
+def uniform(low, high):
+    return lambda rng: rng.uniform(low, high)
+
+
+def exponential(mean):
+    return lambda rng: rng.expovariate(1 / mean)
+
+
+def lognormal(median, sigma):
+    """Long-tailed latency: half the draws are below ``median``."""
+    return lambda rng: rng.lognormvariate(math.log(median), sigma)
+
+
+class Fault:
+    def __init__(self, method="*", path="*", latency=None, bandwidth=None, status=None, retry_after=None,
+                 truncate=None, reset=False, probability=1.0, times=None):
+        self.method = method
+        self.path = path
+        self.pattern = None if path == "*" else re.compile(
+            re.sub(r"\{(\w+)\}", r"[^/]+", path.rstrip("/") or "/") + "/?$")
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.status = status
+        self.retry_after = retry_after
+        self.truncate = truncate
+        self.reset = reset
+        self.probability = probability
+        self.times = times
+        self.applied = 0
+
+    def matches(self, method, path):
+        if self.times is not None and self.applied >= self.times:
+            return False
+        if self.method != "*" and self.method != method:
+            return False
+        return self.pattern is None or self.pattern.match(path) is not None
+
+    def delay(self, rng):
+        if self.latency is None:
+            return 0.0
+        return max(self.latency(rng) if callable(self.latency) else self.latency, 0.0)
+
+    def __repr__(self):
+        kinds = [f"{name}={value!r}" for name, value in vars(self).items()
+                 if name in ("latency", "bandwidth", "status", "truncate", "reset") and value]
+        return f"Fault({self.method} {self.path}: {', '.join(kinds)})"
+
+
+def _content_length(head):
+    match = re.search(rb"\r\ncontent-length:\s*(\d+)", head, re.IGNORECASE)
+    return int(match.group(1)) if match else None
+
+
+def _wants_close(head):
+    return re.search(rb"\r\nconnection:\s*close", head, re.IGNORECASE) is not None
+
+
+def _abort(writer):
+    """Close with a TCP reset rather than a FIN."""
+    sock = writer.get_extra_info("socket")
+    if sock is not None:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+    writer.transport.abort()
+
+
+class FaultProxy(AsyncioServer):
+    """Proxy to ``upstream`` (a URL) that injects the faults added with :meth:`add`."""
+
+    def __init__(self, upstream, host="127.0.0.1", port=0, seed=0):
+        super().__init__(None, host, port)
+        parts = urlsplit(upstream)
+        self.upstream = (parts.hostname, parts.port or 80)
+        self.faults = []
+        self.stats = Counter()
+        self.rng = random.Random(seed)
+
+    def add(self, method="*", path="*", **kwargs):
+        """Inject a :class:`Fault` into the matching requests from now on; returns it."""
+        fault = Fault(method, path, **kwargs)
+        self.faults = [*self.faults, fault]
+        return fault
+
+    def clear(self):
+        self.faults = []
+
+    def _pick(self, method, path):
+        # a matching fault whose draw fails leaves the request to the faults added after it
+        for fault in self.faults:
+            if fault.matches(method, path):
+                if fault.probability >= 1.0 or self.rng.random() < fault.probability:
+                    fault.applied += 1
+                    return fault
+        return None
+
+    async def _serve(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections.add(task)
+        upstream = None
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = _content_length(head)
+                body = await reader.readexactly(length) if length else b""
+                self.stats["requests"] += 1
+                fault = None
+                if self.faults:
+                    method, target, _ = head[:head.index(b"\r\n")].decode("latin-1").split(" ", 2)
+                    fault = self._pick(method, urlsplit(target).path)
+                if fault is not None and fault.reset:
+                    self.stats["reset"] += 1
+                    _abort(writer)
+                    return
+                if fault is not None and fault.status:
+                    await self._inject_status(writer, fault)
+                    continue
+                if upstream is None:
+                    upstream = await asyncio.open_connection(*self.upstream)
+                response_head, response_body, close = await self._forward(upstream, head, body)
+                if fault is None:
+                    writer.write(response_head + response_body)
+                    await writer.drain()
+                elif not await self._deliver(writer, fault, response_head, response_body):
+                    return
+                if close or _wants_close(head):
+                    break
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            self.connections.discard(task)
+            if upstream is not None:
+                upstream[1].close()
+            if not writer.transport.is_closing():
+                writer.close()
+
+    @staticmethod
+    async def _forward(upstream, head, body):
+        up_reader, up_writer = upstream
+        up_writer.write(head + body)
+        await up_writer.drain()
+        response_head = await up_reader.readuntil(b"\r\n\r\n")
+        length = _content_length(response_head)
+        status = int(response_head[9:12])
+        if head.startswith(b"HEAD ") or status in (204, 304) or length == 0:
+            response_body = b""
+        elif length is not None:
+            response_body = await up_reader.readexactly(length)
+        else:
+            # no framing: the body runs until upstream closes
+            response_body = await up_reader.read()
+            return response_head, response_body, True
+        return response_head, response_body, _wants_close(response_head)
+
+    async def _inject_status(self, writer, fault):
+        self.stats["status"] += 1
+        delay = fault.delay(self.rng)
+        if delay:
+            await asyncio.sleep(delay)
+        body = json.dumps({"message": f"{fault.status} injected by the fault proxy"}).encode()
+        lines = [f"HTTP/1.1 {fault.status} {HTTPStatus(fault.status).phrase}",
+                 "Content-Type: application/json", f"Content-Length: {len(body)}"]
+        if fault.retry_after is not None:
+            lines.append(f"Retry-After: {fault.retry_after}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def _deliver(self, writer, fault, head, body):
+        """Send a forwarded response through ``fault``; False once the connection is gone."""
+        delay = fault.delay(self.rng)
+        if delay:
+            self.stats["latency"] += 1
+            await asyncio.sleep(delay)
+        if fault.truncate is not None:
+            self.stats["truncated"] += 1
+            writer.write(head + body[:int(len(body) * fault.truncate)])
+            await writer.drain()
+            writer.close()
+            return False
+        if not fault.bandwidth:
+            writer.write(head + body)
+            await writer.drain()
+            return True
+        self.stats["throttled"] += 1
+        writer.write(head)
+        # 20 slices a second keep the pacing smooth without a timer per byte
+        step = max(int(fault.bandwidth / 20), 1)
+        for start in range(0, len(body), step):
+            chunk = body[start:start + step]
+            await asyncio.sleep(len(chunk) / fault.bandwidth)
+            writer.write(chunk)
+            await writer.drain()
+        return True
+
+
+class FaultScripts:
+    """The fault proxies one test scripts, by host name; their faults are removed after the test."""
+
+    def __init__(self, proxy_for):
+        self._proxy_for = proxy_for
+        self.used = {}
+
+    def __getitem__(self, name):
+        if name not in self.used:
+            self.used[name] = self._proxy_for(name)
+        return self.used[name]
+
+    def clear(self):
+        for proxy in self.used.values():
+            proxy.clear()
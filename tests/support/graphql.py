@@ -0,0 +1,432 @@
+"""GitHub GraphQL: batched lookups, and the small part of GraphQL they need.
+
+Tests declare the accounts and repositories they fetch with
+``@pytest.mark.github_lookups(users=[...], repos=["owner/name", ...])``.
+With ``--github-graphql``, :class:`BatchLayer` fetches every lookup the
+selected tests declare in one aliased query, sent when the first of them is
+requested::
+
+    query {
+      u0: repositoryOwner(login: "octocat") { ... }
+      r0: repository(owner: "facebook", name: "react") { ... }
+      rateLimit { cost remaining }
+    }
+
+and answers ``GET /users/{login}`` and ``GET /repos/{owner}/{repo}`` from it
+with the REST body rebuilt from the GraphQL fields: the profile and
+repository facts (login, type, name, public_repos, language,
+stargazers_count, owner, license, ...) but not the REST API's URL
+templates. A lookup the query could not resolve, or all of them when
+GitHub refuses the query (GraphQL needs a token), go over REST as before.
+
+:func:`parse` and :func:`execute` cover what the batch and the GitHub
+stand-in use: one query of fields with aliases, literal arguments and
+inline fragments. Variables, named fragments, directives and mutations are
+rejected with :class:`GraphQLError`.
+"""
+import json
+import re
+import threading
+from urllib.parse import urlsplit
+
+import requests
+
+from support.client import AdapterLayer, make_response
+
+_TOKEN = re.compile(r"""
+    (?P<skip>[\s,]+|\#[^\n]*)
+  | (?P<spread>\.\.\.)
+  | (?P<punct>[{}():\[\]!$@=])
+  | (?P<string>"(?:[^"\\\n]|\\.)*")
+  | (?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+  | (?P<name>[_A-Za-z][_0-9A-Za-z]*)
+""", re.VERBOSE)
+
+_USER_PATH = re.compile(r"(?P<base>.*)/users/(?P<login>[^/]+)/?$")
+_REPO_PATH = re.compile(r"(?P<base>.*)/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/?$")
+
+OWNER_FIELDS = """__typename login id avatarUrl url
+    ... on User { databaseId isSiteAdmin }
+    ... on Organization { databaseId }"""
+
+USER_FIELDS = f"""{OWNER_FIELDS}
+    repositories(privacy: PUBLIC, ownerAffiliations: [OWNER]) {{ totalCount }}
+    ... on User {{ name company location email bio websiteUrl createdAt updatedAt
+                  followers {{ totalCount }} following {{ totalCount }} gists(privacy: PUBLIC) {{ totalCount }} }}
+    ... on Organization {{ name location email description websiteUrl createdAt updatedAt }}"""
+
+REPO_FIELDS = f"""databaseId id name nameWithOwner isPrivate isFork isArchived isDisabled description url
+    homepageUrl createdAt updatedAt pushedAt diskUsage stargazerCount forkCount
+    owner {{ {OWNER_FIELDS} }}
+    primaryLanguage {{ name }}
+    licenseInfo {{ key name spdxId id }}
+    defaultBranchRef {{ name }}
+    issues(states: [OPEN]) {{ totalCount }}
+    repositoryTopics(first: 20) {{ nodes {{ topic {{ name }} }} }}"""
+
+
+class GraphQLError(Exception):
+    """A query that cannot be parsed or run; ``path`` locates it in the result."""
+
+    def __init__(self, message, path=None, kind=None):
+        super().__init__(message)
+        self.message = message
+        self.path = path
+        self.kind = kind
+
+    def as_dict(self):
+        error = {"message": self.message}
+        if self.kind:
+            error["type"] = self.kind
+        if self.path:
+            error["path"] = list(self.path)
+        return error
+
+
+class Field:
+    __slots__ = ("alias", "name", "args", "selections")
+
+    def __init__(self, alias, name, args, selections):
+        self.alias = alias
+        self.name = name
+        self.args = args
+        self.selections = selections
+
+    @property
+    def key(self):
+        return self.alias or self.name
+
+
+class InlineFragment:
+    __slots__ = ("type_condition", "selections")
+
+    def __init__(self, type_condition, selections):
+        self.type_condition = type_condition
+        self.selections = selections
+
+
+def _tokens(query):
+    position = 0
+    while position < len(query):
+        match = _TOKEN.match(query, position)
+        if match is None:
+            raise GraphQLError(f"Parse error on {query[position]!r} at offset {position}")
+        position = match.end()
+        if match.lastgroup != "skip":
+            yield match.lastgroup, match.group()
+    yield "end", ""
+
+
+class _Parser:
+    def __init__(self, query):
+        self.tokens = list(_tokens(query))
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position]
+
+    def take(self, kind, value=None):
+        token_kind, token = self.tokens[self.position]
+        if token_kind != kind or (value is not None and token != value):
+            raise GraphQLError(f"Parse error on {token or 'end of query'!r}, expected {value or kind}")
+        self.position += 1
+        return token
+
+    def accept(self, kind, value):
+        if self.tokens[self.position] == (kind, value):
+            self.position += 1
+            return True
+        return False
+
+    def document(self):
+        kind, token = self.peek()
+        if kind == "name":
+            if token != "query":
+                raise GraphQLError(f"only queries are supported, not {token!r}")
+            self.position += 1
+            if self.peek()[0] == "name":
+                self.position += 1
+            if self.peek() == ("punct", "("):
+                raise GraphQLError("variables are not supported")
+        selections = self.selection_set()
+        self.take("end")
+        return selections
+
+    def selection_set(self):
+        self.take("punct", "{")
+        selections = []
+        while not self.accept("punct", "}"):
+            selections.append(self.fragment() if self.accept("spread", "...") else self.field())
+        if not selections:
+            raise GraphQLError("Parse error: empty selection set")
+        return selections
+
+    def fragment(self):
+        if not self.accept("name", "on"):
+            raise GraphQLError("named fragments are not supported")
+        return InlineFragment(self.take("name"), self.selection_set())
+
+    def field(self):
+        alias, name = None, self.take("name")
+        if self.accept("punct", ":"):
+            alias, name = name, self.take("name")
+        args = {}
+        if self.accept("punct", "("):
+            while not self.accept("punct", ")"):
+                key = self.take("name")
+                self.take("punct", ":")
+                args[key] = self.value()
+        if self.peek() == ("punct", "@"):
+            raise GraphQLError("directives are not supported")
+        selections = self.selection_set() if self.peek() == ("punct", "{") else None
+        return Field(alias, name, args, selections)
+
+    def value(self):
+        kind, token = self.peek()
+        self.position += 1
+        if kind == "string":
+            return json.loads(token)
+        if kind == "number":
+            return float(token) if any(c in token for c in ".eE") else int(token)
+        if kind == "name":
+            return {"true": True, "false": False, "null": None}.get(token, token)
+        if (kind, token) == ("punct", "["):
+            values = []
+            while not self.accept("punct", "]"):
+                values.append(self.value())
+            return values
+        if (kind, token) == ("punct", "$"):
+            raise GraphQLError("variables are not supported")
+        raise GraphQLError(f"Parse error on {token or 'end of query'!r}, expected a value")
+
+
+def parse(query):
+    """Selections of the query in ``query``."""
+    return _Parser(query).document()
+
+
+def _fields(selections, obj):
+    """The fields of ``selections`` that apply to ``obj``, inline fragments included."""
+    types = {obj["__typename"], *obj.get("__implements", ())}
+    for selection in selections:
+        if isinstance(selection, InlineFragment):
+            if selection.type_condition in types:
+                yield from _fields(selection.selections, obj)
+        else:
+            yield selection
+
+
+def _resolve(obj, field, path):
+    if field.name not in obj:
+        raise GraphQLError(f"Field '{field.name}' doesn't exist on type '{obj['__typename']}'", path)
+    value = obj[field.name]
+    if callable(value):
+        try:
+            value = value(field.args)
+        except GraphQLError as exc:
+            exc.path = exc.path or path
+            raise
+    if value is None:
+        return None
+    if field.selections is None:
+        if isinstance(value, (dict, list)):
+            raise GraphQLError(f"Field '{field.name}' of type '{obj['__typename']}' must have a selection", path)
+        return value
+    if isinstance(value, list):
+        return [_object(item, field.selections, (*path, n)) for n, item in enumerate(value)]
+    return _object(value, field.selections, path)
+
+
+def _object(obj, selections, path):
+    result = {}
+    for field in _fields(selections, obj):
+        result[field.key] = _resolve(obj, field, (*path, field.key))
+    return result
+
+
+def execute(selections, root):
+    """Run parsed ``selections`` against ``root``; returns ``(data, errors)``.
+
+    Objects are dicts from field name to a value, or to a function of the
+    field's arguments (a dict) returning it; ``__typename`` names their type
+    and ``__implements`` the interfaces a fragment may name instead. A root
+    field that fails is null in ``data`` and its error is listed, the other
+    root fields still resolve.
+    """
+    data, errors = {}, []
+    for field in _fields(selections, root):
+        try:
+            data[field.key] = _resolve(root, field, (field.key,))
+        except GraphQLError as exc:
+            data[field.key] = None
+            errors.append(exc.as_dict())
+    return data, errors
+
+
+# -- batching --------------------------------------------------------------
+
+def _quote(value):
+    return json.dumps(value)
+
+
+def batch_query(users, repos):
+    """The aliased query for ``users`` (logins) and ``repos`` (``(owner, name)``).
+
+    Returns ``(query, aliases)``; ``aliases`` maps each alias to the
+    ``("user", login)`` or ``("repo", (owner, name))`` lookup it answers.
+    """
+    aliases, parts = {}, []
+    for n, login in enumerate(sorted(users)):
+        aliases[f"u{n}"] = ("user", login)
+        parts.append(f"u{n}: repositoryOwner(login: {_quote(login)}) {{ {USER_FIELDS} }}")
+    for n, (owner, name) in enumerate(sorted(repos)):
+        aliases[f"r{n}"] = ("repo", (owner, name))
+        parts.append(f"r{n}: repository(owner: {_quote(owner)}, name: {_quote(name)}) {{ {REPO_FIELDS} }}")
+    parts.append("rateLimit { cost remaining }")
+    return "query {\n  " + "\n  ".join(parts) + "\n}", aliases
+
+
+def _count(node, name):
+    connection = node.get(name)
+    return None if connection is None else connection["totalCount"]
+
+
+def owner_body(node, api):
+    login = node["login"]
+    return {"login": login, "id": node["databaseId"], "node_id": node["id"], "avatar_url": node["avatarUrl"],
+            "gravatar_id": "", "url": f"{api}/users/{login}", "html_url": node["url"],
+            "followers_url": f"{api}/users/{login}/followers", "repos_url": f"{api}/users/{login}/repos",
+            "type": node["__typename"], "site_admin": node.get("isSiteAdmin", False)}
+
+
+def user_body(node, api):
+    """The ``GET /users/{login}`` body for a ``repositoryOwner`` result."""
+    body = {**owner_body(node, api), "name": node["name"], "company": node.get("company"),
+            "blog": node.get("websiteUrl") or "", "location": node["location"], "email": node["email"] or None,
+            "bio": node.get("bio", node.get("description")) or None,
+            "public_repos": _count(node, "repositories"), "public_gists": _count(node, "gists") or 0,
+            "created_at": node["createdAt"], "updated_at": node["updatedAt"]}
+    # organizations have no follower counts in GraphQL
+    if "followers" in node:
+        body.update(followers=_count(node, "followers"), following=_count(node, "following"))
+    return body
+
+
+def repo_body(node, api):
+    """The ``GET /repos/{owner}/{repo}`` body for a ``repository`` result."""
+    full_name = node["nameWithOwner"]
+    url = f"{api}/repos/{full_name}"
+    license = node["licenseInfo"]
+    if license is not None:
+        license = {"key": license["key"], "name": license["name"], "spdx_id": license["spdxId"],
+                   "url": f"{api}/licenses/{license['key']}", "node_id": license["id"]}
+    language = node["primaryLanguage"]
+    branch = node["defaultBranchRef"]
+    open_issues = _count(node, "issues")
+    return {"id": node["databaseId"], "node_id": node["id"], "name": node["name"], "full_name": full_name,
+            "private": node["isPrivate"], "owner": owner_body(node["owner"], api), "html_url": node["url"],
+            "description": node["description"], "fork": node["isFork"], "url": url,
+            "commits_url": f"{url}/commits{{/sha}}", "contributors_url": f"{url}/contributors",
+            "created_at": node["createdAt"], "updated_at": node["updatedAt"], "pushed_at": node["pushedAt"],
+            "homepage": node["homepageUrl"] or None, "size": node["diskUsage"] or 0,
+            "stargazers_count": node["stargazerCount"], "watchers_count": node["stargazerCount"],
+            "language": language and language["name"], "forks_count": node["forkCount"],
+            "archived": node["isArchived"], "disabled": node["isDisabled"], "open_issues_count": open_issues,
+            "license": license, "topics": [item["topic"]["name"] for item in node["repositoryTopics"]["nodes"]],
+            "visibility": "private" if node["isPrivate"] else "public",
+            "forks": node["forkCount"], "open_issues": open_issues, "watchers": node["stargazerCount"],
+            "default_branch": branch["name"] if branch else None}
+
+
+class BatchLayer(AdapterLayer):
+    """Answers declared user and repository GETs from one GraphQL query.
+
+    ``users`` are logins and ``repos`` ``"owner/name"`` strings. The query
+    goes to ``/graphql`` on the host of the first lookup requested, with
+    that request's headers, through the layers below (retries, rate limit).
+    """
+
+    def __init__(self, users=(), repos=()):
+        super().__init__()
+        self.users = {login.lower() for login in users}
+        self.repos = {tuple(full_name.lower().split("/", 1)) for full_name in repos}
+        self.queries = 0
+        self.answered = 0
+        self.cost = None
+        self.failure = None
+        self._answers = None
+        self._lock = threading.Lock()
+
+    def _lookup(self, request):
+        """``(base, key)`` of a declared lookup, or None."""
+        if request.method != "GET":
+            return None
+        url = urlsplit(request.url)
+        if url.query:
+            return None
+        match = _USER_PATH.match(url.path)
+        if match and match["login"].lower() in self.users:
+            return match["base"], ("user", match["login"].lower())
+        match = _REPO_PATH.match(url.path)
+        if match and (match["owner"].lower(), match["repo"].lower()) in self.repos:
+            return match["base"], ("repo", (match["owner"].lower(), match["repo"].lower()))
+        return None
+
+    def _batch(self, request, base, **kwargs):
+        with self._lock:
+            if self._answers is None:
+                self._answers = self._fetch(request, base, **kwargs)
+            return self._answers
+
+    def _fetch(self, request, base, **kwargs):
+        url = urlsplit(request.url)
+        api = f"{url.scheme}://{url.netloc}{base}"
+        query, aliases = batch_query(self.users, self.repos)
+        headers = {name: value for name, value in request.headers.items()
+                   if name.lower() not in ("if-none-match", "if-modified-since", "cache-control")}
+        batch = requests.Request("POST", f"{api}/graphql", headers=headers, json={"query": query}).prepare()
+        self.queries += 1
+        try:
+            response = self.inner.send(batch, **{**kwargs, "stream": False})
+            result = response.json()
+        except (requests.exceptions.RequestException, ValueError) as exc:
+            self.failure = f"{type(exc).__name__}: {exc}"
+            return {}
+        data = result.get("data") if isinstance(result, dict) else None
+        if response.status_code != 200 or not isinstance(data, dict):
+            message = (result.get("message") or result.get("errors")) if isinstance(result, dict) else result
+            self.failure = f"{response.status_code} {message}"
+            return {}
+        self.cost = (data.get("rateLimit") or {}).get("cost")
+        answers = {}
+        for alias, (kind, key) in aliases.items():
+            node = data.get(alias)
+            if node is not None:
+                body = user_body(node, api) if kind == "user" else repo_body(node, api)
+                answers[kind, key] = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        return answers
+
+    def send(self, request, **kwargs):
+        lookup = self._lookup(request)
+        if lookup is None:
+            return self.inner.send(request, **kwargs)
+        base, key = lookup
+        body = self._batch(request, base, **kwargs).get(key)
+        if body is None:
+            return self.inner.send(request, **kwargs)
+        self.answered += 1
+        return make_response(request, 200, {"Content-Type": "application/json; charset=utf-8",
+                                            "Content-Length": str(len(body)), "X-GitHub-Batch": "graphql"},
+                             body, reason="OK")
+
+    def report(self):
+        declared = len(self.users) + len(self.repos)
+        if not declared:
+            return []
+        if not self.queries:
+            return [f"{declared} lookups declared, none requested"]
+        lines = [f"{declared} lookups in {self.queries} GraphQL query (cost {self.cost}), "
+                 f"{self.answered} REST calls answered from it"]
+        if self.failure:
+            lines.append(f"the query failed, lookups went over REST: {self.failure}")
+        return lines
@@ -0,0 +1,147 @@
+"""Persistent conditional-request (ETag / Last-Modified) cache.
+
+Responses that carry an ``ETag`` or ``Last-Modified`` header are stored in a
+SQLite file. The next GET for the same URL is sent with ``If-None-Match`` /
+``If-Modified-Since``; when the server answers 304 the stored body is
+returned instead. GitHub does not charge 304 responses to the rate limit.
+
+Entries are keyed by URL plus the request headers GitHub varies on
+(``Accept`` and ``Authorization``), and the least recently used ones are
+evicted once the stored bodies exceed ``max_bytes``.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from support.client import DECODED_BODY_HEADERS, AdapterLayer, make_response
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    used REAL NOT NULL
+)
+"""
+
+VARY_HEADERS = ("Accept", "Authorization")
+
+
+def cache_key(request):
+    digest = hashlib.sha1(request.url.encode())
+    for name in VARY_HEADERS:
+        digest.update(b"\n" + (request.headers.get(name) or "").encode())
+    return digest.hexdigest()
+
+
+class CacheStats:
+    def __init__(self):
+        self.requests = 0
+        self.not_modified = 0
+        self.stored = 0
+        self.evicted = 0
+        self.bytes_saved = 0
+
+
+class HTTPCache:
+    """SQLite-backed store of validators and bodies, evicted LRU by size."""
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute(SCHEMA)
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, headers, body FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, headers, body = row
+        return {"etag": etag, "last_modified": last_modified, "headers": json.loads(headers), "body": body}
+
+    def touch(self, key):
+        with self._lock, self._db:
+            self._db.execute("UPDATE entries SET used = ? WHERE key = ?", (time.time(), key))
+
+    def put(self, key, url, response):
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in DECODED_BODY_HEADERS}
+        body = response.content
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                 json.dumps(headers), body, len(body), time.time()))
+            self.stats.stored += 1
+            self._evict()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY used").fetchall():
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.stats.evicted += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def report(self):
+        stats = self.stats
+        if not stats.requests:
+            return []
+        return [f"{stats.requests} cacheable requests, {stats.not_modified} answered 304 from cache, "
+                f"{stats.stored} stored, {stats.evicted} evicted, "
+                f"{stats.bytes_saved / 1024:.1f} KiB not downloaded"]
+
+
+class ConditionalCacheLayer(AdapterLayer):
+    """Sends GETs as conditional requests and serves 304s from an :class:`HTTPCache`."""
+
+    def __init__(self, cache):
+        super().__init__()
+        self.cache = cache
+
+    def send(self, request, **kwargs):
+        if request.method != "GET":
+            return self.inner.send(request, **kwargs)
+        self.cache.stats.requests += 1
+        key = cache_key(request)
+        entry = self.cache.get(key)
+        if entry is not None:
+            if entry["etag"]:
+                request.headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                request.headers["If-Modified-Since"] = entry["last_modified"]
+        response = self.inner.send(request, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            self.cache.touch(key)
+            self.cache.stats.not_modified += 1
+            self.cache.stats.bytes_saved += len(entry["body"])
+            # fresh headers (rate limit, date) over the stored representation headers
+            headers = {**entry["headers"], **{k: v for k, v in response.headers.items()
+                                              if k.lower() not in DECODED_BODY_HEADERS}}
+            return make_response(request, 200, headers, entry["body"], "OK")
+        if response.status_code == 200 and ("ETag" in response.headers or "Last-Modified" in response.headers):
+            self.cache.put(key, request.url, response)
+        return response
+
+    def close(self):
+        self.cache.close()
+        super().close()
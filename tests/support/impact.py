@@ -0,0 +1,250 @@
+"""Change-impact test selection: skip tests whose inputs did not change.
+
+:class:`ImpactRecorder` sees every request a test makes, on top of the
+client stack (so memoized and replayed responses count too), and when the
+test passes it stores a fingerprint in a JSON file:
+
+* a digest of the test function's source plus the rest of its module
+  (helpers, constants, fixtures; not the other tests), and one of the
+  harness (the conftest, the ``support`` package and the options that pick
+  hosts, cassettes and payload seeds);
+* for every GET, the path, request headers, status, ``ETag``/
+  ``Last-Modified`` and a digest of the body (when the test read the whole
+  body);
+* the method, path and payload digest of every other request.
+
+With ``--changed-only`` a test whose code and harness digests still match
+is probed before it runs: each recorded GET is sent again as a conditional
+request. A 304, the same validator or the same body digest means that
+response did not change; the GitHub ETag cache makes these probes free of
+rate limit, and in replay mode the cassette answers them. When every
+response is unchanged the test is skipped. Tests that write (POST, PUT,
+PATCH, DELETE) always run, since their responses cannot be probed without
+sending the write again, and so do tests that made no request of their own:
+nothing shows they are unaffected.
+
+Only the requests of the test call itself are recorded, not those of fixture
+setup, so a session fixture's requests (the GitHub budget's ``/rate_limit``)
+do not end up in whichever test happened to set it up.
+"""
+import ast
+import contextlib
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+from urllib.parse import urlsplit
+
+from support.client import AdapterLayer
+
+READ_METHODS = {"GET", "HEAD"}
+# never written to the fingerprint file; probes send the client's own
+SECRET_HEADERS = {"authorization", "cookie", "proxy-authorization"}
+VOLATILE_HEADERS = {"if-none-match", "if-modified-since", "content-length"}
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def harness_digest(paths, options):
+    """Digest of the files every test depends on and of the options that shape responses."""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in sorted(paths):
+        with open(path, "rb") as f:
+            digest.update(path.encode() + b"\0" + f.read() + b"\0")
+    digest.update(json.dumps(options, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def _module_source(path):
+    """Source of a test module without its test functions and classes."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in tree.body
+                     if not (isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+                             and node.name.startswith(("test", "Test"))))
+
+
+def code_digest(function):
+    try:
+        source = inspect.getsource(function)
+        module = _module_source(inspect.getsourcefile(function))
+    except (OSError, TypeError, SyntaxError):
+        return None
+    return _digest(f"{module}\n{source}".encode())
+
+
+def _relative(url, base_url):
+    if url.startswith(base_url):
+        return url[len(base_url):]
+    parts = urlsplit(url)
+    return parts.path + (f"?{parts.query}" if parts.query else "")
+
+
+def _body(body):
+    if body is None:
+        return b""
+    return body.encode("utf-8") if isinstance(body, str) else bytes(body)
+
+
+def _dump(path, results):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary = f"{path}.{os.getpid()}"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump({"tests": results}, f, indent=1, sort_keys=True)
+    os.replace(temporary, path)
+
+
+class ImpactRecorder:
+    def __init__(self, path, harness):
+        self.path = path
+        self.harness = harness
+        self.results = {}
+        self.finished = set()
+        self.test = None
+        self.unchanged = 0
+        self.changed = 0
+        self.recorded = 0
+        self._responses = []
+        self._probing = threading.local()
+        self._lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return self
+        self.results = stored.get("tests", {})
+        return self
+
+    def save(self, path=None):
+        """Merge this run's results into the file; entries of tests not run here are kept.
+
+        With ``path`` (a parallel worker's own file), only the results of the
+        tests finished here are written there, failures included, for the
+        controller to :meth:`merge`.
+        """
+        if path is not None:
+            _dump(path, {nodeid: self.results[nodeid] for nodeid in self.finished})
+            return
+        stored = type(self)(self.path, self.harness).load().results
+        stored.update(self.results)
+        for nodeid in [nodeid for nodeid, result in stored.items() if result is None]:
+            del stored[nodeid]
+        _dump(self.path, stored)
+
+    def merge(self, paths):
+        """Take the results the workers saved to ``paths`` as finished here."""
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                results = json.load(f)["tests"]
+            self.results.update(results)
+            self.finished.update(results)
+        return self
+
+    def start(self, nodeid):
+        self.test = nodeid
+        self._responses = []
+
+    def observe(self, host, base_url, response):
+        """Remember one response of the running test."""
+        if self.test is None or getattr(self._probing, "active", False):
+            return
+        request = response.request
+        with self._lock:
+            self._responses.append((host, _relative(request.url, base_url), request, response))
+
+    def finish(self, nodeid, function, passed):
+        """Store the fingerprint of a passed test, forget a failed one."""
+        responses, self._responses = self._responses, []
+        self.test = None
+        self.finished.add(nodeid)
+        if not passed:
+            self.results[nodeid] = None
+            return
+        calls = []
+        for host, path, request, response in responses:
+            call = {"host": host, "method": request.method, "path": path, "status": response.status_code}
+            if request.method in READ_METHODS:
+                call["headers"] = {name: value for name, value in request.headers.items()
+                                   if name.lower() not in SECRET_HEADERS | VOLATILE_HEADERS}
+                call["etag"] = response.headers.get("ETag")
+                call["last_modified"] = response.headers.get("Last-Modified")
+                # a streamed body that was not read to the end has no digest
+                content = response._content if response._content_consumed else None
+                call["digest"] = _digest(content) if isinstance(content, bytes) else None
+            else:
+                call["payload"] = _digest(_body(request.body))
+            calls.append(call)
+        self.results[nodeid] = {"code": code_digest(function), "harness": self.harness, "calls": calls}
+        self.recorded += 1
+
+    def candidate(self, nodeid, function):
+        """The stored fingerprint if the test and harness are unchanged and it made requests, all of them reads."""
+        result = self.results.get(nodeid)
+        if (result is None or result["harness"] != self.harness or result["code"] is None
+                or result["code"] != code_digest(function)):
+            return None
+        if not result["calls"] or any(call["method"] not in READ_METHODS for call in result["calls"]):
+            return None
+        return result
+
+    @contextlib.contextmanager
+    def probing(self):
+        self._probing.active = True
+        try:
+            yield
+        finally:
+            self._probing.active = False
+
+    def unchanged_call(self, client, call):
+        """Whether one recorded GET still gets the same response from ``client``."""
+        headers = dict(call["headers"])
+        if call["etag"]:
+            headers["If-None-Match"] = call["etag"]
+        if call["last_modified"]:
+            headers["If-Modified-Since"] = call["last_modified"]
+        with self.probing():
+            response = client.request(call["method"], call["path"], headers=headers)
+        if response.status_code == 304:
+            return True
+        if response.status_code != call["status"]:
+            return False
+        if call["etag"] and response.headers.get("ETag") == call["etag"]:
+            return True
+        return call["digest"] is not None and _digest(response.content) == call["digest"]
+
+    def unchanged_test(self, result, client_for):
+        """Whether every GET in ``result`` is unchanged; ``client_for(host)`` gives the host's client."""
+        for call in result["calls"]:
+            if not self.unchanged_call(client_for(call["host"]), call):
+                self.changed += 1
+                return False
+        self.unchanged += 1
+        return True
+
+    def report(self):
+        if not (self.unchanged or self.recorded):
+            return []
+        return [f"{self.unchanged} tests skipped as unchanged, {self.changed} re-run after a change, "
+                f"{self.recorded} results recorded in {self.path}"]
+
+
+class ImpactLayer(AdapterLayer):
+    """Outermost layer of a client: reports every response to an :class:`ImpactRecorder`."""
+
+    def __init__(self, recorder, name, base_url):
+        super().__init__()
+        self.recorder = recorder
+        self.name = name
+        self.base_url = base_url
+
+    def send(self, request, **kwargs):
+        response = self.inner.send(request, **kwargs)
+        self.recorder.observe(self.name, self.base_url, response)
+        return response
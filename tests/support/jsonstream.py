@@ -0,0 +1,121 @@
+"""Incremental decoding of large JSON responses.
+
+``r.json()`` builds the whole object tree before a test can look at one
+field. These helpers read the body chunk by chunk instead:
+
+* :func:`iter_items` yields the items of a top-level array one at a time;
+* :func:`select` returns a few keys of a top-level object, decoding the
+  other values one at a time and dropping them, and stops reading as soon
+  as every key was found.
+
+Request the response with ``stream=True`` so the body is also downloaded
+incrementally (and not at all past the point where decoding stops). The
+generator closes the response when it is exhausted or closed.
+"""
+import codecs
+import json
+import re
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    def __init__(self, response, chunk_size):
+        self.chunks = response.iter_content(chunk_size)
+        self.text = codecs.getincrementaldecoder(response.encoding or "utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        if self.eof:
+            return False
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.eof = True
+            decoded = self.text.decode(b"", final=True)
+        else:
+            decoded = self.text.decode(chunk)
+        self.buffer = self.buffer[self.pos:] + decoded
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character, or "" at the end of the body."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(f"expected one of {chars!r}", self.buffer, self.pos)
+        self.pos += 1
+        return char
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # a number running into the end of the buffer may continue in the next chunk
+            if (type(value) in (int, float) and _NUMBER_TAIL.match(self.buffer, end).end() == len(self.buffer)
+                    and self.fill()):
+                continue
+            self.pos = end
+            return value
+
+
+def iter_items(response, chunk_size=64 * 1024):
+    """Yield the items of the JSON array in ``response``'s body."""
+    try:
+        reader = _Reader(response, chunk_size)
+        reader.expect("[")
+        if reader.peek() == "]":
+            return
+        while True:
+            yield reader.value()
+            if reader.expect(",]") == "]":
+                return
+    finally:
+        response.close()
+
+
+def iter_pairs(response, chunk_size=64 * 1024):
+    """Yield the ``(key, value)`` pairs of the JSON object in ``response``'s body."""
+    try:
+        reader = _Reader(response, chunk_size)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            key = reader.value()
+            reader.expect(":")
+            yield key, reader.value()
+            if reader.expect(",}") == "}":
+                return
+    finally:
+        response.close()
+
+
+def select(response, *keys, chunk_size=64 * 1024):
+    """The given top-level ``keys`` of the JSON object in ``response``; missing keys are left out."""
+    wanted = set(keys)
+    found = {}
+    pairs = iter_pairs(response, chunk_size)
+    for key, value in pairs:
+        if key in wanted:
+            found[key] = value
+            if len(found) == len(wanted):
+                pairs.close()
+                break
+    return found
@@ -0,0 +1,147 @@
+"""Per-call latency records and the end-of-session percentile report.
+
+Every call that reaches the network is recorded with its phase timings (see
+:class:`support.client.CallTimings`), the test that made it, the host and
+the endpoint template, e.g. ``/users/{id}/todos``. The report gives
+p50/p95/p99 per endpoint, heaviest first, and the slowest single calls.
+"""
+import functools
+import json
+import math
+import re
+import threading
+from urllib.parse import urlsplit
+
+# GitHub paths whose segments are names rather than numeric ids
+GITHUB_TEMPLATES = (
+    "/users/{username}",
+    "/users/{username}/{collection}",
+    "/orgs/{org}",
+    "/orgs/{org}/{collection}",
+    "/repos/{owner}/{repo}",
+    "/repos/{owner}/{repo}/{collection}",
+    "/licenses/{license}",
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _pattern(template):
+    return re.compile(re.sub(r"\{(\w+)\}", r"[^/]+", template) + "$")
+
+
+def endpoint_template(path, templates=()):
+    """The first of ``templates`` matching ``path``, else ``path`` with numeric ids as ``{id}``.
+
+    In ``templates``, a ``{collection}`` segment is kept as it is in the
+    result, so ``/users/{username}/{collection}`` turns
+    ``/users/google/repos`` into ``/users/{username}/repos``.
+    """
+    path = path.rstrip("/") or "/"
+    for template in templates:
+        if _pattern(template).match(path):
+            segments = path.split("/")
+            return "/".join(segment if name == "{collection}" else name
+                            for name, segment in zip(template.split("/"), segments))
+    return re.sub(r"/\d+(?=/|$)", "/{id}", path)
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)]
+
+
+class Call:
+    __slots__ = ("test", "host", "method", "endpoint", "url", "status", "timings")
+
+    def __init__(self, test, host, method, endpoint, url, status, timings):
+        self.test = test
+        self.host = host
+        self.method = method
+        self.endpoint = endpoint
+        self.url = url
+        self.status = status
+        self.timings = timings
+
+    def as_dict(self):
+        return {"test": self.test, "host": self.host, "method": self.method, "endpoint": self.endpoint,
+                "url": self.url, "status": self.status, **self.timings.as_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        """A call exported by :meth:`LatencyRecorder.export`, e.g. by a parallel worker."""
+        from support.client import CallTimings
+
+        timings = CallTimings()
+        for name in CallTimings.__slots__:
+            setattr(timings, name, data[name])
+        return cls(data["test"], data["host"], data["method"], data["endpoint"], data["url"], data["status"],
+                   timings)
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self.calls = []
+        self.test = None
+        self._lock = threading.Lock()
+
+    def listener(self, host, templates=()):
+        """Callback for :attr:`support.client.PooledAdapter.listeners` of ``host``."""
+        def record(request, response, timings):
+            endpoint = endpoint_template(urlsplit(request.url).path, templates)
+            call = Call(self.test, host, request.method, endpoint, request.url, response.status_code, timings)
+            with self._lock:
+                self.calls.append(call)
+
+        return record
+
+    def endpoints(self):
+        """Percentiles (in ms) per ``host method endpoint``, by total time spent."""
+        groups = {}
+        for call in self.calls:
+            groups.setdefault(f"{call.host} {call.method} {call.endpoint}", []).append(call)
+        summary = {}
+        for name, calls in groups.items():
+            totals = sorted(call.timings.total for call in calls)
+            summary[name] = {
+                "calls": len(calls),
+                "total_s": sum(totals),
+                "p50_ms": percentile(totals, 50) * 1000,
+                "p95_ms": percentile(totals, 95) * 1000,
+                "p99_ms": percentile(totals, 99) * 1000,
+                "avg_bytes": sum(call.timings.size for call in calls) / len(calls),
+            }
+        return dict(sorted(summary.items(), key=lambda item: -item[1]["total_s"]))
+
+    def slowest(self, count=10):
+        return sorted(self.calls, key=lambda call: -call.timings.total)[:count]
+
+    def report(self, slowest=10):
+        if not self.calls:
+            return []
+        lines = [f"{'endpoint':<52} {'calls':>5} {'total s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+                 f"{'p99 ms':>8} {'KiB/call':>8}"]
+        for name, row in self.endpoints().items():
+            lines.append(f"{name:<52} {row['calls']:>5} {row['total_s']:>8.2f} {row['p50_ms']:>8.1f} "
+                         f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['avg_bytes'] / 1024:>8.1f}")
+        lines.append("")
+        lines.append(f"slowest calls {'total':>8} {'dns':>6} {'connect':>7} {'tls':>6} {'ttfb':>7} {'download':>8}")
+        for call in self.slowest(slowest):
+            t = call.timings
+            lines.append(f"{'':<13} {t.total * 1000:>8.1f} {t.dns * 1000:>6.1f} {t.connect * 1000:>7.1f} "
+                         f"{t.tls * 1000:>6.1f} {t.ttfb * 1000:>7.1f} {t.download * 1000:>8.1f}  "
+                         f"{call.method} {call.url}  ({call.test})")
+        return lines
+
+    def merge(self, paths):
+        """Add the calls exported to ``paths``."""
+        for path in paths:
+            with open(path, encoding="utf-8") as fh:
+                calls = [Call.from_dict(data) for data in json.load(fh)["calls"]]
+            with self._lock:
+                self.calls.extend(calls)
+        return self
+
+    def export(self, path):
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump({"endpoints": self.endpoints(), "calls": [call.as_dict() for call in self.calls]},
+                      fh, indent=2)
@@ -0,0 +1,197 @@
+"""Session-wide memoization of idempotent GET requests.
+
+Identical GETs (same URL, query and request headers) made during a run are
+sent once. Callers that ask while the first request is still in flight wait
+for it instead of sending their own. Every caller gets its own
+``requests.Response`` but they share the body bytes and a single parsed
+``json()`` result, which is made read-only so one test cannot change what
+another one sees.
+
+A write (POST, PUT, PATCH, DELETE) drops the memoized GETs of the resource
+it touched. Tests that must observe fresh state use ``@pytest.mark.fresh``,
+or send ``Cache-Control: no-cache`` on a single request. ``stream=True``
+requests are passed through untouched: memoizing one would read the whole
+body, and the caller streams it to stop reading early.
+"""
+import contextlib
+import contextvars
+import copy
+import hashlib
+import json
+import threading
+from urllib.parse import urlsplit
+
+import requests
+
+from support.cassette import normalize_url
+from support.client import AdapterLayer, make_response
+
+MEMOIZED_METHODS = {"GET", "HEAD"}
+
+_bypass = contextvars.ContextVar("memo_bypass", default=False)
+
+
+@contextlib.contextmanager
+def bypass():
+    """Send every request made inside the block, ignoring memoized responses."""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError("memoized response bodies are read-only; copy.deepcopy() it or mark the test fresh")
+
+
+class ReadOnlyDict(dict):
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = __ior__ = _read_only
+
+    def __deepcopy__(self, memo):
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+
+class ReadOnlyList(list):
+    __setitem__ = __delitem__ = append = extend = insert = pop = remove = clear = _read_only
+    sort = reverse = __iadd__ = __imul__ = _read_only
+
+    def __deepcopy__(self, memo):
+        return [copy.deepcopy(value, memo) for value in self]
+
+
+def _freeze_list(values):
+    return ReadOnlyList(_freeze_list(v) if type(v) is list else v for v in values)
+
+
+def _frozen_object(pairs):
+    return ReadOnlyDict((k, _freeze_list(v) if type(v) is list else v) for k, v in pairs)
+
+
+def parse_read_only(content):
+    value = json.loads(content, object_pairs_hook=_frozen_object)
+    return _freeze_list(value) if type(value) is list else value
+
+
+class _Shared:
+    """Outcome of one memoized request, shared by every caller."""
+
+    def __init__(self, url):
+        self.segments = set(urlsplit(url).path.split("/"))
+        self.done = threading.Event()
+        self.error = None
+        self.status = None
+        self.reason = None
+        self.headers = None
+        self.content = None
+        self._parsed = None
+        self._lock = threading.Lock()
+
+    def parsed(self):
+        with self._lock:
+            if self._parsed is None:
+                self._parsed = (parse_read_only(self.content),)
+            return self._parsed[0]
+
+
+class MemoResponse(requests.Response):
+    """Response whose ``json()`` is the shared, read-only parsed body."""
+
+    _shared = None
+
+    def json(self, **kwargs):
+        if kwargs:
+            return super().json(**kwargs)
+        try:
+            return self._shared.parsed()
+        except ValueError as exc:
+            raise requests.exceptions.JSONDecodeError(exc.msg, exc.doc, exc.pos)
+
+
+def memo_key(request):
+    digest = hashlib.sha1(f"{request.method}\n{normalize_url(request.url)}".encode())
+    for name, value in sorted((k.lower(), v) for k, v in request.headers.items()):
+        digest.update(f"\n{name}:{value}".encode())
+    return digest.hexdigest()
+
+
+def _resource(url):
+    """Last non-numeric path segment: the collection a write affects."""
+    segments = [s for s in urlsplit(url).path.split("/") if s and not s.isdigit()]
+    return segments[-1] if segments else ""
+
+
+class MemoStats:
+    def __init__(self):
+        self.sent = 0
+        self.hits = 0
+        self.coalesced = 0
+        self.invalidated = 0
+
+    def report(self, name):
+        if not (self.hits or self.coalesced):
+            return []
+        return [f"{name:<16} {self.sent:>5} sent {self.hits:>5} memoized "
+                f"{self.coalesced:>3} coalesced {self.invalidated:>3} invalidated"]
+
+
+class MemoLayer(AdapterLayer):
+    def __init__(self):
+        super().__init__()
+        self.entries = {}
+        self.stats = MemoStats()
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        if request.method not in MEMOIZED_METHODS:
+            self.invalidate(_resource(request.url))
+            return self.inner.send(request, **kwargs)
+        if _bypass.get() or kwargs.get("stream") or "no-cache" in request.headers.get("Cache-Control", ""):
+            return self.inner.send(request, **kwargs)
+        key = memo_key(request)
+        with self._lock:
+            shared = self.entries.get(key)
+            owner = shared is None
+            if owner:
+                shared = self.entries[key] = _Shared(request.url)
+                self.stats.sent += 1
+            elif shared.done.is_set():
+                self.stats.hits += 1
+            else:
+                self.stats.coalesced += 1
+        if owner:
+            self._fetch(key, shared, request, kwargs)
+        shared.done.wait()
+        if shared.error is not None:
+            raise shared.error
+        response = make_response(request, shared.status, shared.headers, shared.content,
+                                 shared.reason, response_class=MemoResponse)
+        response._shared = shared
+        return response
+
+    def _fetch(self, key, shared, request, kwargs):
+        try:
+            response = self.inner.send(request, **kwargs)
+            shared.status = response.status_code
+            shared.reason = response.reason
+            shared.headers = dict(response.headers)
+            shared.content = response.content
+            if response.status_code >= 500 or response.status_code == 429:
+                self._forget(key, shared)
+        except Exception as exc:
+            shared.error = exc
+            self._forget(key, shared)
+        finally:
+            shared.done.set()
+
+    def _forget(self, key, shared):
+        with self._lock:
+            if self.entries.get(key) is shared:
+                del self.entries[key]
+
+    def invalidate(self, resource):
+        with self._lock:
+            stale = [key for key, shared in self.entries.items() if resource in shared.segments]
+            for key in stale:
+                del self.entries[key]
+            self.stats.invalidated += len(stale)
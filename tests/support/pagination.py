@@ -0,0 +1,77 @@
+"""Lazy iteration over ``Link``-paginated responses (GitHub and json-server style).
+
+Only the page being consumed (plus, with ``prefetch``, the next one already
+on its way) is held in memory, however many pages are walked.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from urllib.parse import parse_qs, urlsplit
+
+
+def _next_url(response):
+    return response.links.get("next", {}).get("url")
+
+
+def _items(response, key):
+    body = response.json()
+    return body[key] if key else body
+
+
+def iter_pages(client, path, params=None, max_pages=None, prefetch=False):
+    """Yield each page's response, following ``rel="next"``.
+
+    With ``prefetch`` the next page is requested in the background while the
+    caller works on the current one.
+    """
+    response = client.get(path, params=params)
+    pages = 0
+    with ThreadPoolExecutor(max_workers=1) if prefetch else nullcontext() as pool:
+        while True:
+            pages += 1
+            next_url = _next_url(response)
+            if max_pages is not None and pages >= max_pages:
+                next_url = None
+            pending = pool.submit(client.get, next_url) if prefetch and next_url else None
+            yield response
+            if next_url is None:
+                return
+            response = pending.result() if pending else client.get(next_url)
+
+
+def iter_pages_items(client, path, params=None, key=None, max_items=None, max_pages=None, prefetch=True):
+    """Yield the items of every page; ``key`` picks the list out of an object body."""
+    if max_items == 0:
+        return
+    count = 0
+    for response in iter_pages(client, path, params, max_pages, prefetch):
+        response.raise_for_status()
+        for item in _items(response, key):
+            yield item
+            count += 1
+            if max_items is not None and count >= max_items:
+                return
+
+
+def count_items(client, path, params=None, key=None):
+    """Exact number of items, fetching only the first and the last page.
+
+    A response with json-server's ``X-Total-Count`` header is counted from
+    the first page alone. None when the ``last`` link names no ``page`` or
+    ``_page``, so the count is unknown.
+    """
+    first = client.get(path, params=params)
+    first.raise_for_status()
+    if "X-Total-Count" in first.headers:
+        return int(first.headers["X-Total-Count"])
+    per_page = len(_items(first, key))
+    last_url = first.links.get("last", {}).get("url")
+    if last_url is None:
+        return per_page
+    query = parse_qs(urlsplit(last_url).query)
+    page = query.get("page") or query.get("_page")
+    if page is None:
+        return None
+    last_page = int(page[0])
+    last = client.get(last_url)
+    last.raise_for_status()
+    return (last_page - 1) * per_page + len(_items(last, key))
@@ -0,0 +1,407 @@
+"""Run the suite on several worker processes with per-host request limits.
+
+``pytest --workers N`` turns the pytest process into a controller: it
+collects the tests, starts a coordinator (a ``multiprocessing`` manager
+process) and N worker processes that re-collect the same tests and pull node
+ids from the coordinator one at a time. Workers send their reports back
+through the coordinator and the controller replays them into its own
+terminal, so the output looks like a normal run.
+
+Every HTTP request a worker makes goes through :class:`LimiterLayer`, which
+asks the shared :class:`HostLimiter` for a slot on the request's host: a
+per-host concurrency cap plus a per-host token bucket. The time spent waiting
+for a slot is reported per host at the end of the run. The GitHub rate-limit
+budget lives in the coordinator too, and workers use it through
+:class:`SharedBudget`, so every worker draws on the same known quota.
+
+The local stand-ins the selected tests use are started once, by the
+controller, and their URLs handed to the workers, which only put a fault
+proxy of their own in front of them. A test the workers never report on (a
+worker crashed or was killed) is reported by the controller as an error.
+
+Workers never write the shared output files (cassettes, the --changed-only
+fingerprints, the latency export) and their terminal output is discarded:
+each writes what it has to a directory of its own (:func:`worker_output`)
+and the controller merges those once every worker has exited.
+"""
+import glob
+import json
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from multiprocessing.managers import BaseManager
+from urllib.parse import urlsplit
+
+import pytest
+from requests.structures import CaseInsensitiveDict
+
+from support.client import AdapterLayer
+from support.ratelimit import RateBudget
+from support.settings import PARALLEL_ADDRESS_ENV, PARALLEL_OUTPUT_ENV, PARALLEL_STAND_INS_ENV
+
+# hostname -> (max concurrent requests, requests per second; 0 = no limit)
+DEFAULT_HOST_LIMITS = {"api.github.com": (4, 10.0)}
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take one token and return how long to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class HostLimiter:
+    """Per-host concurrency cap and token bucket, with queueing statistics."""
+
+    def __init__(self, limits=None, default_concurrency=8):
+        self.limits = {**DEFAULT_HOST_LIMITS, **(limits or {})}
+        self.default_concurrency = default_concurrency
+        self.slots = {}
+        self.buckets = {}
+        self.waited = {}
+        self.requests = {}
+        self._lock = threading.Lock()
+
+    def _host(self, host):
+        with self._lock:
+            if host not in self.slots:
+                concurrency, rate = self.limits.get(host.split(":")[0], (self.default_concurrency, 0))
+                self.slots[host] = threading.BoundedSemaphore(concurrency)
+                self.buckets[host] = TokenBucket(rate) if rate else None
+                self.waited[host] = 0.0
+                self.requests[host] = 0
+            return self.slots[host], self.buckets[host]
+
+    def acquire(self, host):
+        """Block until ``host`` may take another request; return seconds waited."""
+        slots, bucket = self._host(host)
+        start = time.monotonic()
+        slots.acquire()
+        if bucket is not None:
+            delay = bucket.reserve()
+            if delay:
+                time.sleep(delay)
+        waited = time.monotonic() - start
+        with self._lock:
+            self.waited[host] += waited
+            self.requests[host] += 1
+        return waited
+
+    def release(self, host):
+        self.slots[host].release()
+
+    def stats(self):
+        with self._lock:
+            return {host: (self.requests[host], self.waited[host]) for host in self.slots}
+
+
+class LimiterLayer(AdapterLayer):
+    def __init__(self, limiter):
+        super().__init__()
+        self.limiter = limiter
+
+    def send(self, request, **kwargs):
+        host = urlsplit(request.url).netloc
+        self.limiter.acquire(host)
+        try:
+            return self.inner.send(request, **kwargs)
+        finally:
+            self.limiter.release(host)
+
+
+class SharedBudget(RateBudget):
+    """A worker's view of the coordinator's :class:`RateBudget`."""
+
+    def __init__(self, coordinator):
+        super().__init__()
+        self.coordinator = coordinator
+
+    def update(self, headers, default_resource="core"):
+        self.coordinator.budget_update(dict(headers), default_resource)
+
+    def load(self, data):
+        # plain dicts: the body may be a memoized, read-only one that does not unpickle
+        resources = {name: {key: values[key] for key in ("limit", "remaining", "reset")}
+                     for name, values in data.get("resources", {}).items()}
+        self.coordinator.budget_load({"resources": resources})
+
+    def available(self, resource):
+        return self.coordinator.budget_available(resource)
+
+    def charge(self, resource):
+        self.coordinator.budget_charge(resource)
+
+    def reserve(self, costs, max_wait, name):
+        self.coordinator.budget_reserve(costs, max_wait, name)
+
+    def release(self, costs):
+        self.coordinator.budget_release(costs)
+
+    def report(self):
+        # the controller reports the shared budget
+        return []
+
+
+class Coordinator:
+    """Lives in the manager process and is shared by the controller and workers."""
+
+    def __init__(self, nodeids, limits, default_concurrency):
+        self.pending = deque(nodeids)
+        self.limiter = HostLimiter(limits, default_concurrency)
+        self.budget = RateBudget()
+        self.reports = queue.Queue()
+        self._lock = threading.Lock()
+
+    def next_test(self):
+        with self._lock:
+            return self.pending.popleft() if self.pending else None
+
+    def acquire(self, host):
+        return self.limiter.acquire(host)
+
+    def release(self, host):
+        self.limiter.release(host)
+
+    def host_stats(self):
+        return self.limiter.stats()
+
+    def budget_update(self, headers, default_resource):
+        self.budget.update(CaseInsensitiveDict(headers), default_resource)
+
+    def budget_load(self, data):
+        self.budget.load(data)
+
+    def budget_available(self, resource):
+        return self.budget.available(resource)
+
+    def budget_charge(self, resource):
+        self.budget.charge(resource)
+
+    def budget_reserve(self, costs, max_wait, name):
+        self.budget.reserve(costs, max_wait, name)
+
+    def budget_release(self, costs):
+        self.budget.release(costs)
+
+    def budget_report(self):
+        return self.budget.report()
+
+    def put_report(self, data):
+        self.reports.put(data)
+
+    def get_report(self, timeout):
+        try:
+            return self.reports.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+_coordinator = None
+
+
+def _init_coordinator(nodeids, limits, default_concurrency):
+    global _coordinator
+    _coordinator = Coordinator(nodeids, limits, default_concurrency)
+
+
+class CoordinatorManager(BaseManager):
+    pass
+
+
+def _get_coordinator():
+    return _coordinator
+
+
+CoordinatorManager.register("coordinator", callable=_get_coordinator)
+
+ADDRESS_ENV = PARALLEL_ADDRESS_ENV
+AUTHKEY_ENV = "API_PARALLEL_AUTHKEY"
+
+
+def connect_worker():
+    """Coordinator proxy for a worker process, or None outside a parallel run."""
+    address = os.environ.get(ADDRESS_ENV)
+    if not address:
+        return None
+    host, _, port = address.rpartition(":")
+    manager = CoordinatorManager(address=(host, int(port)), authkey=bytes.fromhex(os.environ[AUTHKEY_ENV]))
+    manager.connect()
+    return manager.coordinator()
+
+
+class WorkerPlugin:
+    """Pulls tests from the coordinator and sends every report back to it."""
+
+    def __init__(self, config, coordinator):
+        self.config = config
+        self.coordinator = coordinator
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtestloop(self, session):
+        items = {item.nodeid: item for item in session.items}
+        nodeid = self.coordinator.next_test()
+        while nodeid is not None:
+            upcoming = self.coordinator.next_test()
+            # nextitem decides which fixtures are torn down, so look one test ahead
+            item, nextitem = items[nodeid], items.get(upcoming)
+            item.config.hook.pytest_runtest_protocol(item=item, nextitem=nextitem)
+            nodeid = upcoming
+        return True
+
+    def pytest_runtest_logreport(self, report):
+        data = self.config.hook.pytest_report_to_serializable(config=self.config, report=report)
+        self.coordinator.put_report(data)
+
+
+def shared_stand_ins():
+    """URLs of the stand-ins the controller started, by host name, in a worker process."""
+    return json.loads(os.environ.get(PARALLEL_STAND_INS_ENV, "{}"))
+
+
+def worker_output(name):
+    """Path of this worker's own output file ``name``, or None outside a parallel run."""
+    directory = os.environ.get(PARALLEL_OUTPUT_ENV)
+    if not directory:
+        return None
+    path = os.path.join(directory, str(os.getpid()), name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def worker_outputs(directory, name):
+    """The output file ``name`` (a glob) of every worker that wrote one, in the same order every time."""
+    return sorted(glob.glob(os.path.join(directory, "*", name)))
+
+
+class ControllerPlugin:
+    """Starts the coordinator, the stand-ins and the workers, and replays their reports locally.
+
+    ``start_stand_ins(items)`` starts the stand-ins ``items`` need and returns
+    them by host name; each has a ``url`` and a ``stop()``.
+    ``collect_outputs(directory)`` is called once the workers have exited,
+    with the directory their :func:`worker_output` files are in.
+    """
+
+    def __init__(self, config, workers, limits, default_concurrency, start_stand_ins=None, collect_outputs=None):
+        self.config = config
+        self.workers = workers
+        self.limits = limits
+        self.default_concurrency = default_concurrency
+        self.start_stand_ins = start_stand_ins
+        self.collect_outputs = collect_outputs
+        self.wall = 0.0
+        self.busy = 0.0
+        self.host_stats = {}
+        self.budget_lines = []
+        self.unreported = []
+
+    def _spawn(self, address, authkey, stand_ins, output):
+        env = dict(os.environ, **{ADDRESS_ENV: f"{address[0]}:{address[1]}", AUTHKEY_ENV: authkey.hex(),
+                                  PARALLEL_STAND_INS_ENV: json.dumps(stand_ins), PARALLEL_OUTPUT_ENV: output})
+        args = [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider",
+                *self.config.invocation_params.args, "--workers", "1"]
+        return [subprocess.Popen(args, env=env, cwd=self.config.invocation_params.dir,
+                                 stdout=subprocess.DEVNULL)
+                for _ in range(self.workers)]
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtestloop(self, session):
+        if session.testsfailed and not session.config.option.continue_on_collection_errors:
+            return None
+        if session.config.option.collectonly:
+            return None
+        authkey = os.urandom(16)
+        manager = CoordinatorManager(address=("127.0.0.1", 0), authkey=authkey)
+        manager.start(_init_coordinator, ([item.nodeid for item in session.items],
+                                          self.limits, self.default_concurrency))
+        coordinator = manager.coordinator()
+        hook = self.config.hook
+        locations = {item.nodeid: item.location for item in session.items}
+        started, finished = set(), set()
+        start = time.monotonic()
+        stand_ins = self.start_stand_ins(session.items) if self.start_stand_ins else {}
+        output = tempfile.mkdtemp(prefix="api-parallel-")
+        processes = []
+        try:
+            urls = {name: server.url for name, server in stand_ins.items()}
+            processes = self._spawn(manager.address, authkey, urls, output)
+            while True:
+                data = coordinator.get_report(0.1)
+                if data is None:
+                    if all(process.poll() is not None for process in processes):
+                        break
+                    continue
+                report = hook.pytest_report_from_serializable(config=self.config, data=data)
+                self.busy += report.duration
+                if report.nodeid not in started:
+                    started.add(report.nodeid)
+                    hook.pytest_runtest_logstart(nodeid=report.nodeid, location=locations[report.nodeid])
+                hook.pytest_runtest_logreport(report=report)
+                if report.when == "teardown":
+                    finished.add(report.nodeid)
+                    hook.pytest_runtest_logfinish(nodeid=report.nodeid, location=locations[report.nodeid])
+        finally:
+            self.wall = time.monotonic() - start
+            self.host_stats = coordinator.host_stats()
+            self.budget_lines = coordinator.budget_report()
+            for process in processes:
+                process.wait()
+            manager.shutdown()
+            for server in stand_ins.values():
+                server.stop()
+            try:
+                if self.collect_outputs is not None:
+                    self.collect_outputs(output)
+            finally:
+                shutil.rmtree(output, ignore_errors=True)
+        if not (session.shouldfail or session.shouldstop):
+            codes = sorted({process.returncode for process in processes})
+            for nodeid in locations.keys() - finished:
+                self._report_lost(nodeid, locations[nodeid], nodeid in started, codes)
+        return True
+
+    def _report_lost(self, nodeid, location, started, codes):
+        """Report a test no worker finished as an error, so it does not silently drop out of the run."""
+        hook = self.config.hook
+        self.unreported.append(nodeid)
+        if not started:
+            hook.pytest_runtest_logstart(nodeid=nodeid, location=location)
+        message = f"no worker reported the end of this test (worker exit codes: {', '.join(map(str, codes))})"
+        report = pytest.TestReport(nodeid, location, {}, "failed", message, "teardown" if started else "setup")
+        hook.pytest_runtest_logreport(report=report)
+        hook.pytest_runtest_logfinish(nodeid=nodeid, location=location)
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if not self.wall:
+            return
+        terminalreporter.section("parallel run")
+        terminalreporter.write_line(
+            f"{self.workers} workers, {self.wall:.2f}s wall, {self.busy:.2f}s summed test time "
+            f"({self.busy / self.wall:.2f}x the wall time)")
+        for host, (requests, waited) in sorted(self.host_stats.items()):
+            terminalreporter.write_line(
+                f"{host:<28} {requests:>5} requests  {waited:.2f}s queued "
+                f"({waited / requests * 1000:.1f} ms/request)")
+        if self.unreported:
+            terminalreporter.write_line(f"{len(self.unreported)} tests reported as errors: no worker finished them")
+        if self.budget_lines:
+            terminalreporter.section("github rate limit")
+            for line in self.budget_lines:
+                terminalreporter.write_line(line)
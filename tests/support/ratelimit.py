@@ -0,0 +1,191 @@
+"""GitHub rate-limit accounting.
+
+GitHub reports the budget of the bucket a request was charged to in the
+``X-RateLimit-Resource``, ``-Limit``, ``-Remaining`` and ``-Reset`` response
+headers. :class:`RateBudget` keeps the latest value per bucket ("core" and
+"search" are the ones the suite uses, "graphql" the batched lookups) and
+:class:`RateLimitLayer` refuses to send a request whose bucket is known to
+be empty, instead of letting it come back as a 403 that still counts
+against the quota.
+
+Before a test starts, :meth:`RateBudget.reserve` sets aside the calls it
+declares until :meth:`RateBudget.release`, so tests running side by side
+cannot all count on the same last calls of a bucket.
+"""
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from support.client import AdapterLayer
+
+
+class RateLimitExhausted(requests.exceptions.RequestException):
+    """The bucket a request would be charged to has no calls left."""
+
+
+def resource_for(path, base_path=""):
+    """Bucket GitHub charges a request path to (None for /rate_limit, which is free).
+
+    ``base_path`` is the path of the API root the client is bound to, e.g.
+    ``/api/v3`` on GitHub Enterprise; it is not part of the route.
+    """
+    if base_path and path.startswith(base_path + "/"):
+        path = path[len(base_path):]
+    if path.startswith("/rate_limit"):
+        return None
+    if path.startswith("/search/"):
+        return "search"
+    if path.startswith("/graphql"):
+        return "graphql"
+    return "core"
+
+
+class Bucket:
+    def __init__(self, limit, remaining, reset):
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+        self.reserved = 0
+
+    def resets_in(self):
+        return max(self.reset - time.time(), 0.0)
+
+
+class RateBudget:
+    """Latest known remaining calls per GitHub rate-limit bucket."""
+
+    def __init__(self):
+        self.buckets = {}
+        self.blocked = []
+        self._lock = threading.Lock()
+
+    def update(self, headers, default_resource="core"):
+        remaining = headers.get("X-RateLimit-Remaining")
+        if remaining is None:
+            return
+        resource = headers.get("X-RateLimit-Resource", default_resource)
+        bucket = Bucket(int(headers.get("X-RateLimit-Limit", 0)), int(remaining),
+                        int(headers.get("X-RateLimit-Reset", 0)))
+        with self._lock:
+            self._replace(resource, bucket)
+
+    def _replace(self, resource, bucket):
+        # reservations outlive the headers that report the bucket
+        previous = self.buckets.get(resource)
+        if previous is not None:
+            bucket.reserved = previous.reserved
+        self.buckets[resource] = bucket
+
+    def observe(self, response, base_path=""):
+        """Account for one response to a request that was sent to GitHub."""
+        resource = resource_for(urlsplit(response.request.url).path, base_path)
+        if resource is None:
+            return
+        if "X-RateLimit-Remaining" in response.headers:
+            self.update(response.headers, resource)
+        else:
+            self.charge(resource)
+
+    def load(self, data):
+        """Seed the buckets from a ``GET /rate_limit`` body."""
+        with self._lock:
+            for resource, values in data.get("resources", {}).items():
+                self._replace(resource, Bucket(values["limit"], values["remaining"], values["reset"]))
+
+    def refresh(self, client):
+        try:
+            response = client.get("/rate_limit")
+        except requests.exceptions.RequestException:
+            return
+        if response.ok:
+            self.load(response.json())
+
+    def available(self, resource):
+        """Calls left in ``resource``, or None if it has not been seen yet or has reset."""
+        with self._lock:
+            bucket = self.buckets.get(resource)
+        if bucket is None or not bucket.resets_in():
+            return None
+        return bucket.remaining
+
+    def charge(self, resource):
+        with self._lock:
+            bucket = self.buckets.get(resource)
+            if bucket is not None and bucket.remaining > 0:
+                bucket.remaining -= 1
+
+    def reserve(self, costs, max_wait, name):
+        """Set aside the calls a test is about to make, waiting up to ``max_wait`` seconds.
+
+        ``costs`` maps bucket to number of calls; a bucket counts as short
+        when its remaining calls, less those other tests have reserved, do
+        not cover the cost. Raises RateLimitExhausted (and remembers ``name``
+        for the report) when a bucket stays short. Pass the same ``costs`` to
+        :meth:`release` once the test is done.
+        """
+        while True:
+            with self._lock:
+                short = self._short(costs)
+                if short is None:
+                    for resource, cost in costs.items():
+                        bucket = self.buckets.get(resource)
+                        if bucket is not None:
+                            bucket.reserved += cost
+                    return
+                resource, left, cost, bucket = short
+                wait = bucket.resets_in()
+                if wait > max_wait:
+                    self.blocked.append((name, resource))
+                    raise RateLimitExhausted(
+                        f"GitHub {resource} budget has {left}/{bucket.limit} calls left, {name} needs {cost}; "
+                        f"it resets in {wait / 60:.0f} min")
+            time.sleep(wait + 1)
+
+    def _short(self, costs):
+        """The first bucket in ``costs`` that cannot pay, as ``(resource, left, cost, bucket)``, or None."""
+        for resource, cost in costs.items():
+            bucket = self.buckets.get(resource)
+            if bucket is None or not bucket.resets_in():
+                continue
+            left = bucket.remaining - bucket.reserved
+            if left < cost:
+                return resource, max(left, 0), cost, bucket
+        return None
+
+    def release(self, costs):
+        """Give back what :meth:`reserve` set aside for ``costs``."""
+        with self._lock:
+            for resource, cost in costs.items():
+                bucket = self.buckets.get(resource)
+                if bucket is not None:
+                    bucket.reserved = max(bucket.reserved - cost, 0)
+
+    def report(self):
+        lines = []
+        for resource, bucket in sorted(self.buckets.items()):
+            if resource not in ("core", "search"):
+                continue
+            lines.append(f"{resource:<8} {bucket.remaining:>5}/{bucket.limit:<5} left, "
+                         f"resets in {bucket.resets_in() / 60:.1f} min")
+        for name, resource in self.blocked:
+            lines.append(f"not run, {resource} budget exhausted: {name}")
+        return lines
+
+
+class RateLimitLayer(AdapterLayer):
+    """Fails fast on an empty bucket and tracks the budget from every response."""
+
+    def __init__(self, budget, base_url=""):
+        super().__init__()
+        self.budget = budget
+        self.base_path = urlsplit(base_url).path.rstrip("/")
+
+    def send(self, request, **kwargs):
+        resource = resource_for(urlsplit(request.url).path, self.base_path)
+        if resource is not None and self.budget.available(resource) == 0:
+            raise RateLimitExhausted(f"GitHub {resource} budget is exhausted, not sending {request.url}")
+        response = self.inner.send(request, **kwargs)
+        self.budget.observe(response, self.base_path)
+        return response
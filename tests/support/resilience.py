@@ -0,0 +1,165 @@
+"""Timeouts, retries with backoff and a per-host circuit breaker.
+
+:class:`ResilienceLayer` sits right above the network in each host's client:
+
+* every request gets a ``(connect, read)`` timeout unless the caller passed
+  one, so a hung connection fails the test instead of stalling the run;
+* connection errors, timeouts and 429/502/503/504 answers to idempotent
+  requests are retried with capped exponential backoff and full jitter. A
+  ``Retry-After`` header replaces the computed delay, and a response whose
+  ``Retry-After`` is longer than ``max_backoff`` is returned as it is;
+* once a host has failed ``threshold`` times in a row (after retries), its
+  :class:`CircuitBreaker` opens and every further request to it raises
+  :class:`CircuitOpen` at once, until ``cooldown`` seconds have passed and a
+  single trial request succeeds. The trial is not retried: if it fails the
+  breaker opens again for another ``cooldown``.
+"""
+import email.utils
+import random
+import threading
+import time
+
+import requests
+
+from support.client import AdapterLayer
+
+RETRY_STATUSES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class CircuitOpen(requests.exceptions.ConnectionError):
+    """Raised without sending while a host's circuit breaker is open."""
+
+
+def retry_after(response):
+    """Seconds asked for by a ``Retry-After`` header, or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(when.timestamp() - time.time(), 0.0)
+
+
+class CircuitBreaker:
+    """Closed, open or half-open, driven by consecutive failures."""
+
+    def __init__(self, threshold=5, cooldown=60.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self.rejected = 0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        """Whether a request may be sent now; half-open lets a single trial through."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            self.rejected += 1
+            return False
+
+    @property
+    def in_trial(self):
+        """Whether the half-open trial request is in flight; every other request is rejected meanwhile."""
+        return self._trial
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or (self.opened_at is None and self.failures >= self.threshold):
+                if self.opened_at is None:
+                    self.trips += 1
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+class ResilienceLayer(AdapterLayer):
+    def __init__(self, name, timeout=(5.0, 30.0), retries=3, backoff=0.5, max_backoff=20.0,
+                 threshold=5, cooldown=60.0, sleep=time.sleep):
+        super().__init__()
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = CircuitBreaker(threshold, cooldown)
+        self.retried = 0
+        self.slept = 0.0
+        self._sleep = sleep
+
+    def delay(self, attempt, response=None):
+        """Seconds to wait before retry number ``attempt`` (0-based), or None not to retry."""
+        asked = retry_after(response) if response is not None else None
+        if asked is not None:
+            return asked if asked <= self.max_backoff else None
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        idempotent = request.method in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpen(f"circuit breaker for {self.name} is open after "
+                                  f"{self.breaker.failures} consecutive failures; not sending {request.url}",
+                                  request=request)
+            # a retry of the trial would be rejected by the breaker it is trying to close
+            retry = idempotent and not self.breaker.in_trial
+            try:
+                response = self.inner.send(request, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                wait = self.delay(attempt) if retry and attempt < self.retries else None
+                if wait is None:
+                    self.breaker.failure()
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    self.breaker.success()
+                    return response
+                wait = self.delay(attempt, response) if retry and attempt < self.retries else None
+                if wait is None:
+                    # a 429 is the server pacing us, not the server failing
+                    if response.status_code == 429:
+                        self.breaker.success()
+                    else:
+                        self.breaker.failure()
+                    return response
+                response.close()
+            attempt += 1
+            self.retried += 1
+            self.slept += wait
+            self._sleep(wait)
+
+    def report(self):
+        breaker = self.breaker
+        if not (self.retried or breaker.trips):
+            return []
+        return [f"{self.name:<16} {self.retried:>4} retries ({self.slept:.1f}s backing off)  "
+                f"breaker {breaker.state}, tripped {breaker.trips}x, {breaker.rejected} requests short-circuited"]
@@ -0,0 +1,177 @@
+"""Declarative response schemas compiled into validator functions.
+
+A schema is plain Python data:
+
+* a type (``int``, ``str``, ``bool``, ...) matches values of exactly that
+  type, so ``True`` is not an ``int``;
+* a dict matches an object (any ``dict``, including the read-only ones of
+  memoized responses) that has at least those keys, each matching its
+  own schema (extra keys are allowed, APIs grow);
+* a one-element list matches an array whose items all match that element;
+* :class:`Nullable` and :class:`NonEmpty` wrap another schema.
+
+:func:`compile_schema` turns a schema into the Python source of one function
+and compiles it, so checking a 5000-item ``/photos`` response is a single
+loop of ``type(...) is`` comparisons. Every violation is reported with its
+JSON path, e.g. ``$[12].address.zipcode: expected str, got int``.
+"""
+import itertools
+
+
+class Nullable:
+    def __init__(self, schema):
+        self.schema = schema
+
+
+class NonEmpty:
+    """A ``str`` or array schema that must also not be empty."""
+
+    def __init__(self, schema):
+        self.schema = schema
+
+
+class SchemaError(AssertionError):
+    def __init__(self, name, errors, limit=20):
+        self.errors = errors
+        lines = errors[:limit]
+        if len(errors) > limit:
+            lines.append(f"... and {len(errors) - limit} more")
+        super().__init__(f"{name}: {len(errors)} schema violation(s)\n  " + "\n  ".join(lines))
+
+
+_TYPE_NAMES = {dict: "object", list: "array", type(None): "null"}
+_MISSING = object()
+
+
+def _type_name(value):
+    for kind, name in _TYPE_NAMES.items():
+        if isinstance(value, kind):
+            return name
+    return type(value).__name__
+
+
+class _Compiler:
+    def __init__(self):
+        self.lines = []
+        self.names = itertools.count()
+        self.constants = {"_type_name": _type_name, "_MISSING": _MISSING}
+
+    def emit(self, depth, line):
+        self.lines.append("    " * depth + line)
+
+    def error(self, depth, path, message):
+        self.emit(depth, f"errors.append(f\"{path}: {message}\")")
+
+    def node(self, schema, var, path, depth):
+        if isinstance(schema, Nullable):
+            self.emit(depth, f"if {var} is not None:")
+            self.node(schema.schema, var, path, depth + 1)
+        elif isinstance(schema, NonEmpty):
+            self.node(schema.schema, var, path, depth)
+            self.emit(depth, f"if not {var} and isinstance({var}, (str, list)):")
+            self.error(depth + 1, path, "must not be empty")
+        elif isinstance(schema, dict):
+            self.object(schema, var, path, depth)
+        elif isinstance(schema, list):
+            self.array(schema, var, path, depth)
+        elif isinstance(schema, type):
+            name = f"_t{next(self.names)}"
+            self.constants[name] = schema
+            self.emit(depth, f"if type({var}) is not {name}:")
+            self.error(depth + 1, path, f"expected {_TYPE_NAMES.get(schema, schema.__name__)}, "
+                                        f"got {{_type_name({var})}}")
+        else:
+            raise TypeError(f"unsupported schema {schema!r} at {path}")
+
+    def object(self, schema, var, path, depth):
+        self.emit(depth, f"if not isinstance({var}, dict):")
+        self.error(depth + 1, path, "expected object, got {_type_name(%s)}" % var)
+        self.emit(depth, "else:")
+        for key, child in schema.items():
+            child_var = f"v{next(self.names)}"
+            step = f".{key}" if key.isidentifier() else f"[{key!r}]"
+            child_path = path + step.replace("{", "{{").replace("}", "}}").replace("\\", "\\\\").replace('"', '\\"')
+            self.emit(depth + 1, f"{child_var} = {var}.get({key!r}, _MISSING)")
+            self.emit(depth + 1, f"if {child_var} is _MISSING:")
+            self.error(depth + 2, child_path, "missing")
+            self.emit(depth + 1, "else:")
+            self.node(child, child_var, child_path, depth + 2)
+        if not schema:
+            self.emit(depth + 1, "pass")
+
+    def array(self, schema, var, path, depth):
+        if len(schema) != 1:
+            raise TypeError(f"array schema at {path} must have exactly one item schema")
+        index, item = f"i{next(self.names)}", f"v{next(self.names)}"
+        self.emit(depth, f"if not isinstance({var}, list):")
+        self.error(depth + 1, path, "expected array, got {_type_name(%s)}" % var)
+        self.emit(depth, "else:")
+        self.emit(depth + 1, f"for {index}, {item} in enumerate({var}):")
+        self.node(schema[0], item, f"{path}[{{{index}}}]", depth + 2)
+
+
+def compile_schema(schema, name="schema"):
+    """Compile ``schema`` into a :class:`Validator`."""
+    compiler = _Compiler()
+    compiler.emit(0, "def validate(value, errors):")
+    compiler.node(schema, "value", "$", 1)
+    namespace = dict(compiler.constants)
+    exec(compile("\n".join(compiler.lines), f"<schema {name}>", "exec"), namespace)
+    return Validator(name, schema, namespace["validate"])
+
+
+class Validator:
+    def __init__(self, name, schema, function):
+        self.name = name
+        self.schema = schema
+        self._validate = function
+
+    def errors(self, value):
+        """Every violation in ``value``, as ``"<json path>: <problem>"`` strings."""
+        errors = []
+        self._validate(value, errors)
+        return errors
+
+    def check(self, value):
+        """Raise :class:`SchemaError` listing every violation; return ``value`` if valid."""
+        errors = self.errors(value)
+        if errors:
+            raise SchemaError(self.name, errors)
+        return value
+
+    def many(self):
+        """Validator for an array of this schema."""
+        return compile_schema([self.schema], f"{self.name}[]")
+
+
+# JSONPlaceholder
+
+POST = compile_schema({"userId": int, "id": int, "title": NonEmpty(str), "body": NonEmpty(str)}, "post")
+COMMENT = compile_schema({"postId": int, "id": int, "name": str, "email": NonEmpty(str), "body": str}, "comment")
+ALBUM = compile_schema({"userId": int, "id": int, "title": str}, "album")
+PHOTO = compile_schema({"albumId": int, "id": int, "title": str, "url": NonEmpty(str),
+                        "thumbnailUrl": NonEmpty(str)}, "photo")
+TODO = compile_schema({"userId": int, "id": int, "title": str, "completed": bool}, "todo")
+USER = compile_schema({
+    "id": int, "name": NonEmpty(str), "username": str, "email": NonEmpty(str),
+    "address": {"street": str, "suite": str, "city": str, "zipcode": str, "geo": {"lat": str, "lng": str}},
+    "phone": str, "website": str,
+    "company": {"name": str, "catchPhrase": str, "bs": str},
+}, "user")
+
+POSTS, COMMENTS, ALBUMS, PHOTOS, TODOS, USERS = (v.many() for v in (POST, COMMENT, ALBUM, PHOTO, TODO, USER))
+
+# GitHub
+
+GITHUB_USER = compile_schema({
+    "login": NonEmpty(str), "id": int, "node_id": str, "avatar_url": str, "url": str,
+    "html_url": str, "type": str, "site_admin": bool,
+}, "github user")
+GITHUB_REPO = compile_schema({
+    "id": int, "node_id": str, "name": NonEmpty(str), "full_name": NonEmpty(str), "private": bool,
+    "owner": GITHUB_USER.schema, "html_url": str, "description": Nullable(str), "fork": bool, "url": str,
+    "language": Nullable(str), "stargazers_count": int, "watchers_count": int, "forks_count": int,
+    "open_issues_count": int, "default_branch": str,
+}, "github repo")
+
+GITHUB_USERS, GITHUB_REPOS = GITHUB_USER.many(), GITHUB_REPO.many()
@@ -0,0 +1,251 @@
+"""Minimal HTTP plumbing for the local stand-in servers.
+
+An *app* is any callable taking a :class:`Request` and returning a
+:class:`Response`; :class:`Router` maps method + path templates to handlers
+and the server classes expose an app on an ephemeral localhost port. An app
+that raises :class:`BadRequest` answers 400; any other exception answers 500
+rather than dropping the connection.
+"""
+import asyncio
+import http.client
+import io
+import json
+import re
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+JSON_TYPE = "application/json; charset=utf-8"
+
+
+class BadRequest(ValueError):
+    """Raised while handling a request whose body cannot be used; answered with 400."""
+
+
+class Request:
+    def __init__(self, method, path, query=None, headers=None, body=b""):
+        self.method = method
+        self.path = path
+        self.query = query or {}
+        self.headers = headers or {}
+        self.body = body
+
+    @classmethod
+    def from_target(cls, method, target, headers, body):
+        parts = urlsplit(target)
+        query = parse_qs(parts.query, keep_blank_values=True)
+        return cls(method, unquote(parts.path), query, headers, body)
+
+    def arg(self, name, default=None):
+        """First value of a query parameter."""
+        values = self.query.get(name)
+        return values[0] if values else default
+
+    def json(self):
+        try:
+            return json.loads(self.body) if self.body else {}
+        except ValueError as error:
+            raise BadRequest(f"the body is not valid JSON: {error}") from None
+
+    def json_object(self):
+        """The body as a JSON object, as the handlers that merge it into a row need."""
+        data = self.json()
+        if not isinstance(data, dict):
+            raise BadRequest("the body must be a JSON object")
+        return data
+
+
+class Response:
+    def __init__(self, status=200, body=b"", headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+    @classmethod
+    def json(cls, data, status=200, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        return cls.raw_json(body, status, headers)
+
+    @classmethod
+    def raw_json(cls, body, status=200, headers=None):
+        """Response for an already encoded JSON body."""
+        return cls(status, body, {"Content-Type": JSON_TYPE, **(headers or {})})
+
+
+def error_response(error):
+    """The answer to a request whose handler raised ``error``."""
+    if isinstance(error, BadRequest):
+        return Response.json({"message": str(error)}, status=400)
+    return Response.json({"message": f"{type(error).__name__}: {error}"}, status=500)
+
+
+class Router:
+    """Dispatches requests on method and ``/path/{param}`` templates."""
+
+    def __init__(self):
+        self.routes = []
+
+    def add(self, method, template, handler):
+        pattern = re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", template.rstrip("/") or "/")
+        self.routes.append((method, re.compile(pattern + "/?$"), handler))
+
+    def route(self, method, template):
+        def decorator(handler):
+            self.add(method, template, handler)
+            return handler
+        return decorator
+
+    def __call__(self, request):
+        allowed = False
+        for method, pattern, handler in self.routes:
+            match = pattern.match(request.path)
+            if not match:
+                continue
+            if method != request.method:
+                allowed = True
+                continue
+            return handler(request, **match.groupdict())
+        if allowed:
+            return Response.json({}, status=405)
+        return Response.json({}, status=404)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _dispatch(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        request = Request.from_target(self.command, self.path, self.headers, body)
+        try:
+            response = self.server.app(request)
+        except Exception as error:
+            response = error_response(error)
+        try:
+            self.send_response(response.status)
+            for name, value in response.headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(response.body)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(response.body)
+        except ConnectionError:
+            # the client stopped waiting (a read timeout, say); there is no one left to answer
+            self.close_connection = True
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = _dispatch
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadedServer:
+    """Serves ``app`` from a background thread, one thread per connection."""
+
+    def __init__(self, app, host="127.0.0.1", port=0):
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.app = app
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class AsyncioServer:
+    """Serves ``app`` from an asyncio event loop running in a background thread.
+
+    All connections share the one loop, so there is no per-connection thread
+    and keep-alive connections cost almost nothing while idle. ``app`` may
+    return a :class:`Response` or a coroutine resolving to one.
+    """
+
+    def __init__(self, app, host="127.0.0.1", port=0):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.connections = set()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        ready = threading.Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            self.server = self.loop.run_until_complete(
+                asyncio.start_server(self._serve, self.host, self.port))
+            self.port = self.server.sockets[0].getsockname()[1]
+            ready.set()
+            self.loop.run_forever()
+            self.loop.close()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        async def shutdown():
+            self.server.close()
+            for task in self.connections:
+                task.cancel()
+            await asyncio.gather(*self.connections, return_exceptions=True)
+            await self.server.wait_closed()
+            self.loop.stop()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop)
+        self.thread.join()
+
+    async def _serve(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line, _, header_block = head.partition(b"\r\n")
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = http.client.parse_headers(io.BytesIO(header_block))
+                length = int(headers.get("Content-Length") or 0)
+                body = await reader.readexactly(length) if length else b""
+                try:
+                    response = self.app(Request.from_target(method, target, headers, body))
+                    if asyncio.iscoroutine(response):
+                        response = await response
+                except Exception as error:
+                    response = error_response(error)
+                writer.write(self._encode(method, response))
+                await writer.drain()
+                if (headers.get("Connection") or "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            self.connections.discard(task)
+            writer.close()
+
+    @staticmethod
+    def _encode(method, response):
+        lines = [f"HTTP/1.1 {response.status} {HTTPStatus(response.status).phrase}"]
+        lines.extend(f"{name}: {value}" for name, value in response.headers.items())
+        lines.append(f"Content-Length: {len(response.body)}")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        return head if method == "HEAD" else head + response.body
@@ -0,0 +1,196 @@
+"""Harness settings from the command line, the environment and ``.env``.
+
+Every setting is a :class:`Field` with an environment variable and a
+default. The value of a field comes from, in order: its command-line
+option, the process environment, the ``.env`` file found from the tests
+directory upwards, the default. The ``.env`` file is only read (and
+``python-dotenv`` only imported) the first time a field is not set on the
+command line or in the environment, and never for ``workers``, which is
+read while pytest configures itself. The file never changes ``os.environ``.
+
+:meth:`Settings.validate` parses every field and reports all invalid values
+at once; a field read before that is parsed on first access and cached.
+"""
+import os
+from urllib.parse import urlsplit
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# set by support.parallel for its worker processes
+PARALLEL_ADDRESS_ENV = "API_PARALLEL_ADDRESS"
+PARALLEL_STAND_INS_ENV = "API_PARALLEL_STAND_INS"
+PARALLEL_OUTPUT_ENV = "API_PARALLEL_OUTPUT"
+# cassette record modes, see support.cassette; kept here so reading the settings does not import requests
+MODES = ("live", "record", "replay", "new_episodes")
+
+
+class SettingsError(ValueError):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("invalid test settings:\n  " + "\n  ".join(errors))
+
+
+def url(value, local=False):
+    if local and value == "local":
+        return value
+    parts = urlsplit(value)
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        raise ValueError(f"expected an http(s) URL{' or local' if local else ''}, got {value!r}")
+    return value.rstrip("/")
+
+
+def url_or_local(value):
+    return url(value, local=True)
+
+
+def positive(kind):
+    def parse(value):
+        number = kind(value)
+        if number <= 0:
+            raise ValueError(f"must be positive, got {value!r}")
+        return number
+
+    return parse
+
+
+def choice(*options):
+    def parse(value):
+        if value not in options:
+            raise ValueError(f"expected one of {', '.join(options)}, got {value!r}")
+        return value
+
+    return parse
+
+
+def parse_host_limit(value):
+    """Parse ``host=concurrency[/rate]`` as given to ``--host-limit``."""
+    host, _, limit = value.partition("=")
+    concurrency, _, rate = limit.partition("/")
+    if not host or not concurrency.isdigit():
+        raise ValueError(f"expected host=concurrency[/rate], got {value!r}")
+    return host, (int(concurrency), float(rate or 0))
+
+
+class Field:
+    def __init__(self, name, env, default, parse=str, help="", dotenv=True):
+        self.name = name
+        self.env = env
+        self.default = default
+        self.parse = parse
+        self.help = help
+        self.dotenv = dotenv
+
+    @property
+    def option(self):
+        return "--" + self.name.replace("_", "-")
+
+
+FIELDS = (
+    Field("github_url", "GITHUB_API_URL", "https://api.github.com", url_or_local,
+          "base URL for the GitHub REST API, or 'local' for the in-process stand-in"),
+    Field("jsonplaceholder_url", "JSONPLACEHOLDER_URL", "https://jsonplaceholder.typicode.com", url_or_local,
+          "base URL for JSONPlaceholder, or 'local' for the in-process stand-in"),
+    Field("httpbin_url", "HTTPBIN_URL", "https://httpbin.org", url_or_local,
+          "base URL for httpbin, or 'local' for the in-process stand-in"),
+    Field("pool_size", "API_POOL_SIZE", 10, positive(int), "keep-alive connections kept per host"),
+    Field("record_mode", "API_RECORD_MODE", "live", choice(*MODES),
+          "cassette mode: live, record, replay or new_episodes"),
+    Field("cassette_dir", "API_CASSETTE_DIR", os.path.join(HERE, "cassettes"), str,
+          "directory holding one cassette per host"),
+    Field("max_connections", "API_MAX_CONNECTIONS", 100, positive(int),
+          "connections the async clients may open per host"),
+    Field("seed", "API_SEED", 1, int, "seed of the generated request payloads"),
+    # read at configure time, before any test needs .env: option or environment only
+    Field("workers", "API_WORKERS", 1, positive(int),
+          "run the tests on this many worker processes (not read from .env)", dotenv=False),
+    Field("http_cache_dir", "API_HTTP_CACHE_DIR", os.path.join(HERE, ".http-cache"), str,
+          "directory of the persistent ETag cache used for GitHub"),
+    Field("latency_json", "API_LATENCY_JSON", None, str,
+          "write every call's timings and the per-endpoint percentiles to PATH"),
+    Field("connect_timeout", "API_CONNECT_TIMEOUT", 5.0, positive(float),
+          "seconds to wait for a connection to an API host"),
+    Field("read_timeout", "API_READ_TIMEOUT", 30.0, positive(float), "seconds to wait for an API host to answer"),
+    Field("snapshot_dir", "API_SNAPSHOT_DIR", os.path.join(HERE, "snapshots"), str,
+          "directory of the golden files used by the snapshot fixture"),
+    Field("impact_file", "API_IMPACT_FILE", os.path.join(HERE, ".impact.json"), str,
+          "where the fingerprints of passed tests are kept for --changed-only"),
+    Field("state_dir", "API_STATE_DIR", None, str,
+          "keep what is written to the JSONPlaceholder stand-in in DIR (log and snapshot) instead of faking writes"),
+    Field("startup_budget", "API_STARTUP_BUDGET", 3.0, positive(float),
+          "seconds the suite may take to start: importing the conftest and collecting"),
+    # no command-line option: a token does not belong in the shell history
+    Field("token", "TOKEN", None, str),
+)
+
+
+def find_env_file(start=HERE):
+    """The nearest ``.env`` in ``start`` or one of its parents, or None."""
+    directory = os.path.abspath(start)
+    while True:
+        path = os.path.join(directory, ".env")
+        if os.path.isfile(path):
+            return path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+class Settings:
+    """Lazily resolved :data:`FIELDS`; ``options`` maps field names to command-line values."""
+
+    def __init__(self, options=None, environ=None, env_file=HERE, fields=FIELDS):
+        self.fields = {field.name: field for field in fields}
+        self.options = {name: value for name, value in (options or {}).items() if value is not None}
+        self.environ = os.environ if environ is None else environ
+        self._env_file = env_file
+        self._dotenv = None
+        self.sources = {}
+
+    def dotenv(self):
+        """Values of the ``.env`` file, read on first use."""
+        if self._dotenv is None:
+            path = find_env_file(self._env_file) if self._env_file else None
+            if path is None:
+                self._dotenv = {}
+            else:
+                from dotenv import dotenv_values
+
+                self._dotenv = {k: v for k, v in dotenv_values(path).items() if v is not None}
+        return self._dotenv
+
+    def raw(self, name):
+        """The unparsed value of field ``name`` and where it came from."""
+        field = self.fields[name]
+        if name in self.options:
+            return self.options[name], field.option
+        if field.env in self.environ:
+            return self.environ[field.env], f"${field.env}"
+        if field.dotenv and field.env in self.dotenv():
+            return self.dotenv()[field.env], f"{field.env} in .env"
+        return field.default, "default"
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name not in self.__dict__.get("fields", {}):
+            raise AttributeError(name)
+        field = self.fields[name]
+        value, source = self.raw(name)
+        if value is not None and source != "default":
+            try:
+                value = field.parse(value)
+            except ValueError as exc:
+                raise SettingsError([f"{name} ({source}): {exc}"]) from None
+        self.__dict__[name] = value
+        self.sources[name] = source
+        return value
+
+    def validate(self):
+        """Resolve every field, raising one :class:`SettingsError` listing all invalid values."""
+        errors = []
+        for name in self.fields:
+            try:
+                getattr(self, name)
+            except SettingsError as exc:
+                errors.extend(exc.errors)
+        if errors:
+            raise SettingsError(errors)
+        return self
@@ -0,0 +1,277 @@
+"""Golden-file assertions for response bodies that drift over time.
+
+``snapshot.match(value)`` compares a response (or decoded JSON) with the
+golden file stored for the test. A mismatch fails with the changed JSON
+paths, and so does a missing golden file: ``--snapshot-update`` records new
+golden files and rewrites changed ones instead of failing, so an expected
+drift is a one-command review rather than an edit, and a fresh checkout
+never passes by recording what it was meant to check. Only the goldens of
+the local stand-ins are committed; the caller passes ``on_missing`` to skip
+rather than fail where a target's goldens are recorded by whoever runs it.
+
+Values the service changes on every call are listed as ``ignore`` patterns
+and stored as ``"<ignored>"``. A pattern is a JSON path where ``[*]`` is any
+index, ``.*`` any key and ``..key`` ``key`` at any depth, e.g.
+``"$..updated_at"`` or ``"$.items[*].score"``.
+
+A golden file is one line of metadata followed by the normalized body. The
+metadata holds a digest of the raw response bytes and a Merkle digest of the
+normalized body, where each object and array is hashed from its children's
+hashes. An unchanged response matches on the raw digest without being
+parsed and without reading the stored body; a response that only differs in
+ignored values matches on the root digest. Only a real mismatch loads the
+stored body, and the diff then descends only into subtrees whose digests
+differ, so a one-field change in ``/emojis`` costs one path, not 1900 keys.
+"""
+import hashlib
+import json
+import os
+import re
+
+import requests
+
+IGNORED = "<ignored>"
+
+# GitHub values that change without the resource changing
+GITHUB_VOLATILE = ("$..updated_at", "$..pushed_at", "$..stargazers_count", "$..watchers_count",
+                   "$..watchers", "$..forks_count", "$..forks", "$..open_issues_count", "$..open_issues",
+                   "$..size", "$..followers", "$..following", "$..score")
+
+_TOKEN = re.compile(r"\.\.(\w[\w+-]*)|\.(\*|\w[\w+-]*)|\[(\*|\d+)\]")
+
+
+class SnapshotMissing(AssertionError):
+    def __init__(self, name, path):
+        self.path = path
+        super().__init__(f"no golden file for snapshot {name!r} at {path} "
+                         "(run with --snapshot-update to record it)")
+
+
+class SnapshotMismatch(AssertionError):
+    def __init__(self, name, changes, limit=20):
+        self.changes = changes
+        lines = changes[:limit]
+        if len(changes) > limit:
+            lines.append(f"... and {len(changes) - limit} more")
+        super().__init__(f"snapshot {name!r} changed (rerun with --snapshot-update to accept):\n  "
+                         + "\n  ".join(lines))
+
+
+def parse_path(pattern):
+    """``"$.items[*]..id"`` as ``[("key", "items"), ("index", "*"), ("deep", "id")]``."""
+    if not pattern.startswith("$"):
+        raise ValueError(f"snapshot path must start with '$': {pattern!r}")
+    tokens = []
+    position = 1
+    while position < len(pattern):
+        match = _TOKEN.match(pattern, position)
+        if match is None:
+            raise ValueError(f"bad snapshot path {pattern!r} at {pattern[position:]!r}")
+        deep, key, index = match.groups()
+        if deep is not None:
+            tokens.append(("deep", deep))
+        elif key is not None:
+            tokens.append(("key", key))
+        else:
+            tokens.append(("index", index))
+        position = match.end()
+    return tuple(tokens)
+
+
+def _advance(states, step, is_index):
+    """Pattern states after stepping into child ``step``, and whether one of them ended there."""
+    following = []
+    ended = False
+    for tokens in states:
+        kind, name = tokens[0]
+        if kind == "deep":
+            following.append(tokens)
+            hit = not is_index and name == step
+        elif kind == "index":
+            hit = is_index and name in ("*", str(step))
+        else:
+            hit = not is_index and name in ("*", step)
+        if hit:
+            if len(tokens) == 1:
+                ended = True
+            else:
+                following.append(tokens[1:])
+    return following, ended
+
+
+def normalize(value, ignore=()):
+    """Plain JSON data with every value matched by an ``ignore`` pattern replaced."""
+    return _normalize(value, [parse_path(pattern) for pattern in ignore if pattern != "$"])
+
+
+def _normalize(value, states):
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            following, ended = _advance(states, key, False) if states else ((), False)
+            result[key] = IGNORED if ended else _normalize(item, following)
+        return result
+    if isinstance(value, list):
+        result = []
+        for index, item in enumerate(value):
+            following, ended = _advance(states, index, True) if states else ((), False)
+            result.append(IGNORED if ended else _normalize(item, following))
+        return result
+    return value
+
+
+def _hash(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class Digests:
+    """Merkle digests of one JSON tree, computed once per container."""
+
+    def __init__(self):
+        self.cache = {}
+
+    def __call__(self, value):
+        if isinstance(value, dict):
+            key = id(value)
+            if key not in self.cache:
+                self.cache[key] = _hash(b"{" + b"".join(
+                    _hash(json.dumps(k).encode()) + self(value[k]) for k in sorted(value)))
+            return self.cache[key]
+        if isinstance(value, list):
+            key = id(value)
+            if key not in self.cache:
+                self.cache[key] = _hash(b"[" + b"".join(self(item) for item in value))
+            return self.cache[key]
+        return _hash(json.dumps(value).encode())
+
+
+def _path(parent, step):
+    if isinstance(step, int):
+        return f"{parent}[{step}]"
+    if re.fullmatch(r"\w[\w+-]*", step):
+        return f"{parent}.{step}"
+    return f"{parent}[{json.dumps(step)}]"
+
+
+def _short(value):
+    text = json.dumps(value, ensure_ascii=False)
+    return text if len(text) <= 60 else text[:57] + "..."
+
+
+def diff(expected, actual, path="$", expected_digests=None, actual_digests=None):
+    """Changes between two normalized trees, one line per differing JSON path."""
+    expected_digests = expected_digests or Digests()
+    actual_digests = actual_digests or Digests()
+    if expected_digests(expected) == actual_digests(actual):
+        return []
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        changes = []
+        for key in expected:
+            if key not in actual:
+                changes.append(f"{_path(path, key)}: missing (was {_short(expected[key])})")
+            else:
+                changes.extend(diff(expected[key], actual[key], _path(path, key), expected_digests, actual_digests))
+        changes.extend(f"{_path(path, key)}: added {_short(actual[key])}" for key in actual if key not in expected)
+        return changes
+    if isinstance(expected, list) and isinstance(actual, list):
+        changes = []
+        for index, (old, new) in enumerate(zip(expected, actual)):
+            changes.extend(diff(old, new, _path(path, index), expected_digests, actual_digests))
+        if len(expected) != len(actual):
+            changes.append(f"{path}: length {len(expected)} -> {len(actual)}")
+        return changes
+    return [f"{path}: {_short(expected)} -> {_short(actual)}"]
+
+
+class SnapshotStats:
+    def __init__(self):
+        self.matched = 0
+        self.raw_matched = 0
+        self.written = 0
+        self.updated = 0
+        self.failed = 0
+        self.unrecorded = 0
+
+    def report(self):
+        if not (self.matched or self.written or self.updated or self.failed or self.unrecorded):
+            return []
+        return [f"{self.matched} matched ({self.raw_matched} on the raw digest), {self.written} written, "
+                f"{self.updated} updated, {self.failed} changed or missing, {self.unrecorded} not recorded yet"]
+
+
+class Snapshot:
+    """The golden files of one test, ``<directory>/<test>.json``, ``<test>.1.json``, ..."""
+
+    def __init__(self, directory, test, stats=None, update=False, on_missing=None):
+        self.directory = directory
+        self.test = re.sub(r"[^\w.-]+", "_", test).strip("_")
+        self.stats = stats or SnapshotStats()
+        self.update = update
+        self.on_missing = on_missing
+        self.count = 0
+
+    def path(self, name):
+        return os.path.join(self.directory, f"{name}.json")
+
+    def match(self, value, ignore=(), name=None):
+        """Compare ``value`` (a ``requests.Response`` or JSON data) with its golden file."""
+        if name is None:
+            name = self.test if not self.count else f"{self.test}.{self.count}"
+            self.count += 1
+        ignore = sorted(ignore)
+        raw = None
+        if isinstance(value, requests.Response):
+            raw = _hash(value.content).hex()
+        path = self.path(name)
+        meta = self._read_meta(path)
+        if meta is not None and raw is not None and meta["raw"] == raw and meta["ignore"] == ignore:
+            self.stats.matched += 1
+            self.stats.raw_matched += 1
+            return
+        actual = normalize(value.json() if raw is not None else value, ignore)
+        actual_digests = Digests()
+        digest = actual_digests(actual).hex()
+        if meta is None:
+            if not self.update:
+                if self.on_missing is not None:
+                    self.stats.unrecorded += 1
+                    # expected to raise (pytest.skip); if it returns there is nothing to compare with
+                    self.on_missing(name, path)
+                    return
+                self.stats.failed += 1
+                raise SnapshotMissing(name, path)
+            self._write(path, raw, digest, ignore, actual)
+            self.stats.written += 1
+            return
+        if meta["digest"] == digest and meta["ignore"] == ignore:
+            self.stats.matched += 1
+            return
+        changes = diff(self._read_body(path), actual, actual_digests=actual_digests)
+        if self.update:
+            self._write(path, raw, digest, ignore, actual)
+            self.stats.updated += 1
+            return
+        self.stats.failed += 1
+        raise SnapshotMismatch(name, changes or ["ignore patterns changed"])
+
+    @staticmethod
+    def _read_meta(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.loads(f.readline())
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _read_body(path):
+        with open(path, encoding="utf-8") as f:
+            f.readline()
+            return json.load(f)
+
+    @staticmethod
+    def _write(path, raw, digest, ignore, body):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"digest": digest, "raw": raw, "ignore": ignore}) + "\n")
+            json.dump(body, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write("\n")
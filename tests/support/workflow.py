@@ -0,0 +1,130 @@
+"""Multi-step API scenarios run for many independent instances at once.
+
+A :class:`Workflow` is a list of stages. A stage is one :class:`Step`, or a
+list of steps that only depend on earlier stages and are sent together.
+Steps read the instance's context (``path`` is formatted with it, ``json``
+may be a function of it) and ``save`` values from their response into it,
+which is how ``post_id`` flows from the create into the following steps
+(see :data:`POST_LIFECYCLE`).
+
+:meth:`Workflow.run` executes ``instances`` chains on one async client
+(:class:`support.aclient.AsyncHostClient`, or a blocking client wrapped in
+:class:`support.aclient.ThreadedClient`), at most ``concurrency`` at a time.
+The stages of each chain run in order, while different chains interleave
+freely. The result reports end-to-end scenario throughput and latency.
+"""
+import asyncio
+import time
+
+from support.latency import percentile
+
+
+class StepFailed(AssertionError):
+    def __init__(self, step, instance, response):
+        self.step = step
+        self.instance = instance
+        self.response = response
+        super().__init__(f"instance {instance}, step {step.name!r}: {step.method} {response.url} answered "
+                         f"{response.status_code}, expected {step.expect}")
+
+
+class Step:
+    def __init__(self, name, method, path, json=None, expect=200, save=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.json = json
+        self.expect = expect
+        self.save = save or {}
+
+    async def run(self, client, context):
+        payload = self.json(context) if callable(self.json) else self.json
+        response = await client.request(self.method, self.path.format(**context), json=payload)
+        if response.status_code != self.expect:
+            raise StepFailed(self, context["instance"], response)
+        if self.save:
+            data = response.json()
+            for name, key in self.save.items():
+                context[name] = data[key]
+        return response
+
+
+class WorkflowResult:
+    def __init__(self, name, contexts, durations, failures, elapsed):
+        self.name = name
+        self.contexts = contexts
+        self.durations = sorted(durations)
+        self.failures = failures
+        self.elapsed = elapsed
+
+    @property
+    def completed(self):
+        return len(self.durations)
+
+    @property
+    def throughput(self):
+        """Completed scenarios per second."""
+        return self.completed / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        durations = self.durations or [0.0]
+        return {
+            "scenarios": self.completed + len(self.failures),
+            "failed": len(self.failures),
+            "throughput": self.throughput,
+            "p50_ms": percentile(durations, 50) * 1000,
+            "p95_ms": percentile(durations, 95) * 1000,
+        }
+
+    def check(self):
+        """Raise the first failure, noting how many instances failed in total."""
+        if self.failures:
+            first = self.failures[0]
+            raise AssertionError(f"{self.name}: {len(self.failures)} of {len(self.contexts)} instances failed; "
+                                 f"first: {first}") from first
+
+
+class Workflow:
+    def __init__(self, name, stages):
+        self.name = name
+        self.stages = [stage if isinstance(stage, (list, tuple)) else [stage] for stage in stages]
+
+    async def run_one(self, client, context):
+        for stage in self.stages:
+            if len(stage) == 1:
+                await stage[0].run(client, context)
+            else:
+                await asyncio.gather(*(step.run(client, context) for step in stage))
+        return context
+
+    async def run(self, client, instances=1, concurrency=50, context=None):
+        """Run ``instances`` chains; ``context(n)`` gives the starting context of instance ``n``."""
+        slots = asyncio.Semaphore(concurrency)
+        contexts = [{"instance": n, **(context(n) if context else {})} for n in range(instances)]
+        durations = []
+        failures = []
+
+        async def chain(ctx):
+            async with slots:
+                start = time.perf_counter()
+                try:
+                    await self.run_one(client, ctx)
+                except (AssertionError, KeyError, ValueError, OSError, asyncio.IncompleteReadError) as exc:
+                    failures.append(exc)
+                    return
+                durations.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(chain(ctx) for ctx in contexts))
+        return WorkflowResult(self.name, contexts, durations, failures, time.perf_counter() - start)
+
+
+# JSONPlaceholder: create a post, comment on it, then delete it. The comment
+# must land before the delete (the durable stand-in keeps both), so the three
+# steps are separate stages. The context needs a "post" and a "comment" payload.
+POST_LIFECYCLE = Workflow("post lifecycle", [
+    Step("create post", "POST", "/posts", json=lambda ctx: ctx["post"], expect=201, save={"post_id": "id"}),
+    Step("comment", "POST", "/comments", json=lambda ctx: {**ctx["comment"], "postId": ctx["post_id"]},
+         expect=201),
+    Step("delete post", "DELETE", "/posts/{post_id}"),
+])
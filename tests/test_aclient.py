@@ -0,0 +1,109 @@
+import asyncio
+import socket
+
+import pytest
+
+from support.aclient import AsyncHostClient
+from support.server import AsyncioServer, Response, Router
+
+
+@pytest.fixture(scope="module")
+def server():
+    router = Router()
+    in_flight = {"now": 0, "peak": 0}
+
+    @router.route("GET", "/items/{item_id}")
+    async def item(request, item_id):
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        await asyncio.sleep(0)
+        in_flight["now"] -= 1
+        return Response.json({"id": int(item_id), "q": request.arg("q")})
+
+    @router.route("POST", "/echo")
+    def echo(request):
+        return Response.json({"body": request.json(), "token": request.headers.get("Authorization")},
+                             status=201)
+
+    server = AsyncioServer(router).start()
+    server.in_flight = in_flight
+    yield server
+    server.stop()
+
+
+async def test_thousands_in_flight_share_a_small_pool(server):
+    server.in_flight["peak"] = 0
+    client = AsyncHostClient("test", server.url, max_connections=20)
+    responses = await asyncio.gather(*(client.get(f"/items/{n}") for n in range(2000)))
+    await client.aclose()
+
+    assert [r.json()["id"] for r in responses] == list(range(2000))
+    assert 1 < server.in_flight["peak"] <= 20
+    pool, = client.pools.values()
+    assert pool.opened <= 20
+
+
+async def test_request_arguments_match_the_blocking_client(server):
+    client = AsyncHostClient("test", server.url, headers={"Authorization": "Bearer t"},
+                             response_hooks=[lambda r: seen.append(r.status_code)])
+    seen = []
+    r = await client.get("/items/7", params={"q": "x y"})
+    r2 = await client.post("/echo", json={"title": "ção"})
+    await client.aclose()
+
+    assert r.json() == {"id": 7, "q": "x y"}
+    assert r2.status_code == 201
+    assert r2.json() == {"body": {"title": "ção"}, "token": "Bearer t"}
+    assert seen == [200, 201]
+
+
+async def test_unknown_path(server):
+    client = AsyncHostClient("test", server.url)
+    r = await client.get("/nope")
+    await client.aclose()
+
+    assert r.status_code == 404
+    assert r.url == server.url + "/nope"
+
+
+async def test_a_refused_address_falls_back_to_the_next(server, monkeypatch):
+    port = int(server.url.rsplit(":", 1)[1])
+    getaddrinfo = socket.getaddrinfo
+
+    def resolve(host, *args, **kwargs):
+        # nothing listens on 127.0.0.2: the first address is refused
+        if host == "dual.test":
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port))
+                    for address in ("127.0.0.2", "127.0.0.1")]
+        return getaddrinfo(host, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", resolve)
+    client = AsyncHostClient("test", f"http://dual.test:{port}")
+    r = await client.get("/items/3")
+    await client.aclose()
+
+    assert r.json()["id"] == 3
+    pool, = client.pools.values()
+    assert pool.opened == 1
+
+
+async def test_failed_connects_give_their_slot_back():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    client = AsyncHostClient("test", f"http://127.0.0.1:{port}", max_connections=2, timeout=5.0)
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(client.get("/items/1"), 5.0)
+
+    # with a slot lost to each failure these would wait for a connection forever
+    router = Router()
+    router.add("GET", "/items/{item_id}", lambda request, item_id: Response.json({"id": int(item_id)}))
+    server = AsyncioServer(router, port=port).start()
+    try:
+        responses = await asyncio.wait_for(asyncio.gather(*(client.get(f"/items/{n}") for n in range(4))), 5.0)
+    finally:
+        await client.aclose()
+        server.stop()
+
+    assert [r.json()["id"] for r in responses] == [0, 1, 2, 3]
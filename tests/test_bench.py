@@ -0,0 +1,70 @@
+import asyncio
+
+from support.bench import Baseline, Endpoint, LoadResult, closed_loop, combine, open_loop
+
+
+class _Client:
+    name = "fake"
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.paths = []
+        self.params = []
+
+    async def request(self, method, path, json=None, params=None):
+        self.paths.append(path)
+        self.params.append(params)
+        await asyncio.sleep(self.delay)
+        return type("Response", (), {"status_code": 200})()
+
+
+def test_baseline_flags_median_regressions(tmp_path):
+    path = tmp_path / "baseline.json"
+    baseline = Baseline(str(path))
+    fast = LoadResult("closed/4", [0.010] * 100, 0, 1.0).summary()
+    assert baseline.compare("x", fast, 0.25) is None
+    baseline.save()
+
+    baseline = Baseline(str(path))
+    assert baseline.compare("x", LoadResult("closed/4", [0.012] * 100, 0, 1.0).summary(), 0.25) is None
+    message = baseline.compare("x", LoadResult("closed/4", [0.020] * 100, 0, 1.0).summary(), 0.25)
+    assert message.startswith("x: p50 20.0 ms exceeds baseline 10.0 ms")
+    # 40% slower, but by less than the floor
+    assert baseline.compare("x", LoadResult("closed/4", [0.014] * 100, 0, 1.0).summary(), 0.25, 5.0) is None
+
+
+def test_repeats_are_combined_on_medians():
+    repeats = [LoadResult("open/10rps", [latency] * 10, errors, 1.0).summary()
+               for latency, errors in [(0.010, 0), (0.200, 2), (0.012, 0)]]
+    summary = combine(repeats)
+
+    assert summary["model"] == "open/10rps"
+    assert (summary["requests"], summary["errors"]) == (32, 2)
+    assert summary["p50_ms"] == summary["p95_ms"] == 12.0 and summary["throughput"] == 10.0
+
+
+def test_load_models(event_loop):
+    endpoint = Endpoint("GET", "/posts/{id}", ids=range(1, 4))
+
+    client = _Client(0.01)
+    result = event_loop.run_until_complete(closed_loop(client, endpoint, 4, 0.1))
+    # each caller gets one request in and, at 10 ms apiece, at most 11 before the deadline
+    assert 4 <= len(result.latencies) <= 4 * 11
+    assert client.paths[:4] == ["/posts/1", "/posts/2", "/posts/3", "/posts/1"]
+
+    # a slow server does not slow down the open-loop schedule; it shows up as latency
+    client = _Client(0.05)
+    result = event_loop.run_until_complete(open_loop(client, endpoint, 200, 0.1))
+    assert len(result.latencies) == 20
+    assert result.summary()["p50_ms"] >= 50
+
+
+def test_ids_cycle_through_params(event_loop):
+    endpoint = Endpoint("GET", "/search/repositories", ids=["react", "language:go"],
+                        params={"q": "{id}", "per_page": 5})
+    client = _Client(0)
+    event_loop.run_until_complete(open_loop(client, endpoint, 1000, 0.003))
+
+    assert client.paths == ["/search/repositories"] * 3
+    assert [params["q"] for params in client.params] == ["react", "language:go", "react"]
+    assert client.params[0]["per_page"] == 5
@@ -0,0 +1,49 @@
+"""Load benchmarks against the local stand-ins; run with ``pytest --benchmark``."""
+import pytest
+
+from support.aclient import AsyncHostClient
+from support.bench import GITHUB_ENDPOINTS, JSONPLACEHOLDER_ENDPOINTS
+from support.fake_github import RATE_LIMITS, FakeGitHub
+from support.server import ThreadedServer
+
+pytestmark = pytest.mark.benchmark
+
+
+@pytest.fixture(scope="module")
+def local_jsonplaceholder(event_loop, jsonplaceholder_server, api_settings):
+    client = AsyncHostClient("jsonplaceholder", jsonplaceholder_server.url,
+                             max_connections=api_settings.max_connections)
+    yield client
+    event_loop.run_until_complete(client.aclose())
+
+
+@pytest.fixture(scope="module")
+def local_github(event_loop, api_settings):
+    # a stand-in of its own, with quotas no benchmark runs out of
+    unlimited = {bucket: (10**9, 10**9, 3600) for bucket in RATE_LIMITS}
+    server = ThreadedServer(FakeGitHub(rate_limits=unlimited)).start()
+    client = AsyncHostClient("github", server.url, headers={"Authorization": "Bearer benchmark"},
+                             max_connections=api_settings.max_connections)
+    yield client
+    event_loop.run_until_complete(client.aclose())
+    server.stop()
+
+
+@pytest.mark.parametrize("model", ["closed", "open"])
+@pytest.mark.parametrize("endpoint", JSONPLACEHOLDER_ENDPOINTS, ids=lambda endpoint: endpoint.name)
+async def test_jsonplaceholder(benchmark, local_jsonplaceholder, endpoint, model):
+    summary, regression = await benchmark.run(local_jsonplaceholder, endpoint, model)
+
+    assert summary["errors"] == 0
+    if regression:
+        pytest.fail(regression, pytrace=False)
+
+
+@pytest.mark.parametrize("model", ["closed", "open"])
+@pytest.mark.parametrize("endpoint", GITHUB_ENDPOINTS, ids=lambda endpoint: endpoint.name)
+async def test_github(benchmark, local_github, endpoint, model):
+    summary, regression = await benchmark.run(local_github, endpoint, model)
+
+    assert summary["errors"] == 0
+    if regression:
+        pytest.fail(regression, pytrace=False)
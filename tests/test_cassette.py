@@ -0,0 +1,88 @@
+import pytest
+import requests
+
+from support.cassette import Cassette, CassetteLayer, CassetteMiss, build_response, merge
+from support.client import HostClient
+
+
+class CountingAdapter(requests.adapters.BaseAdapter):
+    """Answers every request with its own URL and counts the calls."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def send(self, request, **kwargs):
+        self.calls += 1
+        interaction = {"response": {"status": 200, "reason": "OK",
+                                    "headers": {"Content-Type": "application/json"},
+                                    "body": {"text": f'{{"url": "{request.url}"}}'}}}
+        return build_response(request, interaction)
+
+    def close(self):
+        pass
+
+
+def make_client(path, mode, episodes=None):
+    client = HostClient("test", "https://example.test")
+    upstream = CountingAdapter()
+    client.transport = upstream
+    client.add_layer(CassetteLayer(Cassette(str(path), episodes).load(), mode))
+    return client, upstream
+
+
+def test_record_then_replay(tmp_path):
+    path = tmp_path / "test.jsonl.gz"
+    client, upstream = make_client(path, "record")
+    for n in range(300):
+        client.get("/items", params={"id": n})
+    client.close()
+    assert upstream.calls == 300
+
+    client, upstream = make_client(path, "replay")
+    for n in range(300):
+        assert client.get("/items", params={"id": n}).json()["url"].endswith(f"id={n}")
+    assert upstream.calls == 0
+
+
+def test_replay_miss_raises(tmp_path):
+    client, _ = make_client(tmp_path / "empty.jsonl.gz", "replay")
+    with pytest.raises(CassetteMiss):
+        client.get("/missing")
+
+
+def test_new_episodes_records_only_unknown_requests(tmp_path):
+    path = tmp_path / "test.jsonl.gz"
+    client, upstream = make_client(path, "new_episodes")
+    client.get("/a?x=1&y=2")
+    client.get("/a?y=2&x=1")
+    client.post("/a", json={"title": "novo"})
+    client.close()
+    assert upstream.calls == 2
+
+    client, upstream = make_client(path, "new_episodes")
+    client.post("/a", json={"title": "novo"})
+    client.post("/a", json={"title": "outro"})
+    assert upstream.calls == 1
+
+
+def test_workers_episodes_are_merged(tmp_path):
+    path = tmp_path / "test.jsonl.gz"
+    client, _ = make_client(path, "record")
+    client.get("/known")
+    client.close()
+
+    episodes = [str(tmp_path / f"worker{n}.jsonl.gz") for n in range(2)]
+    for n, episode in enumerate(episodes):
+        client, upstream = make_client(path, "new_episodes", episode)
+        client.get("/known")
+        client.get("/new", params={"worker": n})
+        client.close()
+        assert upstream.calls == 1
+    assert merge(str(path), episodes) == 3
+
+    client, upstream = make_client(path, "replay")
+    for url in ["/known", "/new?worker=0", "/new?worker=1"]:
+        client.get(url)
+    assert upstream.calls == 0
+    assert merge(str(path), episodes, keep=False) == 2
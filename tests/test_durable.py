@@ -0,0 +1,107 @@
+import json
+import threading
+import time
+
+import pytest
+
+from support.durable import DurableStore, Snapshot, WriteAheadLog, read_log, write_snapshot
+from support.fake_jsonplaceholder import FakeJSONPlaceholder, Table, build_tables
+from support.server import Request
+
+
+def call(app, method, path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    response = app(Request.from_target(method, path, {}, body))
+    return response.status, json.loads(response.body)
+
+
+def test_writes_persist_across_restarts(tmp_path):
+    store = DurableStore(str(tmp_path), build_tables, fsync=False)
+    app = FakeJSONPlaceholder(store=store)
+    assert call(app, "POST", "/posts", {"title": "t", "userId": 1}) == (201, {"title": "t", "userId": 1, "id": 101})
+    call(app, "PATCH", "/todos/5", {"completed": True})
+    call(app, "DELETE", "/comments/3")
+    assert call(app, "GET", "/users/1/posts?title=t")[1][0]["id"] == 101
+    # a nested create stores its foreign key as an int, so the table still sorts on it
+    assert call(app, "POST", "/posts/2/comments", {"name": "n"})[1]["postId"] == 2
+    assert call(app, "GET", "/comments?_sort=postId&_order=desc&_limit=1")[1][0]["postId"] == 100
+    store.close()
+
+    reopened = FakeJSONPlaceholder(store=DurableStore(str(tmp_path), build_tables, fsync=False))
+    assert call(reopened, "GET", "/posts/101")[1]["title"] == "t"
+    assert call(reopened, "GET", "/todos/5")[1]["completed"] is True
+    assert call(reopened, "GET", "/comments/3")[0] == 404
+    assert call(reopened, "DELETE", "/comments/3")[0] == 404
+    # the log was compacted into the snapshot on opening
+    assert reopened.store.checkpoints == 1 and read_log(reopened.store.log_path) == []
+    assert [t["id"] for t in call(reopened, "GET", "/todos?completed=true&userId=1")[1]].count(5) == 1
+
+
+def test_reset_drops_writes_since_the_snapshot(tmp_path):
+    store = DurableStore(str(tmp_path), build_tables, fsync=False)
+    app = FakeJSONPlaceholder(store=store)
+    call(app, "PUT", "/posts/1", {"title": "changed", "userId": 9})
+    call(app, "POST", "/posts", {"title": "new"})
+    assert len(call(app, "GET", "/users/9/posts")[1]) == 11
+
+    store.reset()
+    assert call(app, "GET", "/posts/1")[1]["userId"] == 1
+    assert call(app, "GET", "/posts/101")[0] == 404
+    assert len(call(app, "GET", "/users/9/posts")[1]) == 10
+    store.close()
+
+
+def test_concurrent_writes_share_fsyncs(tmp_path):
+    log = WriteAheadLog(str(tmp_path / "wal.log"))
+
+    def writer(n):
+        for i in range(20):
+            log.sync(log.write({"writer": n, "i": i}))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    log.close()
+
+    records = read_log(log.path)
+    assert len(records) == 160
+    assert [r["i"] for r in records if r["writer"] == 3] == list(range(20))
+    assert log.commits < 160
+
+
+def test_a_torn_last_record_is_cut_off(tmp_path):
+    path = tmp_path / "wal.log"
+    path.write_bytes(b'{"op": "delete", "table": "posts", "id": 1}\n{"op": "put", "tab')
+    assert read_log(str(path)) == [{"op": "delete", "table": "posts", "id": 1}]
+    assert path.read_bytes().endswith(b"}\n")
+
+
+@pytest.mark.benchmark
+def test_a_large_snapshot_opens_at_once(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    rows = ({"id": n, "userId": n % 1000, "completed": n % 3 == 0, "title": f"todo {n}"} for n in range(1, 300_001))
+    write_snapshot(path, {"todos": Table(list(rows), ["userId", "completed"])})
+
+    start = time.perf_counter()
+    tables = Snapshot(path).tables()
+    todos = tables["todos"]
+    row = todos.rows[265_432]
+    mine = todos.ids({"userId": ["7"], "completed": ["true"]})
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.5
+    assert row == {"id": 265432, "userId": 432, "completed": False, "title": "todo 265432"}
+    assert len(todos) == 300_000
+    assert mine[:2] == [2007, 5007] and len(mine) == 100
+
+
+@pytest.mark.fresh
+def test_stand_in_keeps_writes_with_state_dir(jsonplaceholder_store, jsonplaceholder, api_settings):
+    if jsonplaceholder_store is None or api_settings.jsonplaceholder_url != "local":
+        pytest.skip("needs --jsonplaceholder-url local and --state-dir")
+    created = jsonplaceholder.post("/posts", json={"title": "kept", "userId": 3}).json()
+
+    assert jsonplaceholder.get(f"/posts/{created['id']}").json()["title"] == "kept"
+    assert created["id"] in [p["id"] for p in jsonplaceholder.get("/users/3/posts").json()]
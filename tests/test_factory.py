@@ -0,0 +1,53 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from support import schema
+from support.aclient import AsyncHostClient
+from support.factory import PayloadFactory
+
+# the server assigns the id
+NEW = {name: schema.compile_schema({k: v for k, v in validator.schema.items() if k != "id"}, f"new {name}")
+       for name, validator in [("post", schema.POST), ("comment", schema.COMMENT),
+                               ("todo", schema.TODO), ("user", schema.USER)]}
+
+
+def test_same_seed_and_stream_same_payloads():
+    assert PayloadFactory(3).many("post", 50) == PayloadFactory(3).many("post", 50)
+    assert PayloadFactory(3, stream="a").encoded("comment", 50) == PayloadFactory(3, stream="a").encoded("comment", 50)
+    assert PayloadFactory(3, stream="a").many("todo", 50) != PayloadFactory(3, stream="b").many("todo", 50)
+
+
+@pytest.mark.parametrize("resource", ["post", "comment", "todo", "user"])
+def test_payloads_are_valid(resource):
+    factory = PayloadFactory(11)
+    assert NEW[resource].many().errors(factory.many(resource, 500)) == []
+    if resource in factory.byte_templates:
+        decoded = [json.loads(body) for body in factory.encoded(resource, 500)]
+        assert NEW[resource].many().errors(decoded) == []
+
+
+# a throughput figure: run with the benchmarks, where the machine is expected to be quiet
+@pytest.mark.benchmark
+def test_bulk_generation_rate():
+    factory = PayloadFactory()
+    start = time.perf_counter()
+    bodies = factory.encoded("post", 50_000)
+    elapsed = time.perf_counter() - start
+
+    assert len(bodies) == 50_000
+    assert len(bodies) / elapsed > 20_000
+
+
+async def test_create_sweep_against_the_stand_in(jsonplaceholder_server):
+    client = AsyncHostClient("jsonplaceholder", jsonplaceholder_server.url, max_connections=20)
+    bodies = PayloadFactory(5).encoded("todo", 1000)
+    responses = await asyncio.gather(*(client.post("/todos", data=body,
+                                                   headers={"Content-Type": "application/json"})
+                                       for body in bodies))
+    await client.aclose()
+
+    assert {r.status_code for r in responses} == {201}
+    assert schema.TODOS.errors([r.json() for r in responses]) == []
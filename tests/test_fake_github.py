@@ -0,0 +1,101 @@
+import json
+import statistics
+import time
+
+import pytest
+
+from support.client import HostClient
+from support.fake_github import FakeGitHub
+from support.pagination import count_items, iter_pages_items
+from support.ratelimit import RateBudget, RateLimitLayer
+from support.server import Request, ThreadedServer
+
+UNLIMITED = {"core": (10**9, 10**9, 3600), "search": (10**9, 10**9, 60)}
+
+
+@pytest.fixture(scope="module")
+def fake():
+    return FakeGitHub(repos=100_000, rate_limits=UNLIMITED)
+
+
+def get(app, target, **headers):
+    return app(Request.from_target("GET", target, {"Host": "api.test", **headers}, b""))
+
+
+def search(app, query, **params):
+    target = "/search/repositories?" + "&".join(f"{k}={v}" for k, v in {"q": query, **params}.items())
+    return json.loads(get(app, target).body)
+
+
+def test_search_qualifiers_use_the_index(fake):
+    found = search(fake, "license:mit+language:python", per_page=100)
+    assert found["total_count"] == len(fake.index.search([("license", "mit"), ("language", "python")]))
+    assert all(item["license"]["key"] == "mit" and item["language"] == "Python" for item in found["items"])
+    stars = [item["stargazers_count"] for item in found["items"]]
+    assert stars == sorted(stars, reverse=True)
+
+    assert search(fake, "user:facebook+react")["items"][0]["full_name"] == "facebook/react"
+    assert {item["owner"]["login"] for item in search(fake, "org:google", per_page=100)["items"]} == {"google"}
+    ranged = search(fake, "language:go+stars:10..100", per_page=100)["items"]
+    assert ranged and all(10 <= item["stargazers_count"] <= 100 for item in ranged)
+    assert search(fake, "nosuchword")["total_count"] == 0
+
+
+@pytest.mark.benchmark
+def test_search_stays_within_a_few_milliseconds(fake):
+    queries = ["license:apache-2.0", "language:javascript+stars:>50", "fast+api", "user:microsoft+language:go",
+               "license:mit+language:python&sort=forks"]
+    durations = []
+    for _ in range(20):
+        for query in queries:
+            start = time.perf_counter()
+            response = get(fake, f"/search/repositories?q={query}&per_page=30")
+            durations.append(time.perf_counter() - start)
+            assert response.status == 200
+    assert statistics.median(durations) < 0.005
+
+
+def test_search_pages_stop_at_the_first_thousand(fake):
+    response = get(fake, "/search/repositories?q=license:mit&per_page=100&page=10")
+    assert response.status == 200
+    assert 'rel="next"' not in response.headers["Link"]
+    assert get(fake, "/search/repositories?q=license:mit&per_page=100&page=11").status == 422
+    assert get(fake, "/search/repositories").status == 422
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = ThreadedServer(FakeGitHub(repos=5000, rate_limits={"core": (50, 5, 3600), "search": (3, 1, 60)})).start()
+    yield server
+    server.stop()
+
+
+def test_link_pagination_walks_every_page(server):
+    client = HostClient("local", server.url, headers={"Authorization": "Bearer t"})
+    contributors = count_items(client, "/repos/kubernetes/kubernetes/contributors", params={"per_page": 100})
+    followers = list(iter_pages_items(client, "/users/octocat/followers", params={"per_page": 100}, max_pages=3))
+    client.close()
+
+    assert contributors == 480
+    assert len(followers) == 300 and len({user["login"] for user in followers}) == 300
+
+
+def test_rate_limit_headers_etags_and_exhaustion(server):
+    client = HostClient("local", server.url)
+    budget = RateBudget()
+    client.add_layer(RateLimitLayer(budget))
+    first = client.get("/users/octocat")
+    cached = client.get("/users/octocat", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert first.headers["X-RateLimit-Resource"] == "core"
+    assert cached.status_code == 304
+    assert cached.headers["X-RateLimit-Remaining"] == first.headers["X-RateLimit-Remaining"]
+    for _ in range(int(first.headers["X-RateLimit-Remaining"])):
+        assert client.get("/emojis").status_code == 200
+    assert budget.available("core") == 0
+
+    raw = HostClient("raw", server.url)
+    assert raw.get("/emojis").status_code == 403
+    assert raw.get("/rate_limit").json()["resources"]["core"]["remaining"] == 0
+    client.close()
+    raw.close()
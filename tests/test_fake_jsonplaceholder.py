@@ -0,0 +1,91 @@
+import json
+
+import pytest
+import requests
+
+from support.fake_jsonplaceholder import FakeJSONPlaceholder
+from support.server import AsyncioServer, Request, Router, ThreadedServer
+
+app = FakeJSONPlaceholder()
+
+
+def call(method, path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    response = app(Request.from_target(method, path, {}, body))
+    return response.status, json.loads(response.body)
+
+
+def test_resource_sizes():
+    sizes = {"users": 10, "posts": 100, "comments": 500, "albums": 100, "photos": 5000, "todos": 200}
+    for resource, size in sizes.items():
+        status, data = call("GET", f"/{resource}")
+        assert status == 200 and len(data) == size
+
+
+def test_nested_routes_follow_foreign_keys():
+    _, comments = call("GET", "/posts/2/comments")
+    assert [c["postId"] for c in comments] == [2] * 5
+    _, todos = call("GET", "/users/1/todos")
+    assert len(todos) == 20 and all(t["userId"] == 1 for t in todos)
+    _, photos = call("GET", "/albums/1/photos")
+    assert len(photos) == 50
+
+
+def test_unknown_routes_return_404():
+    assert call("GET", "/user/5/todos") == (404, {})
+    assert call("GET", "/posts/101") == (404, {})
+
+
+def test_writes_are_faked():
+    assert call("POST", "/posts", {"title": "t"}) == (201, {"title": "t", "id": 101})
+    assert call("POST", "/posts", {"title": "t"})[1]["id"] == 101
+    assert call("POST", "/posts/1/comments", {"name": "n"}) == (201, {"name": "n", "postId": 1, "id": 501})
+    assert call("PATCH", "/todos/5", {"completed": True})[1]["completed"] is True
+    assert call("DELETE", "/posts/1") == (200, {})
+    assert call("GET", "/posts/1")[1]["id"] == 1
+
+
+def test_query_filters_use_the_indexes():
+    table = app.tables["todos"]
+    _, done = call("GET", "/todos?completed=true")
+    assert [t["id"] for t in done] == table.indexes["completed"]["true"]
+    _, mine = call("GET", "/users/1/todos?completed=false")
+    assert mine and all(t["userId"] == 1 and not t["completed"] for t in mine)
+    _, either = call("GET", "/comments?postId=2&postId=3")
+    assert [c["postId"] for c in either] == [2] * 5 + [3] * 5
+    assert call("GET", "/users/1/todos?userId=2") == (200, [])
+    _, by_title = call("GET", "/todos?userId=1&title=" + table.rows[3]["title"].replace(" ", "+"))
+    assert [t["id"] for t in by_title] == [3]
+
+
+def test_sort_page_and_limit():
+    _, newest = call("GET", "/posts?userId=2&_sort=id&_order=desc&_limit=3")
+    assert [p["id"] for p in newest] == [20, 19, 18]
+    response = app(Request.from_target("GET", "/comments?postId=1&_page=2&_limit=2", {"Host": "api.test"}, b""))
+    assert [c["id"] for c in json.loads(response.body)] == [3, 4]
+    assert response.headers["X-Total-Count"] == "5"
+    assert '<http://api.test/comments?postId=1&_page=3&_limit=2>; rel="next"' in response.headers["Link"]
+    _, window = call("GET", "/photos?_start=10&_end=13")
+    assert [p["id"] for p in window] == [11, 12, 13]
+
+
+@pytest.mark.parametrize("server_cls", [ThreadedServer, AsyncioServer])
+def test_bad_bodies_get_400_and_handler_errors_500(server_cls):
+    router = Router()
+    router.add("POST", "/posts", app)
+    router.add("GET", "/broken", lambda request: 1 / 0)
+    server = server_cls(router).start()
+    session = requests.Session()
+    try:
+        invalid = session.post(server.url + "/posts", data=b"{not json", headers={"Content-Type": "application/json"})
+        array = session.post(server.url + "/posts", json=[{"title": "t"}])
+        broken = session.get(server.url + "/broken")
+        created = session.post(server.url + "/posts", json={"title": "t"})
+    finally:
+        session.close()
+        server.stop()
+
+    assert invalid.status_code == 400 and invalid.json()["message"].startswith("the body is not valid JSON")
+    assert array.status_code == 400 and array.json() == {"message": "the body must be a JSON object"}
+    assert broken.status_code == 500 and broken.json() == {"message": "ZeroDivisionError: division by zero"}
+    assert created.status_code == 201
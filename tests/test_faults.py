@@ -0,0 +1,128 @@
+import statistics
+import time
+
+import pytest
+import requests
+
+from support.client import HostClient
+from support.faults import FaultProxy, uniform
+from support.resilience import ResilienceLayer
+from support.server import Response, Router, ThreadedServer
+
+
+@pytest.fixture(scope="module")
+def proxy():
+    router = Router()
+    router.add("GET", "/items/{item_id}", lambda request, item_id: Response.json({"id": int(item_id)}))
+    router.add("GET", "/blob", lambda request: Response(200, b"x" * 100_000))
+    router.add("POST", "/items", lambda request: Response.json(request.json(), status=201))
+    server = ThreadedServer(router).start()
+    proxy = FaultProxy(server.url, seed=1).start()
+    yield proxy
+    proxy.stop()
+    server.stop()
+
+
+@pytest.fixture
+def client(proxy):
+    client = HostClient("local", proxy.url)
+    yield client
+    client.close()
+    proxy.clear()
+
+
+def test_forwards_untouched_on_one_upstream_connection(proxy, client):
+    assert [client.get(f"/items/{n}").json() for n in range(3)] == [{"id": 0}, {"id": 1}, {"id": 2}]
+    r = client.post("/items", json={"title": "t"})
+
+    assert (r.status_code, r.json()) == (201, {"title": "t"})
+    assert client.stats.reused >= 3
+
+
+def test_injects_statuses_per_route_and_times(proxy, client):
+    proxy.add("GET", "/items/{item_id}", status=503, retry_after=2, times=2)
+    first = client.get("/items/1")
+    assert (first.status_code, first.headers["Retry-After"]) == (503, "2")
+    assert client.post("/items", json={}).status_code == 201
+    assert client.get("/items/1").status_code == 503
+    assert client.get("/items/1").json() == {"id": 1}
+
+
+def test_retries_get_through_a_flaky_route(proxy, client):
+    sleeps = []
+    layer = client.add_layer(ResilienceLayer("local", retries=5, sleep=sleeps.append))
+    fault = proxy.add(path="/items/{item_id}", status=429, probability=0.3)
+
+    statuses = [client.get(f"/items/{n}").status_code for n in range(20)]
+
+    assert statuses == [200] * 20
+    assert layer.retried == fault.applied > 0
+
+
+def test_an_unlucky_draw_falls_through_to_later_faults(proxy, client):
+    rare = proxy.add(path="/items/{item_id}", status=503, probability=0.1)
+    always = proxy.add(path="/items/{item_id}", status=429)
+
+    statuses = [client.get(f"/items/{n}").status_code for n in range(20)]
+
+    assert statuses.count(503) == rare.applied and statuses.count(429) == always.applied == 20 - rare.applied
+
+
+def test_latency_and_bandwidth(proxy, client):
+    proxy.add(path="/items/{item_id}", latency=uniform(0.1, 0.2))
+    proxy.add(path="/blob", bandwidth=500_000)
+
+    start = time.perf_counter()
+    client.get("/items/1")
+    delayed = time.perf_counter() - start
+    start = time.perf_counter()
+    blob = client.get("/blob")
+    throttled = time.perf_counter() - start
+
+    # lower bounds only: the injected delays are the least a request can take, a loaded machine adds to them
+    assert delayed >= 0.1
+    assert len(blob.content) == 100_000
+    assert throttled >= 0.18
+
+
+def test_truncated_bodies_and_resets_surface_as_client_errors(proxy, client):
+    proxy.add(path="/blob", truncate=0.5, times=1)
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        client.get("/blob")
+    proxy.add(path="/items/{item_id}", reset=True, times=1)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.get("/items/1")
+
+    assert client.get("/items/1").json() == {"id": 1}
+    assert len(client.get("/blob").content) == 100_000
+
+
+@pytest.mark.benchmark
+def test_overhead_without_faults_is_small(proxy, client):
+    direct = HostClient("direct", f"http://{proxy.upstream[0]}:{proxy.upstream[1]}")
+
+    def median(http, rounds=200):
+        durations = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            http.get("/items/1")
+            durations.append(time.perf_counter() - start)
+        return statistics.median(durations)
+
+    median(client, 20), median(direct, 20)
+    overhead = median(client) - median(direct)
+    direct.close()
+
+    assert overhead < 0.002, f"the proxy adds {overhead * 1000:.2f}ms per request"
+
+
+@pytest.mark.fresh
+def test_faults_fixture_scripts_the_stand_in(faults, jsonplaceholder):
+    proxy = faults["jsonplaceholder"]
+    proxy.add("GET", "/posts/{post_id}", status=503, times=1)
+    before = proxy.stats["status"]
+
+    r = jsonplaceholder.get("/posts/1")
+
+    assert r.status_code == 200
+    assert proxy.stats["status"] == before + 1
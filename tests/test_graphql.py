@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from support.client import HostClient
+from support.fake_github import API, FakeGitHub
+from support.graphql import BatchLayer, GraphQLError, execute, parse
+from support.ratelimit import RateBudget, RateLimitLayer
+from support.server import ThreadedServer
+
+USERS = ["octocat", "facebook", "apple", "torvalds"]
+REPOS = ["facebook/react", "microsoft/vscode", "atom/atom", "torvalds/linux", "moby/docker"]
+
+
+def test_parse_and_execute_aliases_arguments_and_fragments():
+    people = {"ada": {"__typename": "User", "__implements": ("Owner",), "login": "ada", "name": "Ada"},
+              "acme": {"__typename": "Organization", "__implements": ("Owner",), "login": "acme"}}
+    root = {"__typename": "Query", "owner": lambda args: people.get(args["login"]),
+            "all": lambda args: [people[login] for login in sorted(people)][:args.get("first")]}
+    query = parse('''query Lookups {
+      a: owner(login: "ada") { __typename ... on User { name } ... on Owner { login } }
+      b: owner(login: "acme") { ... on User { name } login }
+      missing: owner(login: "nobody") { login }
+      all(first: 1) { login }  # a comment
+    }''')
+
+    data, errors = execute(query, root)
+
+    assert data == {"a": {"__typename": "User", "name": "Ada", "login": "ada"}, "b": {"login": "acme"},
+                    "missing": None, "all": [{"login": "acme"}]}
+    assert errors == []
+    data, errors = execute(parse("{ owner(login: \"ada\") { email } }"), root)
+    assert data == {"owner": None}
+    assert errors == [{"message": "Field 'email' doesn't exist on type 'User'", "path": ["owner", "email"]}]
+
+
+@pytest.mark.parametrize("query", ["mutation { x }", "query ($login: String!) { x }", "{ ...Owner }",
+                                   "{ x @include(if: true) }", "{ x(y: ) }", "{ }", "{ x"])
+def test_unsupported_or_malformed_queries_are_rejected(query):
+    with pytest.raises(GraphQLError):
+        parse(query)
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = ThreadedServer(FakeGitHub(repos=5000)).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def client(server):
+    budget = RateBudget()
+    client = HostClient("local", server.url, headers={"Authorization": "Bearer t"})
+    client.add_layer(RateLimitLayer(budget))
+    batch = client.add_layer(BatchLayer(USERS, REPOS))
+    yield client, batch, budget
+    client.close()
+
+
+def test_declared_lookups_take_one_round_trip(server, client):
+    client, batch, budget = client
+    rest = HostClient("rest", server.url, headers={"Authorization": "Bearer t"})
+    expected = {path: rest.get(path).json() for path in [f"/users/{login}" for login in USERS]
+                + [f"/repos/{name}" for name in REPOS]}
+    rest.close()
+
+    batched = {path: client.get(path) for path in expected}
+
+    assert client.stats.requests == 1
+    assert batch.queries == 1 and batch.answered == 9 and batch.cost == 1
+    assert budget.available("graphql") is not None and budget.available("core") is None
+    for path, response in batched.items():
+        assert response.headers["X-GitHub-Batch"] == "graphql"
+        # the batch links the host it was sent to, the stand-in's REST bodies link api.github.com
+        body = json.loads(response.text.replace(server.url, API))
+        if path.startswith("/users/") and body["type"] == "Organization":
+            # GraphQL has no follower counts for organizations
+            assert "followers" not in body
+            body.update(followers=expected[path]["followers"], following=expected[path]["following"])
+        assert body == expected[path], path
+    assert batched["/repos/moby/docker"].json()["full_name"] == "moby/moby"
+
+
+def test_other_requests_and_unresolved_lookups_go_over_rest(server):
+    client = HostClient("local", server.url, headers={"Authorization": "Bearer t"})
+    batch = client.add_layer(BatchLayer(["nonexistentuser12345"], ["facebook/react"]))
+
+    assert client.get("/users/nonexistentuser12345").status_code == 404
+    assert client.get("/repos/facebook/react", params={"per_page": 1}).headers.get("X-GitHub-Batch") is None
+    assert client.get("/users/torvalds").json()["login"] == "torvalds"
+    assert client.get("/repos/facebook/react").headers["X-GitHub-Batch"] == "graphql"
+    assert (client.stats.requests, batch.queries, batch.answered) == (4, 1, 1)
+    client.close()
+
+
+def test_an_anonymous_batch_falls_back_to_rest(server):
+    client = HostClient("local", server.url)
+    batch = client.add_layer(BatchLayer(["octocat"], ["facebook/react"]))
+
+    assert client.get("/users/octocat").json()["type"] == "User"
+    assert client.get("/repos/facebook/react").json()["language"] == "JavaScript"
+    assert batch.queries == 1 and batch.answered == 0
+    assert batch.failure.startswith("401 This endpoint requires you to be authenticated")
+    assert client.post("/graphql", json={"query": "{ rateLimit { cost } }"}).status_code == 401
+    client.close()
@@ -0,0 +1,58 @@
+from support.client import HostClient
+from support.httpcache import ConditionalCacheLayer, HTTPCache
+from support.server import Response, Router, ThreadedServer
+
+
+def etag_server(payloads):
+    router = Router()
+    sent = []
+
+    @router.route("GET", "/items/{name}")
+    def item(request, name):
+        etag = f'"{name}-v1"'
+        if request.headers.get("If-None-Match") == etag:
+            sent.append(304)
+            return Response(304, headers={"ETag": etag})
+        sent.append(200)
+        return Response.json(payloads[name], headers={"ETag": etag})
+
+    return ThreadedServer(router).start(), sent
+
+
+def cached_client(url, path, max_bytes=1024 * 1024):
+    client = HostClient("test", url)
+    layer = client.add_layer(ConditionalCacheLayer(HTTPCache(str(path), max_bytes)))
+    return client, layer.cache
+
+
+def test_second_run_is_answered_with_304(tmp_path):
+    server, sent = etag_server({"emojis": {"+1": "https://example.test/1f44d.png"}})
+    try:
+        client, _ = cached_client(server.url, tmp_path / "cache.sqlite")
+        assert client.get("/items/emojis").json()["+1"].endswith("1f44d.png")
+        client.close()
+
+        client, cache = cached_client(server.url, tmp_path / "cache.sqlite")
+        response = client.get("/items/emojis")
+        assert response.status_code == 200
+        assert response.json()["+1"].endswith("1f44d.png")
+        assert sent == [200, 304]
+        assert cache.stats.not_modified == 1 and cache.stats.bytes_saved > 0
+        client.close()
+    finally:
+        server.stop()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    server, sent = etag_server({name: "x" * 600 for name in "abc"})
+    try:
+        client, cache = cached_client(server.url, tmp_path / "cache.sqlite", max_bytes=1300)
+        for name in "abac":
+            client.get(f"/items/{name}")
+        assert cache.stats.evicted == 1
+        client.get("/items/a")
+        client.get("/items/b")
+        assert sent == [200, 200, 304, 200, 304, 200]
+        client.close()
+    finally:
+        server.stop()
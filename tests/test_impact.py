@@ -0,0 +1,87 @@
+import pytest
+
+from support.client import HostClient
+from support.impact import ImpactLayer, ImpactRecorder, code_digest
+from support.server import Response, Router, ThreadedServer
+
+
+@pytest.fixture(scope="module")
+def server():
+    router = Router()
+    router.state = {"version": 1, "sent": []}
+
+    def tagged(request):
+        router.state["sent"].append(request.headers.get("If-None-Match"))
+        etag = f'"v{router.state["version"]}"'
+        if request.headers.get("If-None-Match") == etag:
+            return Response(304)
+        return Response.json({"version": router.state["version"]}, headers={"ETag": etag})
+
+    router.add("GET", "/tagged", tagged)
+    router.add("GET", "/plain", lambda request: Response.json({"version": router.state["version"]}))
+    router.add("POST", "/plain", lambda request: Response.json({}, status=201))
+    server = ThreadedServer(router).start()
+    server.router = router
+    yield server
+    server.stop()
+
+
+def sample_test():
+    pass
+
+
+def run(recorder, client, nodeid, *calls):
+    recorder.start(nodeid)
+    for method, path in calls:
+        client.request(method, path, **({"json": {"a": 1}} if method == "POST" else {}))
+    recorder.finish(nodeid, sample_test, passed=True)
+
+
+def test_fingerprints_survive_a_round_trip(server, tmp_path):
+    path = str(tmp_path / "impact.json")
+    recorder = ImpactRecorder(path, "h1")
+    client = HostClient("local", server.url)
+    client.add_layer(ImpactLayer(recorder, "local", client.base_url))
+    run(recorder, client, "t::reads", ("GET", "/tagged"), ("GET", "/plain"))
+    run(recorder, client, "t::writes", ("GET", "/plain"), ("POST", "/plain"))
+    run(recorder, client, "t::offline")
+    recorder.start("t::fails")
+    recorder.finish("t::fails", sample_test, passed=False)
+    recorder.save()
+    client.close()
+
+    loaded = ImpactRecorder(path, "h1").load()
+    assert set(loaded.results) == {"t::reads", "t::writes", "t::offline"}
+    calls = loaded.results["t::reads"]["calls"]
+    assert [(call["method"], call["path"], call["etag"]) for call in calls] == [
+        ("GET", "/tagged", '"v1"'), ("GET", "/plain", None)]
+    assert loaded.results["t::reads"]["code"] == code_digest(sample_test)
+    assert loaded.candidate("t::reads", sample_test) is not None
+    assert loaded.candidate("t::writes", sample_test) is None
+    assert loaded.candidate("t::offline", sample_test) is None
+    assert ImpactRecorder(path, "h2").load().candidate("t::reads", sample_test) is None
+    assert loaded.candidate("t::reads", test_fingerprints_survive_a_round_trip) is None
+
+
+def test_probes_are_conditional_and_detect_changes(server, tmp_path):
+    recorder = ImpactRecorder(str(tmp_path / "impact.json"), "h")
+    client = HostClient("local", server.url)
+    client.add_layer(ImpactLayer(recorder, "local", client.base_url))
+    server.router.state["version"] = 1
+    run(recorder, client, "t::tagged", ("GET", "/tagged"))
+    run(recorder, client, "t::plain", ("GET", "/plain"))
+    clients = {"local": client}.__getitem__
+
+    server.router.state["sent"].clear()
+    assert recorder.unchanged_test(recorder.candidate("t::tagged", sample_test), clients)
+    assert recorder.unchanged_test(recorder.candidate("t::plain", sample_test), clients)
+    assert server.router.state["sent"] == ['"v1"']
+
+    server.router.state["version"] = 2
+    assert not recorder.unchanged_test(recorder.candidate("t::tagged", sample_test), clients)
+    assert not recorder.unchanged_test(recorder.candidate("t::plain", sample_test), clients)
+    client.close()
+
+    assert (recorder.unchanged, recorder.changed) == (2, 2)
+    # probes are not recorded as calls of a test
+    assert recorder._responses == []
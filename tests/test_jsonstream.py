@@ -0,0 +1,55 @@
+import io
+import json
+import tracemalloc
+from itertools import islice
+
+import requests
+
+from support.fake_jsonplaceholder import build_tables
+from support.jsonstream import iter_items, iter_pairs, select
+
+
+def streamed(body):
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(body)
+    return response
+
+
+def test_items_split_across_any_chunk_boundary():
+    data = [1, 23456, -7.5e3, "çã ✓", {"a": [1, {"b": None}]}, [], True, "x\"]y"]
+    body = json.dumps(data, ensure_ascii=False, indent=1).encode()
+    for chunk_size in (1, 3, 7, 64):
+        assert list(iter_items(streamed(body), chunk_size)) == data
+    assert list(iter_items(streamed(b" [ ] "))) == []
+    assert dict(iter_pairs(streamed(b'{"a": 1, "b": [2]}'), 2)) == {"a": 1, "b": [2]}
+
+
+def test_select_stops_reading_once_the_keys_are_found():
+    emojis = {f"emoji{n}": f"https://example.com/{n}.png" for n in range(2000)}
+    body = json.dumps(emojis).encode()
+    response = streamed(body)
+
+    assert select(response, "emoji3", "missing-never") == {"emoji3": "https://example.com/3.png"}
+    assert select(streamed(body), "emoji3") == {"emoji3": "https://example.com/3.png"}
+
+    response = streamed(body)
+    select(response, "emoji10", chunk_size=1024)
+    assert response.raw.closed
+
+
+def test_first_photos_without_decoding_the_rest():
+    tables = build_tables()
+    body = tables["photos"].dump(tables["photos"].ids())
+
+    def peak(decode):
+        tracemalloc.start()
+        decode()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    full_peak = peak(lambda: [photo["title"] for photo in json.loads(body)[:5]])
+    lazy_peak = peak(lambda: [photo["title"] for photo in islice(iter_items(streamed(body)), 5)])
+
+    assert lazy_peak * 4 < full_peak
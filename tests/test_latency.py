@@ -0,0 +1,74 @@
+import json
+import socket
+from urllib.parse import urlsplit
+
+import pytest
+
+from support.client import HostClient
+from support.latency import GITHUB_TEMPLATES, LatencyRecorder, endpoint_template, percentile
+from support.server import Response, Router, ThreadedServer
+
+
+@pytest.fixture(scope="module")
+def server():
+    router = Router()
+    router.add("GET", "/users/{user_id}/todos", lambda request, user_id: Response.json([{"id": 1}] * 100))
+    server = ThreadedServer(router).start()
+    yield server
+    server.stop()
+
+
+def test_endpoint_templates():
+    assert endpoint_template("/users/5/todos") == "/users/{id}/todos"
+    assert endpoint_template("/posts/10") == "/posts/{id}"
+    assert endpoint_template("/repos/microsoft/vscode", GITHUB_TEMPLATES) == "/repos/{owner}/{repo}"
+    assert endpoint_template("/users/google/repos", GITHUB_TEMPLATES) == "/users/{username}/repos"
+    assert endpoint_template("/search/repositories", GITHUB_TEMPLATES) == "/search/repositories"
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert (percentile(values, 50), percentile(values, 95), percentile(values, 99)) == (50, 95, 99)
+    assert percentile([7], 99) == 7
+
+
+def test_calls_are_recorded_with_phases(server, tmp_path):
+    recorder = LatencyRecorder()
+    recorder.test = "test_x"
+    client = HostClient("local", server.url)
+    client.adapter.listeners.append(recorder.listener("local"))
+    for user_id in (1, 2, 3):
+        client.get(f"/users/{user_id}/todos")
+    client.close()
+
+    first, *reused = recorder.calls
+    assert first.timings.connect > 0 and first.timings.size > 0
+    assert all(call.timings.connect == call.timings.dns == 0 for call in reused)
+    assert list(recorder.endpoints()) == ["local GET /users/{id}/todos"]
+    assert recorder.endpoints()["local GET /users/{id}/todos"]["calls"] == 3
+
+    recorder.export(tmp_path / "latency.json")
+    exported = json.loads((tmp_path / "latency.json").read_text())
+    assert [call["test"] for call in exported["calls"]] == ["test_x"] * 3
+
+
+def test_a_refused_address_falls_back_to_the_next(server, monkeypatch):
+    port = urlsplit(server.url).port
+    getaddrinfo = socket.getaddrinfo
+
+    def resolve(host, *args, **kwargs):
+        # nothing listens on 127.0.0.2: the first address is refused
+        if host == "dual.test":
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port))
+                    for address in ("127.0.0.2", "127.0.0.1")]
+        return getaddrinfo(host, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", resolve)
+    recorder = LatencyRecorder()
+    client = HostClient("local", f"http://dual.test:{port}")
+    client.adapter.listeners.append(recorder.listener("local"))
+    assert client.get("/users/1/todos").status_code == 200
+    client.close()
+
+    call, = recorder.calls
+    assert call.timings.dns > 0 and call.timings.connect > 0
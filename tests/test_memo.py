@@ -0,0 +1,74 @@
+import copy
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from support.client import HostClient
+from support.memo import MemoLayer, bypass
+from support.server import Response, Router, ThreadedServer
+
+
+@pytest.fixture
+def server():
+    router = Router()
+    router.hits = 0
+    lock = threading.Lock()
+
+    @router.route("GET", "/users/{user_id}")
+    def user(request, user_id):
+        with lock:
+            router.hits += 1
+        time.sleep(0.05)
+        return Response.json({"id": int(user_id), "address": {"city": "Gwenborough"}, "tags": ["a"]})
+
+    @router.route("DELETE", "/users/{user_id}")
+    def delete(request, user_id):
+        return Response.json({})
+
+    server = ThreadedServer(router).start()
+    server.router = router
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def client(server):
+    client = HostClient("test", server.url)
+    client.add_layer(MemoLayer())
+    yield client
+    client.close()
+
+
+def test_concurrent_identical_gets_are_sent_once(server, client):
+    with ThreadPoolExecutor(8) as pool:
+        bodies = list(pool.map(lambda _: client.get("/users/1").json(), range(8)))
+    assert server.router.hits == 1
+    assert all(body is bodies[0] for body in bodies)
+    assert client.transport.stats.coalesced + client.transport.stats.hits == 7
+
+
+def test_memoized_body_is_read_only(client):
+    data = client.get("/users/1").json()
+    with pytest.raises(TypeError):
+        data["address"]["city"] = "outra"
+    with pytest.raises(TypeError):
+        data["tags"].append("b")
+    mutable = copy.deepcopy(data)
+    mutable["address"]["city"] = "outra"
+    assert type(mutable["address"]) is dict and client.get("/users/1").json()["address"]["city"] == "Gwenborough"
+
+
+def test_writes_and_bypass_send_again(server, client):
+    client.get("/users/1")
+    client.get("/users/1", headers={"X-Other": "1"})
+    assert server.router.hits == 2
+    client.delete("/users/1")
+    client.get("/users/1")
+    with bypass():
+        client.get("/users/1")
+    assert server.router.hits == 4
+    streamed = client.get("/users/1", stream=True)
+    assert server.router.hits == 5 and not streamed._content_consumed
+    streamed.close()
@@ -0,0 +1,73 @@
+import pytest
+
+from support.client import HostClient
+from support.pagination import count_items, iter_pages, iter_pages_items
+from support.server import Response, Router, ThreadedServer
+
+
+@pytest.fixture(scope="module")
+def client():
+    router = Router()
+    router.requested = []
+    total = 250
+
+    @router.route("GET", "/followers")
+    def followers(request):
+        page, per_page = int(request.arg("page", 1)), int(request.arg("per_page", 30))
+        router.requested.append(page)
+        last = -(-total // per_page)
+        start = (page - 1) * per_page
+        items = [{"id": n} for n in range(start + 1, min(start + per_page, total) + 1)]
+        links = []
+        if page < last:
+            links.append(f'<{server.url}/followers?per_page={per_page}&page={page + 1}>; rel="next"')
+            links.append(f'<{server.url}/followers?per_page={per_page}&page={last}>; rel="last"')
+        return Response.json(items, headers={"Link": ", ".join(links)} if links else None)
+
+    server = ThreadedServer(router).start()
+    client = HostClient("test", server.url)
+    client.router = router
+    yield client
+    client.close()
+    server.stop()
+
+
+def test_iter_pages_items_walks_every_page(client):
+    ids = [item["id"] for item in iter_pages_items(client, "/followers", params={"per_page": 100})]
+    assert ids == list(range(1, 251))
+
+
+def test_limits_stop_fetching_early(client):
+    client.router.requested.clear()
+    assert len(list(iter_pages_items(client, "/followers", max_items=35, prefetch=False))) == 35
+    assert client.router.requested == [1, 2]
+    assert len(list(iter_pages(client, "/followers", max_pages=3, prefetch=True))) == 3
+
+
+def test_count_items_fetches_first_and_last_page(client):
+    client.router.requested.clear()
+    assert count_items(client, "/followers", params={"per_page": 100}) == 250
+    assert client.router.requested == [1, 3]
+
+
+def test_count_items_trusts_x_total_count():
+    router = Router()
+    router.add("GET", "/todos", lambda request: Response.json([{"id": 1}], headers={"X-Total-Count": "42"}))
+    server = ThreadedServer(router).start()
+    client = HostClient("test", server.url)
+
+    assert count_items(client, "/todos", params={"_page": 1}) == 42
+    client.close()
+    server.stop()
+
+
+def test_count_items_is_unknown_without_a_last_page_number():
+    router = Router()
+    router.add("GET", "/events", lambda request: Response.json(
+        [{"id": 1}], headers={"Link": '<http://example.test/events?cursor=abc>; rel="last"'}))
+    server = ThreadedServer(router).start()
+    client = HostClient("test", server.url)
+
+    assert count_items(client, "/events") is None
+    client.close()
+    server.stop()
@@ -0,0 +1,61 @@
+import gzip
+import json
+import os
+import subprocess
+import sys
+
+from support.parallel import Coordinator, SharedBudget
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_workers_share_the_coordinator_budget():
+    coordinator = Coordinator([], {}, 8)
+    first, second = SharedBudget(coordinator), SharedBudget(coordinator)
+
+    first.load({"resources": {"core": {"limit": 60, "remaining": 5, "reset": 2**40}}})
+    first.update({"x-ratelimit-remaining": "3", "x-ratelimit-limit": "60", "x-ratelimit-reset": str(2**40)})
+    second.charge("core")
+
+    assert second.available("core") == first.available("core") == 2
+    assert coordinator.budget_report()[0].startswith("core         2/60")
+
+
+def run_suite(directory, *args):
+    # not a worker of this run, if it is a parallel one
+    env = {name: value for name, value in os.environ.items() if not name.startswith("API_PARALLEL_")}
+    env["PYTHONPATH"] = os.pathsep.join([HERE, os.environ.get("PYTHONPATH", "")])
+    return subprocess.run([sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", "-p", "conftest", *args],
+                          cwd=directory, env=env, capture_output=True, text=True, timeout=120)
+
+
+def test_tests_a_crashed_worker_held_are_reported_as_errors(tmp_path):
+    (tmp_path / "test_crash.py").write_text(
+        "import os\n\n"
+        "def test_a(): pass\n"
+        "def test_crash(): os._exit(3)\n"
+        "def test_b(): pass\n"
+        "def test_c(): pass\n")
+    result = run_suite(tmp_path, "--workers", "2", "test_crash.py")
+
+    assert result.returncode == 1, result.stdout + result.stderr
+    assert "ERROR test_crash.py::test_crash - no worker reported the end of this test" in result.stdout
+    assert "tests reported as errors: no worker finished them" in result.stdout
+
+
+def test_workers_outputs_are_merged_by_the_controller(tmp_path):
+    (tmp_path / "test_record.py").write_text(
+        "import pytest\n\n"
+        "@pytest.mark.parametrize('n', range(1, 9))\n"
+        "def test_post(jsonplaceholder, n):\n"
+        "    assert jsonplaceholder.get(f'/posts/{n}').status_code == 200\n")
+    result = run_suite(tmp_path, "--workers", "3", "--record-mode", "record", "--jsonplaceholder-url", "local",
+                       "--cassette-dir", "cassettes", "--impact-file", "impact.json",
+                       "--latency-json", "latency.json", "test_record.py")
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    with gzip.open(tmp_path / "cassettes" / "jsonplaceholder.jsonl.gz", "rt") as fh:
+        assert sorted(json.loads(line)["request"]["url"].rsplit("/", 1)[1] for line in fh) == list("12345678")
+    assert len(json.loads((tmp_path / "impact.json").read_text())["tests"]) == 8
+    assert len(json.loads((tmp_path / "latency.json").read_text())["calls"]) == 8
+    assert "connection reuse" in result.stdout and "worker 1: jsonplaceholder" in result.stdout
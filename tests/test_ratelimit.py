@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+from support.client import HostClient
+from support.ratelimit import RateBudget, RateLimitExhausted, RateLimitLayer, resource_for
+from support.server import Response, Router, ThreadedServer
+
+
+def fake_github(remaining):
+    calls = {"core": remaining}
+    router = Router()
+
+    @router.route("GET", "/users/{login}")
+    def user(request, login):
+        calls["core"] -= 1
+        return Response.json({"login": login}, headers={
+            "X-RateLimit-Resource": "core", "X-RateLimit-Limit": "60",
+            "X-RateLimit-Remaining": str(calls["core"]),
+            "X-RateLimit-Reset": str(int(time.time()) + 3600)})
+
+    return router
+
+
+def test_resource_for_paths():
+    assert resource_for("/search/repositories") == "search"
+    assert resource_for("/users/octocat") == "core"
+    assert resource_for("/rate_limit") is None
+    assert resource_for("/api/v3/search/code", "/api/v3") == "search"
+    assert resource_for("/api/v3/rate_limit", "/api/v3") is None
+
+
+def test_layer_stops_sending_when_bucket_is_empty():
+    server = ThreadedServer(fake_github(remaining=2)).start()
+    budget = RateBudget()
+    client = HostClient("github", server.url)
+    client.add_layer(RateLimitLayer(budget))
+    try:
+        assert client.get("/users/octocat").status_code == 200
+        assert client.get("/users/torvalds").status_code == 200
+        assert budget.available("core") == 0
+        with pytest.raises(RateLimitExhausted):
+            client.get("/users/apple")
+        assert client.stats.requests == 2
+    finally:
+        client.close()
+        server.stop()
+
+
+def test_reserve_reports_tests_it_holds_back():
+    budget = RateBudget()
+    budget.load({"resources": {"search": {"limit": 30, "remaining": 0, "reset": int(time.time()) + 600}}})
+    with pytest.raises(RateLimitExhausted, match="search budget has 0/30"):
+        budget.reserve({"search": 1}, max_wait=5, name="test_count_apache_search")
+    budget.reserve({"core": 1}, max_wait=5, name="test_apple_org")
+    assert budget.blocked == [("test_count_apache_search", "search")]
+
+
+def test_reservations_do_not_share_the_last_calls():
+    budget = RateBudget()
+    budget.load({"resources": {"core": {"limit": 60, "remaining": 3, "reset": int(time.time()) + 600}}})
+    budget.reserve({"core": 2}, max_wait=0, name="first")
+    with pytest.raises(RateLimitExhausted, match="core budget has 1/60 calls left, second needs 2"):
+        budget.reserve({"core": 2}, max_wait=0, name="second")
+    # fresh headers keep what is set aside
+    budget.update({"X-RateLimit-Remaining": "3", "X-RateLimit-Limit": "60",
+                   "X-RateLimit-Reset": str(int(time.time()) + 600)})
+    budget.reserve({"core": 1}, max_wait=0, name="third")
+    assert budget.available("core") == 3
+
+    budget.release({"core": 2})
+    budget.reserve({"core": 2}, max_wait=0, name="second")
+    assert budget.blocked == [("second", "core")]
@@ -0,0 +1,127 @@
+import time
+
+import pytest
+import requests
+
+from support.aclient import AsyncHostClient
+from support.client import HostClient
+from support.resilience import CircuitOpen, ResilienceLayer, retry_after
+from support.server import Response, Router, ThreadedServer
+
+
+@pytest.fixture(scope="module")
+def server():
+    router = Router()
+    router.script = []
+
+    def flaky(request):
+        status, headers = router.script.pop(0) if router.script else (200, {})
+        return Response.json({"status": status}, status=status, headers=headers)
+
+    def stalled(request):
+        time.sleep(1.0)
+        return Response.json({})
+
+    router.add("GET", "/flaky", flaky)
+    router.add("POST", "/flaky", flaky)
+    router.add("GET", "/stalled", stalled)
+    server = ThreadedServer(router).start()
+    server.router = router
+    yield server
+    server.stop()
+
+
+def client_with(server, **kwargs):
+    sleeps = []
+    client = HostClient("local", server.url)
+    layer = client.add_layer(ResilienceLayer("local", sleep=sleeps.append, **kwargs))
+    return client, layer, sleeps
+
+
+def test_retries_with_backoff_and_retry_after(server):
+    client, layer, sleeps = client_with(server, retries=3, backoff=0.5, max_backoff=20.0)
+    server.router.script[:] = [(503, {}), (502, {}), (429, {"Retry-After": "7"})]
+    r = client.get("/flaky")
+    client.close()
+
+    assert r.status_code == 200
+    assert layer.retried == 3
+    assert 0 <= sleeps[0] <= 0.5 and 0 <= sleeps[1] <= 1.0
+    assert sleeps[2] == 7.0
+
+
+def test_gives_up_without_waiting_for_a_long_retry_after(server):
+    client, layer, sleeps = client_with(server, max_backoff=5.0)
+    server.router.script[:] = [(503, {"Retry-After": "120"})]
+    r = client.get("/flaky")
+    # writes are never retried
+    server.router.script[:] = [(503, {})]
+    assert client.post("/flaky", json={}).status_code == 503
+    client.close()
+
+    assert r.status_code == 503
+    assert sleeps == []
+    assert retry_after(r) == 120.0
+
+
+def test_breaker_opens_and_recovers(server):
+    client, layer, sleeps = client_with(server, retries=1, threshold=2, cooldown=30.0)
+    server.router.script[:] = [(503, {})] * 4
+    assert client.get("/flaky").status_code == 503
+    assert client.get("/flaky").status_code == 503
+    assert layer.breaker.state == "open"
+
+    with pytest.raises(CircuitOpen, match="circuit breaker for local is open"):
+        client.get("/flaky")
+    assert layer.breaker.rejected == 1
+
+    layer.breaker.opened_at -= 31
+    assert layer.breaker.state == "half-open"
+    assert client.get("/flaky").status_code == 200
+    client.close()
+
+    assert layer.breaker.state == "closed"
+    assert layer.breaker.trips == 1
+    assert len(sleeps) == 2
+
+
+def test_failed_trial_reopens_the_breaker(server):
+    client, layer, sleeps = client_with(server, retries=2, threshold=1, cooldown=30.0)
+    server.router.script[:] = [(503, {})] * 4
+    assert client.get("/flaky").status_code == 503
+    assert layer.breaker.state == "open"
+
+    layer.breaker.opened_at -= 31
+    assert client.get("/flaky").status_code == 503
+    assert layer.breaker.state == "open" and len(sleeps) == 2
+    with pytest.raises(CircuitOpen):
+        client.get("/flaky")
+
+    server.router.script[:] = []
+    layer.breaker.opened_at -= 31
+    assert client.get("/flaky").status_code == 200
+    assert client.get("/flaky").status_code == 200
+    client.close()
+
+    assert layer.breaker.state == "closed"
+    assert layer.breaker.trips == 1
+
+
+def test_read_timeout_fails_fast(server):
+    client, layer, sleeps = client_with(server, timeout=(1.0, 0.2), retries=1, threshold=2)
+    start = time.perf_counter()
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.get("/stalled")
+    client.close()
+
+    assert time.perf_counter() - start < 1.0
+    assert len(sleeps) == 1
+    assert layer.breaker.failures == 1
+
+
+async def test_async_client_timeout(server):
+    client = AsyncHostClient("local", server.url, timeout=0.2)
+    with pytest.raises(TimeoutError):
+        await client.get("/stalled")
+    assert (await client.get("/flaky")).status_code == 200
+    await client.aclose()
@@ -0,0 +1,48 @@
+import time
+
+import pytest
+
+from support import schema
+from support.fake_jsonplaceholder import build_tables
+from support.memo import parse_read_only
+
+
+@pytest.fixture(scope="module")
+def tables():
+    return build_tables()
+
+
+def test_stand_in_resources_are_valid(tables):
+    for validator, resource in [(schema.POSTS, "posts"), (schema.COMMENTS, "comments"),
+                                (schema.ALBUMS, "albums"), (schema.PHOTOS, "photos"),
+                                (schema.TODOS, "todos"), (schema.USERS, "users")]:
+        assert validator.errors(list(tables[resource].rows.values())) == []
+
+
+def test_every_violation_is_reported_with_its_path():
+    users = [{"id": 1, "name": "", "username": "a", "email": "a@b.c", "phone": "", "website": "",
+              "address": {"street": "", "suite": "", "city": "", "zipcode": 123, "geo": {"lat": "0"}},
+              "company": []},
+             {"id": True}]
+
+    errors = schema.USERS.errors(users)
+
+    assert errors[:5] == ["$[0].name: must not be empty",
+                          "$[0].address.zipcode: expected str, got int",
+                          "$[0].address.geo.lng: missing",
+                          "$[0].company: expected object, got array",
+                          "$[1].id: expected int, got bool"]
+    with pytest.raises(AssertionError, match=r"user\[\]: \d+ schema violation"):
+        schema.USERS.check(users)
+
+
+@pytest.mark.benchmark
+def test_large_list_in_one_pass(tables):
+    photos = parse_read_only(tables["photos"].dump(tables["photos"].ids()))
+    assert len(photos) == 5000
+
+    start = time.perf_counter()
+    schema.PHOTOS.check(photos)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.05
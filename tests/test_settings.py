@@ -0,0 +1,72 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from support.settings import Settings, SettingsError
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_sources_in_order(tmp_path):
+    (tmp_path / ".env").write_text("API_SEED=7\nAPI_POOL_SIZE=3\nAPI_WORKERS=4\n")
+    settings = Settings({"seed": "9", "pool_size": None}, environ={"API_POOL_SIZE": "5"}, env_file=tmp_path)
+
+    assert (settings.seed, settings.pool_size, settings.workers, settings.record_mode) == (9, 5, 1, "live")
+    assert settings.sources == {"seed": "--seed", "pool_size": "$API_POOL_SIZE",
+                                "workers": "default", "record_mode": "default"}
+
+
+def test_env_file_is_read_only_when_needed(tmp_path):
+    (tmp_path / "nested").mkdir()
+    (tmp_path / ".env").write_text("TOKEN=secret\n")
+    settings = Settings({"seed": "2"}, environ={}, env_file=tmp_path / "nested")
+
+    assert settings.seed == 2
+    assert settings._dotenv is None
+    assert settings.token == "secret"
+    assert "TOKEN" not in os.environ
+
+
+def test_workers_never_read_the_env_file(tmp_path):
+    (tmp_path / ".env").write_text("API_WORKERS=4\n")
+    settings = Settings(environ={}, env_file=tmp_path)
+
+    assert settings.workers == 1
+    assert settings._dotenv is None
+    assert Settings(environ={"API_WORKERS": "3"}, env_file=tmp_path).workers == 3
+
+
+def test_every_invalid_value_is_reported():
+    settings = Settings({"record_mode": "bogus", "jsonplaceholder_url": "local"},
+                        environ={"API_SEED": "x", "GITHUB_API_URL": "api.github.com", "API_READ_TIMEOUT": "0"},
+                        env_file=None)
+
+    with pytest.raises(SettingsError) as excinfo:
+        settings.validate()
+    assert [error.split(" ")[0] for error in excinfo.value.errors] == [
+        "github_url", "record_mode", "seed", "read_timeout"]
+    assert settings.jsonplaceholder_url == "local"
+
+
+# wall-clock budget: run with the benchmarks, where the machine is expected to be quiet
+@pytest.mark.benchmark
+def test_collection_stays_within_the_startup_budget(api_settings):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-m", "pytest", "--collect-only", "-q", "-p", "no:cacheprovider"],
+                            cwd=HERE, capture_output=True, text=True, timeout=60)
+    elapsed = time.perf_counter() - start
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert elapsed < api_settings.startup_budget, (
+        f"starting the suite took {elapsed:.2f}s, over the {api_settings.startup_budget}s budget")
+
+
+def test_conftest_imports_no_client_layers():
+    probe = "import sys, conftest; print(sorted({'requests', 'sqlite3', 'dotenv', 'asyncio'} & set(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", probe], cwd=HERE, capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
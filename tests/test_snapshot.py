@@ -0,0 +1,84 @@
+import json
+
+import pytest
+import requests
+
+from support.client import make_response
+from support.snapshot import (IGNORED, Digests, Snapshot, SnapshotMismatch, SnapshotMissing, SnapshotStats, diff,
+                              normalize)
+
+REPO = {"name": "react", "stargazers_count": 1, "owner": {"login": "facebook", "updated_at": "x"},
+        "topics": [{"name": "ui", "score": 1.5}, {"name": "js", "score": 2.5}]}
+
+
+def response(data):
+    request = requests.Request("GET", "http://example.test/x").prepare()
+    return make_response(request, 200, {"Content-Type": "application/json"}, json.dumps(data).encode())
+
+
+def test_ignore_patterns():
+    normalized = normalize(REPO, ["$.stargazers_count", "$..updated_at", "$.topics[*].score"])
+
+    assert normalized["stargazers_count"] == IGNORED
+    assert normalized["owner"] == {"login": "facebook", "updated_at": IGNORED}
+    assert normalized["topics"] == [{"name": "ui", "score": IGNORED}, {"name": "js", "score": IGNORED}]
+    assert normalize(REPO, ["$.topics[1]"])["topics"] == [{"name": "ui", "score": 1.5}, IGNORED]
+    with pytest.raises(ValueError, match="bad snapshot path"):
+        normalize(REPO, ["$.topics[x]"])
+
+
+def test_diff_reports_changed_paths_only():
+    emojis = {f"emoji{n}": f"https://example.test/{n}.png" for n in range(2000)}
+    changed = {**emojis, "emoji7": "https://example.test/new.png", "new one": "u"}
+    del changed["emoji9"]
+    tree = {"emojis": emojis, "count": 2000, "tags": [1, 2]}
+    other = {"emojis": changed, "count": 2000, "tags": [1, 2, 3]}
+
+    assert Digests()(tree) == Digests()(json.loads(json.dumps(tree)))
+    assert Digests()([1]) != Digests()([True])
+    assert diff(tree, other) == [
+        '$.emojis.emoji7: "https://example.test/7.png" -> "https://example.test/new.png"',
+        '$.emojis.emoji9: missing (was "https://example.test/9.png")',
+        '$.emojis["new one"]: added "u"',
+        "$.tags: length 2 -> 3",
+    ]
+
+
+def test_record_match_and_update(tmp_path):
+    stats = SnapshotStats()
+    with pytest.raises(SnapshotMissing, match="run with --snapshot-update to record it"):
+        Snapshot(tmp_path, "test_repo", stats).match(response(REPO), ignore=["$..updated_at"])
+    assert not (tmp_path / "test_repo.json").exists()
+    Snapshot(tmp_path, "test_repo", stats, update=True).match(response(REPO), ignore=["$..updated_at"])
+    assert stats.written == 1 and (tmp_path / "test_repo.json").exists()
+
+    # same bytes: matched without parsing; ignored value changed: matched on the tree digest
+    Snapshot(tmp_path, "test_repo", stats).match(response(REPO), ignore=["$..updated_at"])
+    drifted = {**REPO, "owner": {"login": "facebook", "updated_at": "y"}}
+    Snapshot(tmp_path, "test_repo", stats).match(response(drifted), ignore=["$..updated_at"])
+    assert (stats.matched, stats.raw_matched) == (2, 1)
+
+    changed = {**REPO, "stargazers_count": 2}
+    with pytest.raises(SnapshotMismatch, match=r"\$\.stargazers_count: 1 -> 2"):
+        Snapshot(tmp_path, "test_repo", stats).match(changed, ignore=["$..updated_at"])
+    Snapshot(tmp_path, "test_repo", stats, update=True).match(changed, ignore=["$..updated_at"])
+    Snapshot(tmp_path, "test_repo", stats).match(changed, ignore=["$..updated_at"])
+    assert (stats.failed, stats.updated, stats.matched) == (2, 1, 3)
+
+
+def test_a_missing_golden_file_can_be_left_to_the_caller(tmp_path):
+    stats = SnapshotStats()
+    missing = []
+    Snapshot(tmp_path, "test_repo", stats, on_missing=lambda *args: missing.append(args)).match(REPO)
+
+    assert missing == [("test_repo", str(tmp_path / "test_repo.json"))]
+    assert (stats.unrecorded, stats.failed) == (1, 0)
+    assert not (tmp_path / "test_repo.json").exists()
+
+
+def test_several_snapshots_per_test(tmp_path):
+    snapshot = Snapshot(tmp_path, "test_x[a/b]", update=True)
+    snapshot.match([1])
+    snapshot.match([2])
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["test_x_a_b.1.json", "test_x_a_b.json"]
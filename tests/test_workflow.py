@@ -0,0 +1,89 @@
+import itertools
+
+import pytest
+
+from support.aclient import AsyncHostClient
+from support.factory import PayloadFactory
+from support.server import AsyncioServer, Response, Router
+from support.workflow import POST_LIFECYCLE, Step, Workflow
+
+
+@pytest.fixture(scope="module")
+def server():
+    router = Router()
+    router.log = []
+    ids = itertools.count(1)
+
+    @router.route("POST", "/orders")
+    def create(request):
+        order_id = next(ids)
+        router.log.append((order_id, "create"))
+        return Response.json({"id": order_id}, status=201)
+
+    @router.route("POST", "/orders/{order_id}/pay")
+    def pay(request, order_id):
+        router.log.append((int(order_id), "pay"))
+        return Response.json({}, status=200 if request.json().get("amount", 0) > 0 else 422)
+
+    @router.route("POST", "/orders/{order_id}/ship")
+    def ship(request, order_id):
+        router.log.append((int(order_id), "ship"))
+        return Response.json({})
+
+    server = AsyncioServer(router).start()
+    server.router = router
+    yield server
+    server.stop()
+
+
+ORDER = Workflow("order", [
+    Step("create", "POST", "/orders", expect=201, save={"order_id": "id"}),
+    Step("pay", "POST", "/orders/{order_id}/pay", json=lambda ctx: {"amount": ctx["amount"]}),
+    Step("ship", "POST", "/orders/{order_id}/ship"),
+])
+
+
+async def test_chains_interleave_but_keep_their_order(server):
+    client = AsyncHostClient("test", server.url)
+    server.router.log.clear()
+    result = await ORDER.run(client, instances=200, concurrency=25, context=lambda n: {"amount": n + 1})
+    await client.aclose()
+
+    result.check()
+    assert result.completed == 200
+    assert sorted(ctx["order_id"] for ctx in result.contexts) == list(range(1, 201))
+    per_order = {}
+    for order_id, step in server.router.log:
+        per_order.setdefault(order_id, []).append(step)
+    assert all(steps == ["create", "pay", "ship"] for steps in per_order.values())
+    # chains overlapped instead of running one after the other
+    assert [step for _, step in server.router.log[:25]].count("create") > 1
+
+
+async def test_failed_instances_stop_at_the_failing_step(server):
+    client = AsyncHostClient("test", server.url)
+    server.router.log.clear()
+    result = await ORDER.run(client, instances=10, context=lambda n: {"amount": n % 2})
+    await client.aclose()
+
+    assert result.completed == 5
+    assert {failure.step.name for failure in result.failures} == {"pay"}
+    failed = {ctx["order_id"] for ctx in result.contexts if ctx["amount"] == 0}
+    shipped = {order_id for order_id, step in server.router.log if step == "ship"}
+    assert len(failed) == 5 and not failed & shipped
+    assert len(shipped) == 5
+    with pytest.raises(AssertionError, match=r"order: 5 of 10 instances failed; first: instance \d+, step 'pay'"):
+        result.check()
+
+
+async def test_post_lifecycle_throughput(jsonplaceholder_server):
+    client = AsyncHostClient("jsonplaceholder", jsonplaceholder_server.url, max_connections=50)
+    payloads = PayloadFactory(2)
+    result = await POST_LIFECYCLE.run(client, instances=300, concurrency=50,
+                                      context=lambda n: {"post": payloads.post(), "comment": payloads.comment()})
+    await client.aclose()
+
+    result.check()
+    summary = result.summary()
+    assert summary["scenarios"] == 300 and summary["failed"] == 0
+    assert result.throughput > 0